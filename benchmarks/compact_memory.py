@@ -0,0 +1,119 @@
+import argparse
+import functools
+import time
+from collections.abc import Callable
+
+import pandas as pd
+
+import data.keys as keys
+import data.preprocess_utils as utils
+import eventtech.analysis_func as analysis_func
+from benchmarks.wide_to_long import sparse, wide_signup_sheet
+from data.db_metadata import EventDataBase
+
+JOBS = ("Kasaus", "Veto", "Purku")
+
+
+def fiscal_periods(n_years: int) -> pd.DataFrame:
+    """
+    Fiscal periods from July to June starting from July 2021
+    """
+
+    start_dates = pd.date_range("2021-07-01", periods=n_years, freq="12MS")
+
+    return pd.DataFrame(
+        {
+            "id_period": range(1, n_years + 1),
+            "period_name": [f"{date.year}-{date.year + 1}" for date in start_dates],
+            "start_date": start_dates,
+            "end_date": start_dates + pd.DateOffset(years=1, days=-1),
+        }
+    )
+
+
+def synthetic_responses(
+    periods: pd.DataFrame, n_technicians: int, density: float
+) -> pd.DataFrame:
+    """
+    Responses of three jobs per day over all periods, labeled by period
+    """
+
+    n_days = (periods["end_date"].iloc[-1] - periods["start_date"].iloc[0]).days + 1
+
+    responses = sparse(wide_signup_sheet(3 * n_days, n_technicians, density))
+
+    period_index = periods["start_date"].searchsorted(responses["Päiväys"], "right") - 1
+
+    return responses.assign(period_name=periods["period_name"].to_numpy()[period_index])
+
+
+def frame_mib(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def timed(method: Callable) -> float:
+    start = time.perf_counter()
+    method()
+    return time.perf_counter() - start
+
+
+def print_row(label: str, values: list[float]) -> None:
+    print(f"{label:<34}" + "".join(f"{value:>12.4f}" for value in values))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Report memory of default and compact dtype modes"
+    )
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--technicians", type=int, default=150)
+    parser.add_argument("--density", type=float, default=0.2)
+    args = parser.parse_args()
+
+    periods = fiscal_periods(args.years)
+    responses = synthetic_responses(periods, args.technicians, args.density)
+
+    db = EventDataBase("sqlite://")
+    db._create_tables(*keys.assign_keys(responses), periods)
+
+    period_names = {"db": set(periods["period_name"])}
+
+    print(f"{len(responses)} responses over {args.years} fiscal years")
+    print(f"{'':<34}{'default':>12}{'compact':>12}")
+
+    print_row(
+        "responses MiB",
+        [frame_mib(responses), frame_mib(utils.compact_frame(responses))],
+    )
+
+    with db.engine.connect() as conn:
+        analyses = {
+            "AllTechnicianSignups": (
+                lambda compact: analysis_func.AllTechnicianSignups(
+                    db, conn, period_names, compact=compact
+                ),
+                ("yearly_technician_signups", "technician_annual_distribution"),
+            ),
+            "EventSignups": (
+                lambda compact: analysis_func.EventSignups(
+                    db, conn, period_names, JOBS, compact=compact
+                ),
+                ("popular_event_signups_per_job", "event_signup_medians_per_month"),
+            ),
+        }
+
+        for name, (build, methods) in analyses.items():
+            signups = [build(compact) for compact in (False, True)]
+
+            print_row(f"{name}.data MiB", [frame_mib(s.data) for s in signups])
+
+            for method in methods:
+                arguments = (5,) if method == "popular_event_signups_per_job" else ()
+
+                print_row(
+                    f"  {method} s",
+                    [
+                        timed(functools.partial(getattr(s, method), *arguments))
+                        for s in signups
+                    ],
+                )
@@ -0,0 +1,320 @@
+import argparse
+import datetime
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from sqlalchemy import Select, bindparam
+
+import data.ingest as ingest
+import data.keys as keys
+import data.preprocess_utils as utils
+import eventtech.analysis_func as analysis_func
+import eventtech.plotting_tools as plotting_tools
+import eventtech.utils_analysis as utils_analysis
+from benchmarks.synthetic import write_dataset
+from data.db_metadata import EventDataBase
+
+JOBS = ("Kasaus", "Veto", "Purku")
+
+# Parameters of write_dataset for each data tier
+TIERS = {
+    "small": {"n_seasons": 3, "n_technicians": 30, "events_per_month": 4},
+    "medium": {"n_seasons": 5, "n_technicians": 100, "events_per_month": 20},
+    "large": {"n_seasons": 10, "n_technicians": 300, "events_per_month": 60},
+}
+
+DEFAULT_THRESHOLD = 0.25
+
+
+def measure(stage: Callable, repeats: int) -> tuple[object, float, float]:
+    """
+    Run a stage and return its result, best wall time in seconds and
+    peak traced memory in MiB
+
+    Wall time is measured without tracing, which slows down allocations,
+    and the peak memory in one additional traced run
+    """
+
+    timings = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        stage()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, min(timings), peak / 2**20
+
+
+def _stages(directory: Path, manifest: Path) -> tuple[dict[str, Callable], dict]:
+    """
+    Benchmarked stages in execution order, each stage reads the results of
+    earlier stages from the state dictionary
+    """
+
+    state = {}
+
+    seasons = ingest.load_manifest(manifest)
+    periods = ingest.season_periods(seasons)
+
+    spreadsheets = [season for season in seasons if season["source"] == "spreadsheet"]
+    telegram = [season for season in seasons if season["source"] == "telegram"]
+
+    period_names = {
+        "db": {season["period_name"] for season in spreadsheets},
+        "csv": {season["period_name"] for season in telegram},
+    }
+
+    csv_file = telegram[-1]["output"] if telegram else None
+
+    db = EventDataBase(f"sqlite:///{directory / 'events.db'}")
+
+    plot_config = {"local_plot_dir": str(directory)}
+
+    def preprocess_event_csv():
+        return pd.concat(
+            [
+                utils.preprocess_event_csv(
+                    season["path"],
+                    season.get("filter"),
+                    season.get("replace"),
+                    season.get("rename"),
+                ).assign(period_name=season["period_name"])
+                for season in spreadsheets
+            ]
+        )
+
+    def telegram_polls():
+        for season in telegram:
+            ingest.process_season(season)
+
+    def assign_keys():
+        return keys.assign_keys(state["preprocess_event_csv"])
+
+    def create_tables():
+        return db._create_tables(*state["assign_keys"], periods)
+
+    def get_and_concat_periods():
+        signups_stmt = (
+            Select(db.names.c.name_tech, db.events.c.date_event)
+            .join_from(db.signups, db.names, db.signups.c.name_id == db.names.c.id_name)
+            .join(db.events, db.events.c.id_event == db.signups.c.event_id)
+            .where(
+                bindparam("start_date") <= db.events.c.date_event,
+                db.events.c.date_event <= bindparam("end_date"),
+            )
+        )
+
+        with db.engine.connect() as conn:
+            return utils_analysis.get_and_concat_periods(
+                db,
+                conn,
+                signups_stmt,
+                utils_analysis.get_periods(db, conn, period_names["db"]),
+            )
+
+    def all_technician_signups():
+        with db.engine.connect() as conn:
+            return analysis_func.AllTechnicianSignups(db, conn, period_names)
+
+    def event_signups():
+        with db.engine.connect() as conn:
+            return analysis_func.EventSignups(db, conn, period_names, JOBS, csv_file)
+
+    def monthly_event_counts():
+        with db.engine.connect() as conn:
+            return analysis_func.monthly_event_counts(db, conn, period_names, csv_file)
+
+    def fit_and_get_coef():
+        event_counts = (
+            state["monthly_event_counts"]
+            .stack()
+            .swaplevel()
+            .sort_index()
+            .rename("Event counts")
+        )
+
+        last_period = event_counts.index.get_level_values(0).max()
+
+        return analysis_func.LinearRegMonthly().fit_and_get_coef(
+            [state["event_signup_medians_per_month"], event_counts],
+            {"Change": pd.MultiIndex.from_product([(last_period,), np.arange(1, 13)])},
+        )
+
+    def barplot():
+        plotting_tools.barplot(
+            state["yearly_technician_signups"],
+            "Number of signups",
+            "signup_counts.pdf",
+            plot_config,
+        )
+        plt.close("all")
+
+    def outer_index_barplot():
+        signup_counts = state["popular_event_signups_per_job"]
+
+        plotting_tools.outer_index_barplot(
+            signup_counts,
+            "top_event_signups.pdf",
+            "Most popular events by signup",
+            plot_config,
+            ncols=signup_counts.index.get_level_values(0).nunique(),
+        )
+        plt.close("all")
+
+    stages = {
+        "preprocess_event_csv": preprocess_event_csv,
+        "telegram_polls": telegram_polls,
+        "assign_keys": assign_keys,
+        "create_tables": create_tables,
+        "get_and_concat_periods": get_and_concat_periods,
+        "AllTechnicianSignups": all_technician_signups,
+        "yearly_technician_signups": lambda: state[
+            "AllTechnicianSignups"
+        ].yearly_technician_signups(),
+        "technician_annual_distribution": lambda: state[
+            "AllTechnicianSignups"
+        ].technician_annual_distribution(),
+        "EventSignups": event_signups,
+        "popular_event_signups_per_job": lambda: state[
+            "EventSignups"
+        ].popular_event_signups_per_job(5),
+        "event_signup_medians_per_month": lambda: state[
+            "EventSignups"
+        ].event_signup_medians_per_month(),
+        "monthly_event_counts": monthly_event_counts,
+        "fit_and_get_coef": fit_and_get_coef,
+        "barplot": barplot,
+        "outer_index_barplot": outer_index_barplot,
+    }
+
+    return stages, state
+
+
+def run_suite(tier: str, repeats: int = 3, seed: int = 0) -> dict:
+    """
+    Run all stages on a synthetic dataset of a tier
+
+    Returns a json serializable dictionary with the wall time in seconds and
+    the peak traced memory in MiB of each stage
+
+    Arguments
+    ---------
+    tier:
+        Name of the data tier in TIERS
+    repeats:
+        Number of timed runs of each stage, the best one is reported
+    seed:
+        Seed of the synthetic dataset
+    """
+
+    # Plots are drawn without a display
+    plt.switch_backend("Agg")
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+
+        manifest = write_dataset(directory, seed=seed, **TIERS[tier])
+
+        stages, state = _stages(directory, manifest)
+
+        results = {}
+
+        for name, stage in stages.items():
+            state[name], seconds, peak_mib = measure(stage, repeats)
+
+            results[name] = {
+                "seconds": round(seconds, 6),
+                "peak_mib": round(peak_mib, 3),
+            }
+
+            print(f"{name:<34}{seconds:>12.4f} s{peak_mib:>12.1f} MiB")
+
+    return {
+        "tier": tier,
+        "created": datetime.datetime.now().replace(microsecond=0).isoformat(),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "stages": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Return a description of each stage that is slower or uses more memory
+    than in the baseline by more than the threshold
+
+    Arguments
+    ---------
+    results:
+        Results of run_suite
+    baseline:
+        Results of an earlier run_suite of the same tier
+    threshold:
+        Allowed relative increase, 0.25 allows 25 % more time and memory
+    """
+
+    if results["tier"] != baseline["tier"]:
+        raise ValueError(
+            f"Baseline tier {baseline['tier']} does not match {results['tier']}"
+        )
+
+    regressions = []
+
+    for name, stage in results["stages"].items():
+        if name not in baseline["stages"]:
+            continue
+
+        for metric in ("seconds", "peak_mib"):
+            before, after = baseline["stages"][name][metric], stage[metric]
+
+            if after > before * (1 + threshold):
+                regressions.append(f"{name} {metric}: {before} -> {after}")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark ingest, SQL extraction, analysis and plotting"
+    )
+    parser.add_argument("--tier", choices=list(TIERS), default="small")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Path of the json results")
+    parser.add_argument("--baseline", help="Path of json results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed relative increase of time and memory over the baseline",
+    )
+    args = parser.parse_args()
+
+    results = run_suite(args.tier, args.repeats, args.seed)
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=1)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+
+        for regression in regressions:
+            print(f"Regression in {regression}")
+
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,87 @@
+import argparse
+import time
+
+import pandas as pd
+
+import data.keys as keys
+import data.preprocess_utils as utils
+from benchmarks.wide_to_long import sparse, wide_signup_sheet
+
+
+def merge_chain(
+    events_responses: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Positional ids with signups resolved by merges on the name columns, the
+    chain of data_preprocess before natural key ids, which kept every response
+    """
+
+    events = utils.df_db_preprocessing(
+        events_responses, keys.EVENT_COLNAMES, "id_event", "Keikka"
+    )
+    names = utils.df_db_preprocessing(
+        events_responses, keys.NAME_COLNAMES, "id_name", "Nimi"
+    )
+    jobs = utils.df_db_preprocessing(
+        events_responses, keys.JOB_COLNAMES, "id_job", "Homma"
+    )
+
+    signups_colnames = (
+        {"Vastaus": "answer", "Keikka": "name_event"}
+        | keys.NAME_COLNAMES
+        | keys.JOB_COLNAMES
+    )
+
+    signups = utils.df_db_preprocessing(events_responses, signups_colnames, "id_signup")
+
+    signups = (
+        signups.merge(events, on="name_event", validate="m:1")
+        .merge(names, on="name_tech", validate="m:1")
+        .merge(jobs, on="name_job", validate="m:1")
+        .loc[:, ["id_signup", "id_event", "id_name", "id_job", "answer"]]
+        .rename(
+            columns={"id_event": "event_id", "id_name": "name_id", "id_job": "job_id"}
+        )
+    )
+
+    return names, events, jobs, signups
+
+
+def best_time(method, responses: pd.DataFrame, repeats: int) -> float:
+    timings = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        method(responses)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark surrogate key assignment of responses"
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--technicians", type=int, default=100)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'signups':>9} {'merge s':>8} {'hash s':>8}")
+
+    for n_rows in args.rows:
+        responses = sparse(wide_signup_sheet(n_rows, args.technicians, args.density))
+
+        # Both methods produce the same signups up to the id values, sheet rows
+        # are distinct event days and jobs so no response is a repeated signup
+        signups_merge = merge_chain(responses)[3]
+        signups_hash = keys.assign_keys(responses)[3]
+        assert signups_merge["answer"].equals(signups_hash["answer"])
+
+        merge_time = best_time(merge_chain, responses, args.repeats)
+        hash_time = best_time(keys.assign_keys, responses, args.repeats)
+
+        print(
+            f"{n_rows:>8} {len(signups_hash):>9} {merge_time:>8.4f} {hash_time:>8.4f}"
+        )
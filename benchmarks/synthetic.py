@@ -0,0 +1,448 @@
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+LOCATIONS = ("Smökki", "Dipoli", "Kaapelitehdas", "Otahalli", "Teekkarisauna")
+
+EVENT_WORDS = ("Sitsit", "Jatkot", "Approt", "Rave", "Gaala", "Keikka", "Vuosijuhla")
+
+FIRST_NAMES = (
+    "Antti", "Iiris", "Ilari", "Kuura", "Late", "Mari", "Matias", "Mikko",
+    "Olivia", "Olli", "Petra", "Pinja", "Sampo", "Santeri", "Sauli", "Severi",
+)  # fmt: skip
+
+# Jobs of an event with the hours of their time windows
+JOB_WINDOWS = {
+    "Kasaus": ("16 - 21", "10 - 18", "14 - 19", "12 - 18"),
+    "Soundcheck": ("18 - 20",),
+    "Veto": ("18 - 02", "23 - 3", "20 - 02"),
+    "Purku": ("02 - 04", "03 - 04", "2:30 - 4"),
+}
+
+# Answers written in the conventions of the spreadsheets
+ANSWERS = np.array(["x", "x", "x", "16 ->", "18? ->", "(x)", "9 ->"], dtype=object)
+
+# Answers that are inconsistently written or cannot be parsed
+NOISY_ANSWERS = np.array(
+    ["X ", "x?", "tuskin", "16 tai 17->", "akseli", "vaan 1.9.", "15:30 max"],
+    dtype=object,
+)
+
+NOISY_WINDOWS = np.array(["Tarkentuu", "??", "16->", "20.30-1ish"], dtype=object)
+
+# Poll answers of event polls and the job each one counts for
+POLL_ANSWERS = {
+    "Kasaus": ("Kasaamaan", "Kasaus (12-> ???)"),
+    "Veto": ("Ajamaan", "Vetämään"),
+    "Purku": ("Purkamaan", "Purku 03.00"),
+    "En pääse": ("En pääse", "Ei tällä kertaa"),
+}
+
+
+def technician_names(n_technicians: int) -> list[str]:
+    """
+    Distinct technician names such as "Mikko" and "Mikko K"
+    """
+
+    initials = [""] + [f" {chr(code)}" for code in range(ord("A"), ord("Z") + 1)]
+
+    names = [
+        f"{first}{initial}{'' if round_ == 0 else f' {round_ + 1}'}"
+        for round_ in range(n_technicians // (len(FIRST_NAMES) * len(initials)) + 1)
+        for initial in initials
+        for first in FIRST_NAMES
+    ]
+
+    return names[:n_technicians]
+
+
+def event_dates(
+    start_date: pd.Timestamp, events_per_month: int, rng: np.random.Generator
+) -> pd.DatetimeIndex:
+    """
+    Sorted random dates of events_per_month events in each month of a season
+    """
+
+    months = pd.date_range(start_date, periods=12, freq="MS")
+
+    offsets = rng.integers(
+        0, months.days_in_month.to_numpy()[:, None], (12, events_per_month)
+    )
+
+    return pd.DatetimeIndex(
+        np.sort((months.to_numpy()[:, None] + offsets * np.timedelta64(1, "D")).ravel())
+    )
+
+
+def season_sheet(
+    start_date: pd.Timestamp,
+    technicians: list[str],
+    events_per_month: int,
+    density: float,
+    answer_noise: float,
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    """
+    Generate a season spreadsheet in the wide Tapahtumat format
+
+    Events have a Kasaus, Veto and Purku row, sometimes a Soundcheck row,
+    and are followed by an empty row. Only the first row of an event names
+    the event, dates alternate between formats and empty unnamed columns
+    follow the technician columns like in the exported spreadsheets
+
+    Arguments
+    ---------
+    start_date:
+        First day of the season
+    technicians:
+        Names of the technician columns
+    events_per_month:
+        Number of events in each month
+    density:
+        Fraction of job rows each technician answers
+    answer_noise:
+        Fraction of answers and time windows replaced with noisy ones
+    rng:
+        A numpy random generator
+    """
+
+    dates = event_dates(start_date, events_per_month, rng)
+
+    n_events = len(dates)
+
+    # Every event has three jobs and a fifth of them a soundcheck
+    has_soundcheck = rng.random(n_events) < 0.2
+    jobs_per_event = 3 + has_soundcheck
+
+    # One extra row per event is left empty
+    rows_per_event = jobs_per_event + 1
+    n_rows = rows_per_event.sum()
+
+    event_index = np.repeat(np.arange(n_events), rows_per_event)
+    row_in_event = np.arange(n_rows) - np.repeat(
+        np.cumsum(rows_per_event) - rows_per_event, rows_per_event
+    )
+
+    is_first = row_in_event == 0
+    is_empty = row_in_event == np.repeat(jobs_per_event, rows_per_event)
+
+    job_names = np.array(["Kasaus", "Soundcheck", "Veto", "Purku"], dtype=object)
+
+    # Events without a soundcheck skip its job
+    job_codes = row_in_event + (
+        (row_in_event >= 1) & ~np.repeat(has_soundcheck, rows_per_event)
+    )
+    jobs = job_names[np.minimum(job_codes, 3)]
+
+    windows = np.full(n_rows, None, dtype=object)
+
+    for job, job_windows in JOB_WINDOWS.items():
+        is_job = jobs == job
+        windows[is_job] = rng.choice(job_windows, is_job.sum())
+
+    is_noisy_window = rng.random(n_rows) < answer_noise
+    windows[is_noisy_window] = rng.choice(NOISY_WINDOWS, is_noisy_window.sum())
+
+    row_dates = dates[event_index]
+
+    day, month, year = (
+        row_dates.day.astype(str),
+        row_dates.month.astype(str),
+        row_dates.year.astype(str),
+    )
+
+    # Dates are written as 1.10.2021 or 01/10/2021
+    date_strings = np.where(
+        event_index % 2 == 0,
+        day + "." + month + "." + year,
+        day.str.zfill(2) + "/" + month.str.zfill(2) + "/" + year,
+    ).astype(object)
+
+    event_names = np.array(
+        [f"{word} {i}" for i, word in enumerate(rng.choice(EVENT_WORDS, n_events))],
+        dtype=object,
+    )
+
+    # A few events are cancelled
+    descriptions = np.where(
+        rng.random(n_events) < 0.02, "Peruttiin", "Valot ja ääni"
+    ).astype(object)
+
+    sheet = pd.DataFrame(
+        {
+            "Keikka": np.where(is_first, event_names[event_index], None),
+            "Paikka": np.where(is_first, rng.choice(LOCATIONS, n_rows), None),
+            "Päiväys": date_strings,
+            "Aikaikkuna": windows,
+            "Homma": jobs,
+            "Kuvaus": np.where(is_first, descriptions[event_index], None),
+            "Extrat": None,
+        }
+    )
+
+    answers = np.full((n_rows, len(technicians)), None, dtype=object)
+
+    is_answer = rng.random(answers.shape) < density
+    answers[is_answer] = rng.choice(ANSWERS, is_answer.sum())
+
+    is_noisy = is_answer & (rng.random(answers.shape) < answer_noise)
+    answers[is_noisy] = rng.choice(NOISY_ANSWERS, is_noisy.sum())
+
+    sheet = pd.concat(
+        (
+            sheet,
+            pd.DataFrame(answers, columns=technicians, index=sheet.index),
+            # Unnamed empty columns are written with empty headers
+            pd.DataFrame(None, columns=["", "", ""], index=sheet.index),
+        ),
+        axis=1,
+    )
+
+    sheet.loc[is_empty, :] = None
+
+    return sheet
+
+
+def telegram_export(
+    start_date: pd.Timestamp,
+    events_per_month: int,
+    n_technicians: int,
+    poll_noise: float,
+    rng: np.random.Generator,
+) -> dict:
+    """
+    Generate a Telegram chat export with one event poll per event
+
+    Arguments
+    ---------
+    start_date:
+        First day of the season
+    events_per_month:
+        Number of events in each month
+    n_technicians:
+        Number of technicians voting in polls
+    poll_noise:
+        Fraction of polls that are empty, not about an event or that have
+        no date in their question, and of text messages among the polls
+    rng:
+        A numpy random generator
+    """
+
+    messages = [
+        {
+            "id": 1,
+            "type": "service",
+            "date": f"{start_date:%Y-%m-%dT%H:%M:%S}",
+            "action": "create_group",
+            "text": "",
+        }
+    ]
+
+    for i, date in enumerate(event_dates(start_date, events_per_month, rng)):
+        poll_date = date - pd.Timedelta(
+            days=int(rng.integers(1, 30)), seconds=int(rng.integers(0, 86_400))
+        )
+
+        noise = rng.random(4) < poll_noise
+
+        if noise[0]:
+            messages.append(
+                {
+                    "id": len(messages) + 1,
+                    "type": "message",
+                    "date": f"{poll_date:%Y-%m-%dT%H:%M:%S}",
+                    "from": "Jane",
+                    "text": [
+                        "Muistakaa ] ja } merkit ",
+                        {"type": "bold", "text": "[poll]"},
+                    ],
+                }
+            )
+
+        if noise[1]:
+            question = "Sauna perjantaina vai lauantaina?"
+            answers = ["Perjantaina", "Lauantaina"]
+        else:
+            question = f"{rng.choice(EVENT_WORDS)} {i}"
+
+            if not noise[2]:
+                question += f" {date.day}.{date.month}."
+
+            answers = [rng.choice(texts) for texts in POLL_ANSWERS.values()]
+
+        voters = rng.binomial(n_technicians, 0.1, len(answers))
+
+        if noise[3]:
+            voters[:] = 0
+
+        messages.append(
+            {
+                "id": len(messages) + 1,
+                "type": "message",
+                "date": f"{poll_date:%Y-%m-%dT%H:%M:%S}",
+                "from": "John",
+                "poll": {
+                    "question": question,
+                    "closed": False,
+                    "total_voters": int(voters.sum()),
+                    "answers": [
+                        {"text": str(text), "voters": int(count), "chosen": False}
+                        for text, count in zip(answers, voters)
+                    ],
+                },
+            }
+        )
+
+    messages.sort(key=lambda message: message["date"])
+
+    for i, message in enumerate(messages):
+        message["id"] = i + 1
+
+    return {
+        "name": "Tekniikkasektori [synthetic]",
+        "type": "private_supergroup",
+        "id": 1234567890,
+        "messages": messages,
+    }
+
+
+def write_dataset(
+    directory: str | Path,
+    n_seasons: int = 3,
+    n_telegram_seasons: int = 1,
+    n_technicians: int = 30,
+    events_per_month: int = 4,
+    density: float = 0.2,
+    answer_noise: float = 0.05,
+    poll_noise: float = 0.1,
+    seed: int = 0,
+) -> Path:
+    """
+    Write a synthetic dataset and its season manifest into a directory
+
+    Seasons start from July 2021. The last n_telegram_seasons seasons are
+    Telegram exports, the others spreadsheets. Each season keeps about
+    two thirds of the technicians of the previous season. The same seed
+    always produces the same files
+
+    Returns the path of the manifest, which can be passed to load_manifest
+
+    Arguments
+    ---------
+    directory:
+        Directory of the dataset
+    n_seasons:
+        Number of seasons
+    n_telegram_seasons:
+        Number of seasons exported from Telegram
+    n_technicians:
+        Number of technicians in each spreadsheet season
+    events_per_month:
+        Number of events in each month
+    density:
+        Fraction of job rows each technician answers
+    answer_noise:
+        Fraction of answers and time windows replaced with noisy ones
+    poll_noise:
+        Fraction of noisy polls, see telegram_export
+    seed:
+        Seed of the random generator
+    """
+
+    rng = np.random.default_rng(seed)
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    names = technician_names(n_technicians * (n_seasons + 2) // 3 + n_technicians)
+
+    seasons = []
+
+    for i in range(n_seasons):
+        start_date = pd.Timestamp(year=2021 + i, month=7, day=1)
+        period_name = f"{start_date.year}-{start_date.year + 1}"
+        file_name = f"Tapahtumat_{start_date.year}_{start_date.year + 1}"
+
+        season = {
+            "period_name": period_name,
+            "start_date": f"{start_date:%Y-%m-%d}",
+            "end_date": f"{start_date + pd.DateOffset(years=1, days=-1):%Y-%m-%d}",
+        }
+
+        if i < n_seasons - n_telegram_seasons:
+            first = i * n_technicians // 3
+            technicians = names[first : first + n_technicians]
+
+            season_sheet(
+                start_date, technicians, events_per_month, density, answer_noise, rng
+            ).to_csv(directory / f"{file_name}.csv", index=False)
+
+            season |= {
+                "source": "spreadsheet",
+                "path": f"{file_name}.csv",
+                "filter": {"Kuvaus": ["Peruttiin"]},
+            }
+        else:
+            export = telegram_export(
+                start_date, events_per_month, n_technicians, poll_noise, rng
+            )
+
+            with open(directory / f"{file_name}.json", "w") as export_file:
+                json.dump(export, export_file, ensure_ascii=False)
+
+            season |= {
+                "source": "telegram",
+                "path": f"{file_name}.json",
+                "output": f"{file_name}.csv",
+                "categories": {
+                    "kasa": "Kasaus",
+                    "pur": "Purku",
+                    "aja": "Veto",
+                    "vet": "Veto",
+                    "ei": "En pääse",
+                    "en": "En pääse",
+                },
+                "event_substrings": ["kasa", "pur", "aja", "vet"],
+            }
+
+        seasons.append(season)
+
+    manifest = directory / "seasons.json"
+
+    with open(manifest, "w") as manifest_file:
+        json.dump({"seasons": seasons}, manifest_file, indent=2, ensure_ascii=False)
+
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic dataset of season spreadsheets and Telegram exports"
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--telegram-seasons", type=int, default=1)
+    parser.add_argument("--technicians", type=int, default=30)
+    parser.add_argument("--events-per-month", type=int, default=4)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--answer-noise", type=float, default=0.05)
+    parser.add_argument("--poll-noise", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = write_dataset(
+        args.directory,
+        args.seasons,
+        args.telegram_seasons,
+        args.technicians,
+        args.events_per_month,
+        args.density,
+        args.answer_noise,
+        args.poll_noise,
+        args.seed,
+    )
+
+    print(f"Wrote {manifest}")
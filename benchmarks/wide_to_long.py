@@ -0,0 +1,119 @@
+import argparse
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+
+from data.preprocess_utils import sparse_melt
+
+ID_VARS = ["Keikka", "Paikka", "Päiväys", "Aikaikkuna", "Homma", "Kuvaus"]
+
+
+def wide_signup_sheet(
+    n_rows: int, n_technicians: int, density: float, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Generate a synthetic wide signup sheet with sparse technician answers
+
+    Arguments
+    ---------
+    n_rows:
+        Number of event job rows
+    n_technicians:
+        Number of technician columns
+    density:
+        Fraction of non-empty technician cells
+    seed:
+        Seed of the random generator
+    """
+
+    rng = np.random.default_rng(seed)
+
+    df = pd.DataFrame(
+        {
+            "Keikka": [f"Event {i // 3}" for i in range(n_rows)],
+            "Paikka": rng.choice(["Smökki", "Dipoli", "Kaapelitehdas"], n_rows),
+            "Päiväys": pd.Timestamp(year=2021, month=7, day=1)
+            + pd.to_timedelta(np.arange(n_rows) // 3, unit="D"),
+            "Aikaikkuna": np.array(["16 - 19", "19 - 02", "02 - 04"])[
+                np.arange(n_rows) % 3
+            ],
+            "Homma": np.tile(["Kasaus", "Veto", "Purku"], n_rows // 3 + 1)[:n_rows],
+            "Kuvaus": "Description",
+        }
+    )
+
+    answers = np.array(["x", "16 ->", "18? ->", "(x)", "?"], dtype=object)
+
+    technicians = {}
+
+    for i in range(n_technicians):
+        column = np.full(n_rows, np.nan, dtype=object)
+        is_answer = rng.random(n_rows) < density
+        column[is_answer] = rng.choice(answers, is_answer.sum())
+        technicians[f"Tech {i}"] = column
+
+    return pd.concat((df, pd.DataFrame(technicians)), axis=1)
+
+
+def melt_dropna(df: pd.DataFrame) -> pd.DataFrame:
+    return df.melt(id_vars=ID_VARS, var_name="Nimi", value_name="Vastaus").dropna(
+        axis=0, how="all", subset="Vastaus"
+    )
+
+
+def sparse(df: pd.DataFrame) -> pd.DataFrame:
+    return sparse_melt(df, ID_VARS, "Nimi", "Vastaus")
+
+
+def measure(method: Callable, df: pd.DataFrame, repeats: int) -> tuple[float, float]:
+    """
+    Return the best wall time in seconds and the peak traced memory in MiB
+    """
+
+    timings = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        method(df)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    method(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(timings), peak / 2**20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark wide to long conversion of signup sheets"
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--technicians", type=int, nargs="+", default=[30, 100])
+    parser.add_argument("--density", type=float, default=0.05)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>8} {'techs':>6} {'responses':>10} "
+        f"{'melt s':>8} {'sparse s':>9} {'melt MiB':>9} {'sparse MiB':>11}"
+    )
+
+    for n_rows in args.rows:
+        for n_technicians in args.technicians:
+            df = wide_signup_sheet(n_rows, n_technicians, args.density)
+
+            melt_time, melt_peak = measure(melt_dropna, df, args.repeats)
+            sparse_time, sparse_peak = measure(sparse, df, args.repeats)
+
+            assert melt_dropna(df).equals(sparse(df))
+
+            print(
+                f"{n_rows:>8} {n_technicians:>6} {len(sparse(df)):>10} "
+                f"{melt_time:>8.4f} {sparse_time:>9.4f} "
+                f"{melt_peak:>9.1f} {sparse_peak:>11.1f}"
+            )
@@ -1,65 +1,306 @@
 import configparser
+import dataclasses
+import functools
+import json
+import os
+import time
+from collections.abc import Callable, Iterable, Mapping
+from pathlib import Path
 
 import boto3
+from sqlalchemy import URL
 
+CONFIG_PATH = Path(__file__).parent / "config.ini"
 
-def parse_db_config(filepath: str) -> dict[str, str]:
+# Environment variables such as EVENTTECH_DATABASE_HOST override the keys of
+# the ini file sections
+ENV_PREFIX = "EVENTTECH_"
+
+# Parameter Store names of the prod database settings
+SSM_PARAMETERS = {
+    "region": "/dev/prod/EventTech/db/region",
+    "endpoint": "/dev/prod/EventTech/db/endpoint",
+}
+
+SSM_CACHE_PATH = Path.home() / ".cache" / "eventtech" / "ssm_parameters.json"
+SSM_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Parameter Store returns at most this many parameters per request
+_SSM_BATCH_SIZE = 10
+
+
+@dataclasses.dataclass(frozen=True)
+class DatabaseConfig:
+    """
+    Database connection settings of the [Database] section
+
+    In prod the host and region come from Parameter Store and the password is
+    replaced by RDS IAM authentication tokens
+    """
+
+    drivername: str
+    database: str | None = None
+    username: str | None = None
+    password: str | None = None
+    host: str | None = None
+    port: int | None = None
+    region: str | None = None
+
+    def url(self) -> URL:
+        """
+        Return the SQLAlchemy URL of the database
+        """
+
+        return URL.create(
+            self.drivername,
+            username=self.username,
+            password=self.password,
+            host=self.host,
+            port=self.port,
+            database=self.database,
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class StorageConfig:
+    """
+    Persistence settings of the [Storage] section
+    """
+
+    local_plot_dir: str
+    s3_bucket_name: str | None = None
+    s3_plot_dir: str | None = None
+    csv_file_path: str | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class Config:
     """
-    Parses database configuration from config file
-    Gets sensitive prod configuration values from Parameter Store
+    Configuration of an environment, see load_config
+    """
+
+    environment: str
+    database: DatabaseConfig
+    storage: StorageConfig
+
+    def password_provider(self, rds_client=None) -> Callable[[], str] | None:
+        """
+        Returns a function generating a new RDS IAM authentication token for
+        each database connection in prod, or None in environments with
+        a fixed password
+
+        Arguments
+        ---------
+        rds_client:
+            Optional boto3 RDS client, by default one is created on first use
+        """
+
+        if self.environment != "prod":
+            return None
+
+        database = self.database
+        clients = [] if rds_client is None else [rds_client]
+
+        def generate_db_auth_token() -> str:
+            if not clients:
+                clients.append(boto3.Session().client("rds"))
+
+            # Tokens are signed locally and stay valid for 15 minutes
+            return clients[0].generate_db_auth_token(
+                DBHostname=database.host,
+                Port=database.port,
+                DBUsername=database.username,
+                Region=database.region,
+            )
+
+        return generate_db_auth_token
+
+
+def get_parameters(
+    names: Iterable[str],
+    ssm_client=None,
+    cache_path: str | Path | None = SSM_CACHE_PATH,
+    ttl: float = SSM_CACHE_TTL_SECONDS,
+) -> dict[str, str]:
+    """
+    Get Parameter Store values, reading non-secret values from a local cache
+
+    Parameters missing from the cache or older than ttl are fetched with as
+    few get_parameters requests as possible. Plain String parameters are
+    written to the cache, SecureString parameters never are
+
+    Returns a dictionary of (parameter name, value) pairs
+
+    Arguments
+    ---------
+    names:
+        Names of the parameters
+    ssm_client:
+        Optional boto3 SSM client, by default one is created only when
+        parameters have to be fetched
+    cache_path:
+        Path to the json cache file, None disables the cache
+    ttl:
+        Seconds a cached value stays valid
+    """
+
+    names = list(dict.fromkeys(names))
+
+    cache = {}
+
+    if cache_path is not None:
+        try:
+            with open(cache_path) as cache_file:
+                cache = json.load(cache_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            cache = {}
+
+    now = time.time()
+
+    values = {
+        name: cache[name]["value"]
+        for name in names
+        if name in cache and now - cache[name]["fetched_at"] < ttl
+    }
+
+    missing = [name for name in names if name not in values]
+
+    if not missing:
+        return values
+
+    if ssm_client is None:
+        ssm_client = boto3.Session().client("ssm")
+
+    for batch_start in range(0, len(missing), _SSM_BATCH_SIZE):
+        response = ssm_client.get_parameters(
+            Names=missing[batch_start : batch_start + _SSM_BATCH_SIZE],
+            WithDecryption=True,
+        )
+
+        if response.get("InvalidParameters"):
+            raise KeyError(
+                f"Unknown Parameter Store parameters: {response['InvalidParameters']}"
+            )
+
+        for param in response["Parameters"]:
+            values[param["Name"]] = param["Value"]
+
+            if param.get("Type", "String") == "String":
+                cache[param["Name"]] = {"value": param["Value"], "fetched_at": now}
+
+    if cache_path is not None:
+        cache_path = Path(cache_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(cache_path, "w") as cache_file:
+            json.dump(cache, cache_file, indent=1)
+
+    return values
+
+
+def _section(
+    config: configparser.ConfigParser,
+    name: str,
+    fields: Iterable[str],
+    environ: Mapping[str, str],
+) -> dict[str, str]:
+    """
+    Read a section of the ini file with environment variable overrides
+    """
+
+    section = dict(config[name]) if config.has_section(name) else {}
+
+    for field in fields:
+        variable = f"{ENV_PREFIX}{name.upper()}_{field.upper()}"
+
+        if variable in environ:
+            section[field] = environ[variable]
+
+    return section
+
+
+def read_config(
+    filepath: str | Path = CONFIG_PATH,
+    environ: Mapping[str, str] = os.environ,
+    ssm_client=None,
+    cache_path: str | Path | None = SSM_CACHE_PATH,
+) -> Config:
+    """
+    Read the configuration from an ini file and environment variables
+
+    Environment variables named EVENTTECH_<SECTION>_<KEY>, such as
+    EVENTTECH_ENV_ENVIRONMENT or EVENTTECH_DATABASE_HOST, override the keys
+    of the file. In prod the database host and region are read from
+    Parameter Store through get_parameters
 
     Arguments
     ---------
     filepath:
         A string representing the filepath to config file
+    environ:
+        A mapping of environment variables
+    ssm_client:
+        Optional boto3 SSM client
+    cache_path:
+        Path to the Parameter Store cache file, None disables the cache
     """
 
     config = configparser.ConfigParser()
 
-    config.read_file(open(filepath))
+    with open(filepath) as config_file:
+        config.read_file(config_file)
+
+    environment = _section(config, "Env", ["environment"], environ)["environment"]
 
-    db_config = dict(config["Database"])
+    db_fields = [field.name for field in dataclasses.fields(DatabaseConfig)]
+    db_config = _section(config, "Database", db_fields, environ)
 
-    match config["Env"]["environment"]:
+    match environment:
         case "dev":
             pass
         case "prod":
-            # Get sensitive configuration values from Parameter Store
-            session = boto3.Session()
-            ssm_client = session.client("ssm")
-            rds_client = session.client("rds")
-
-            params = ssm_client.get_parameters(
-                Names=[
-                    "/dev/prod/EventTech/db/region",
-                    "/dev/prod/EventTech/db/endpoint",
-                ],
-                WithDecryption=True,
+            params = get_parameters(
+                SSM_PARAMETERS.values(), ssm_client, cache_path=cache_path
             )
 
-            region = params["Parameters"][1]["Value"]
-            endpoint = params["Parameters"][0]["Value"]
-
-            db_auth_token = rds_client.generate_db_auth_token(
-                DBHostname=endpoint,
-                Port=db_config["port"],
-                DBUsername=db_config["username"],
-                Region=region,
-            )
-
-            db_config["password"] = db_auth_token
-            db_config["host"] = endpoint
+            db_config.pop("password", None)
+            db_config["host"] = params[SSM_PARAMETERS["endpoint"]]
+            db_config["region"] = params[SSM_PARAMETERS["region"]]
         case _:
             raise ValueError("Unknown environment")
 
-    return db_config
+    if "port" in db_config:
+        db_config["port"] = int(db_config["port"])
 
+    storage_fields = [field.name for field in dataclasses.fields(StorageConfig)]
+    storage_config = _section(config, "Storage", storage_fields, environ)
 
-def parse_storage_config(filepath: str) -> dict[str, str]:
-    config = configparser.ConfigParser()
+    return Config(
+        environment=environment,
+        database=DatabaseConfig(
+            **{key: value for key, value in db_config.items() if key in db_fields}
+        ),
+        storage=StorageConfig(
+            **{
+                key: value
+                for key, value in storage_config.items()
+                if key in storage_fields
+            }
+        ),
+    )
 
-    config.read_file(open(filepath))
 
-    storage_config = dict(config["Storage"])
+@functools.cache
+def load_config(filepath: str | Path = CONFIG_PATH) -> Config:
+    """
+    Read the configuration once per process, later calls return the same
+    object. Environment overrides are read on the first call, overrides
+    changed later apply after load_config.cache_clear()
+
+    Arguments
+    ---------
+    filepath:
+        A string representing the filepath to config file
+    """
 
-    return storage_config
+    return read_config(filepath)
@@ -0,0 +1,81 @@
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# An x mark on its own, as in "x", "(x)" or "x 17->"
+_MARK = r"(?<![^\W\d_])x(?![^\W\d_])"
+
+# The first hour before an arrow, as in "16 ->", "18.30 ->" or "16 tai 17->"
+_ARRIVAL = r"(?P<hour>\d{1,2})(?:[.:]\d{2})?[^>]*?-+>"
+
+# Names of extra technicians, as in "akseli" or "oskari, antti v?"
+_NAMES = r"^[^\W\d_]+(?: [^\W\d_])?(?:\s*,\s*[^\W\d_]+(?: [^\W\d_])?)*\??$"
+
+# Question marks, fully parenthesized answers and hedging words
+_HEDGE = r"\?|^\(.*\)$|\btod\b|\bjos\b|katotaan|tuskin|~|🤔"
+
+# Answers declining the signup
+_DECLINE = r"tuskin|^/$"
+
+ANSWER_COLUMNS = ["attending", "arrival_hour", "tentative"]
+
+
+def parse_answers(answers: pd.Series) -> pd.DataFrame:
+    """
+    Parse free text signup answers into typed columns
+
+    The result has the columns attending, arrival_hour and tentative with the
+    index of answers. attending tells whether the technician signs up at all,
+    tentative whether the answer is hedged and arrival_hour is the earliest
+    hour given with an arrow. Answers matching no known pattern are logged
+    in a single warning and have missing values in all columns
+
+    Arguments
+    ---------
+    answers:
+        A pandas series of stripped and lowercased answers
+    """
+
+    # Each distinct answer is parsed only once
+    codes, uniques = pd.factorize(answers)
+
+    text = pd.Series(uniques, dtype=object).astype(str)
+
+    arrival_hour = pd.to_numeric(text.str.extract(_ARRIVAL)["hour"]).astype("Int16")
+
+    is_declined = text.str.contains(_DECLINE)
+    is_tentative = text.str.contains(_HEDGE)
+
+    is_parsed = (
+        text.str.contains(_MARK)
+        | arrival_hour.notna()
+        | text.str.fullmatch(_NAMES)
+        | is_tentative
+        | is_declined
+    )
+
+    parsed = pd.DataFrame(
+        {
+            "attending": pd.array(~is_declined, dtype="boolean"),
+            "arrival_hour": arrival_hour,
+            "tentative": pd.array(is_tentative, dtype="boolean"),
+        }
+    )
+
+    parsed.loc[~is_parsed, ANSWER_COLUMNS] = pd.NA
+
+    if not is_parsed.all():
+        unparsed_counts = pd.Series(codes).value_counts()[is_parsed.index[~is_parsed]]
+
+        logger.warning(
+            "Could not parse %d answers: %s",
+            unparsed_counts.sum(),
+            dict(zip(text[unparsed_counts.index], unparsed_counts)),
+        )
+
+    # Missing answers have the code -1, which takes the appended missing row
+    parsed = pd.concat((parsed, parsed.iloc[:0].reindex([len(parsed)])))
+
+    return parsed.iloc[codes].set_axis(answers.index)
@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".cache"
+
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+
+class PreprocessCache:
+    """
+    On-disk cache of preprocessed sources
+
+    Entries are keyed by the content hash of the source file and the
+    preprocessing parameters, and stored as pickles. The least recently used
+    entries are evicted when the cache grows over its size limit
+
+    Arguments
+    ---------
+    directory:
+        Directory of the cache entries
+    max_bytes:
+        Size limit of all entries in bytes
+    """
+
+    suffix = ".pkl"
+
+    def __init__(
+        self,
+        directory: str | Path = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def file_hash(path: str | Path) -> str:
+        """
+        Return the sha256 hash of the content of a file
+
+        Arguments
+        ---------
+        path:
+            Path to the file
+        """
+
+        file_hash = hashlib.sha256()
+
+        with open(path, "rb") as source:
+            for block in iter(lambda: source.read(2**20), b""):
+                file_hash.update(block)
+
+        return file_hash.hexdigest()
+
+    def key(self, path: str | Path, params: dict) -> str:
+        """
+        Return the cache key of a source file and its preprocessing parameters
+
+        Arguments
+        ---------
+        path:
+            Path to the source file
+        params:
+            A json serializable dictionary of preprocessing parameters
+        """
+
+        key_hash = hashlib.sha256(self.file_hash(path).encode())
+        key_hash.update(json.dumps(params, sort_keys=True, default=repr).encode())
+
+        return key_hash.hexdigest()
+
+    def get_or_compute(self, path: str | Path, params: dict, compute: Callable):
+        """
+        Return the cached result for a source file and parameters,
+        computing and storing it on a miss
+
+        Arguments
+        ---------
+        path:
+            Path to the source file
+        params:
+            A json serializable dictionary of preprocessing parameters
+        compute:
+            A function without arguments computing the result
+        """
+
+        entry = self.directory / (self.key(path, params) + self.suffix)
+
+        try:
+            with open(entry, "rb") as entry_file:
+                result = pickle.load(entry_file)
+        except FileNotFoundError:
+            pass
+        else:
+            # The modification time orders entries for eviction
+            os.utime(entry)
+            logger.info("Using cached %s", path)
+            return result
+
+        result = compute()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Write atomically, other processes may read the same entry
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory, suffix=".tmp", delete=False
+        ) as entry_file:
+            pickle.dump(result, entry_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(entry_file.name, entry)
+
+        return result
+
+    def _entries(self) -> list[Path]:
+        if not self.directory.exists():
+            return []
+
+        return list(self.directory.glob("*" + self.suffix))
+
+    def size(self) -> int:
+        """
+        Total size of the cache entries in bytes
+        """
+
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits its size limit
+
+        Returns the number of removed entries
+        """
+
+        entries = sorted(
+            ((entry.stat(), entry) for entry in self._entries()),
+            key=lambda pair: pair[0].st_mtime_ns,
+        )
+
+        total_bytes = sum(stat.st_size for stat, _ in entries)
+
+        removed = 0
+
+        for stat, entry in entries:
+            if total_bytes <= self.max_bytes:
+                break
+
+            entry.unlink(missing_ok=True)
+            total_bytes -= stat.st_size
+            removed += 1
+
+        return removed
+
+    def clear(self) -> int:
+        """
+        Remove all cache entries
+
+        Returns the number of removed entries
+        """
+
+        entries = self._entries()
+
+        for entry in entries:
+            entry.unlink(missing_ok=True)
+
+        return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the preprocessing cache")
+    parser.add_argument("command", choices=["clear", "evict", "info"])
+    parser.add_argument("--directory", default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    args = parser.parse_args()
+
+    cache = PreprocessCache(args.directory, args.max_bytes)
+
+    match args.command:
+        case "clear":
+            print(f"Removed {cache.clear()} entries")
+        case "evict":
+            print(f"Removed {cache.evict()} entries")
+        case "info":
+            print(f"{len(cache._entries())} entries, {cache.size()} bytes")
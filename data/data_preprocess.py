@@ -1,71 +1,119 @@
-from pathlib import Path
+import argparse
+import logging
 
-import pandas as pd
-from numpy import nan
-from sqlalchemy import URL
-
-import data.preprocess_utils as utils
+import data.ingest as ingest
+import data.keys as keys
+import data.reconcile as reconcile
+from data.cache import PreprocessCache
 from data.db_metadata import EventDataBase
-from config.config import parse_db_config
-
-events_2021_2022_filter = {"Kuvaus": ["Peruttiin"]}
-
-events_2021_2022_replace_dict = {
-    "Keikka": {"soihtukulkue": nan, "(Wappuriehan julistus)": nan}
-}
-
-events_2021_2022_responses = utils.preprocess_event_csv(
-    "data/Tapahtumat_2021_2022.csv",
-    events_2021_2022_filter,
-    events_2021_2022_replace_dict,
-)
-
-events_2022_2023_replace_dict = {"Keikka": {"Vetovastuu Kuuralla": nan}}
-
-events_2022_2023_column_rename = {"Mikko K": "Mikko"}
-
-events_2022_2023_responses = utils.preprocess_event_csv(
-    "data/Tapahtumat_2022_2023.csv",
-    replace_dict=events_2022_2023_replace_dict,
-    column_rename=events_2022_2023_column_rename,
-)
-
-events_responses = pd.concat((events_2021_2022_responses, events_2022_2023_responses))
-
-events_colnames = {
-    "Keikka": "name_event",
-    "Paikka": "location_event",
-    "Päiväys": "date_event",
-    "Kuvaus": "description_event",
-}
-events = utils.df_db_preprocessing(
-    events_responses, events_colnames, "id_event", "Keikka"
-)
-
-names_colnames = {"Nimi": "name_tech"}
-names = utils.df_db_preprocessing(events_responses, names_colnames, "id_name", "Nimi")
-
-jobs_colnames = {"Homma": "name_job"}
-jobs = utils.df_db_preprocessing(events_responses, jobs_colnames, "id_job", "Homma")
-
-signups_colnames = (
-    {"Vastaus": "answer", "Keikka": "name_event"} | names_colnames | jobs_colnames
-)
-
-signups = utils.df_db_preprocessing(events_responses, signups_colnames, "id_signup")
-
-signups = (
-    signups.merge(events, on="name_event", validate="m:1")
-    .merge(names, on="name_tech", validate="m:1")
-    .merge(jobs, on="name_job", validate="m:1")
-    .loc[:, ["id_signup", "id_event", "id_name", "id_job", "answer"]]
-    .rename(columns={"id_event": "event_id", "id_name": "name_id", "id_job": "job_id"})
-)
-
-config_file_path = str(Path(__file__).parent.parent / "config" / "config.ini")
-
-conn_string = URL.create(**parse_db_config(config_file_path))
-
-db = EventDataBase(conn_string)
-
-db._create_tables(names, events, jobs, signups)
+from data.profiling import DEFAULT_PROFILE_DIR, write_profile
+from config.config import load_config
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Fill the event database")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert only new and changed seasons instead of reloading all tables",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=str(ingest.DEFAULT_MANIFEST),
+        help="Path to the season manifest",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes, by default one per season",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse all sources without the preprocessing cache",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Keep string columns as categoricals while preprocessing",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=str(DEFAULT_PROFILE_DIR),
+        help="Directory of the json data quality profiles of each run",
+    )
+    parser.add_argument(
+        "--mapping",
+        default=str(reconcile.DEFAULT_MAPPING),
+        help="Path to the name mapping table, accepted merges are applied",
+    )
+    parser.add_argument(
+        "--partitioned",
+        action="store_true",
+        help="Range partition Events and Signups by fiscal period on Postgres",
+    )
+    args = parser.parse_args()
+
+    seasons = ingest.load_manifest(args.manifest)
+
+    fingerprints = {
+        season["period_name"]: ingest.season_fingerprint(season, [args.mapping])
+        for season in seasons
+    }
+
+    # Periods store the fingerprints of the loaded seasons
+    periods = ingest.season_periods(seasons)
+    periods["source_hash"] = periods["period_name"].map(fingerprints)
+
+    config = load_config()
+
+    db = EventDataBase(
+        config.database.url(),
+        partitioned=args.partitioned,
+        password_provider=config.password_provider(),
+    )
+
+    if args.incremental:
+        with db.engine.connect() as conn:
+            seasons = ingest.changed_seasons(
+                seasons, fingerprints, db.loaded_sources(conn)
+            )
+
+        logging.info(
+            "Ingesting seasons %s", [season["period_name"] for season in seasons]
+        )
+
+    cache = None if args.no_cache else PreprocessCache()
+
+    if not any(season["source"] == "spreadsheet" for season in seasons):
+        for season in seasons:
+            ingest.process_season(season, cache)
+
+        logging.info("All spreadsheet seasons are loaded already")
+        return
+
+    profiles = {}
+
+    events_responses = ingest.preprocess_seasons(
+        seasons, args.workers, cache, args.compact, profiles
+    )
+
+    logging.info("Wrote profile %s", write_profile(profiles, args.profile_dir))
+
+    events_responses = reconcile.apply_mapping(
+        events_responses, reconcile.load_mapping(args.mapping)
+    )
+
+    names, events, jobs, signups = keys.assign_keys(events_responses)
+
+    if args.incremental:
+        db.ingest_incremental(names, events, jobs, signups, periods)
+    else:
+        db.reload(names, events, jobs, signups, periods)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+# Candidate formats of dates written by hand or exported by Telegram
+DATE_FORMATS = (
+    "%d.%m.%Y",
+    "%d/%m/%Y",
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d.%m.%y",
+    "%d/%m/%y",
+)
+
+POLL_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def infer_date_format(
+    values: Iterable[str],
+    formats: Iterable[str] = DATE_FORMATS,
+    sample_size: int = 100,
+) -> str | None:
+    """
+    Return the candidate format that parses most of a sample of values,
+    None if no candidate parses any value
+
+    Arguments
+    ---------
+    values:
+        An iterable containing date strings
+    formats:
+        An iterable containing candidate strftime formats in order of preference
+    sample_size:
+        Number of values tried with each format
+    """
+
+    sample = pd.Series(list(values)[:sample_size], dtype=object)
+
+    best_format, best_count = None, 0
+
+    for date_format in formats:
+        count = pd.to_datetime(sample, format=date_format, errors="coerce").count()
+
+        if count > best_count:
+            best_format, best_count = date_format, count
+
+    return best_format
+
+
+def parse_dates(
+    values: pd.Series,
+    formats: Iterable[str] = DATE_FORMATS,
+    dayfirst: bool = True,
+    errors: str = "raise",
+) -> pd.Series:
+    """
+    Parse a column of date strings into datetimes
+
+    Each unique string is parsed only once. The format of the column is
+    inferred once from its unique values and all values are parsed with it,
+    values that do not match the format fall back to per-value parsing
+
+    Arguments
+    ---------
+    values:
+        A pandas series of date strings, missing values stay missing
+    formats:
+        An iterable containing candidate strftime formats in order of preference
+    dayfirst:
+        Whether the day comes before the month in fallback parsing
+    errors:
+        "raise" to raise on strings that are not dates or "coerce" to turn
+        them into NaT, as in pd.to_datetime
+    """
+
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+
+    codes, uniques = pd.factorize(values)
+
+    uniques = pd.Series(uniques, dtype=object)
+
+    date_format = infer_date_format(uniques, formats)
+
+    if date_format is None:
+        parsed = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+    else:
+        parsed = pd.to_datetime(uniques, format=date_format, errors="coerce")
+
+    is_unparsed = parsed.isna()
+
+    if is_unparsed.any():
+        parsed[is_unparsed] = pd.to_datetime(
+            uniques[is_unparsed], dayfirst=dayfirst, format="mixed", errors=errors
+        )
+
+    # Missing values have the code -1
+    dates = parsed.to_numpy()[codes]
+    dates[codes == -1] = np.datetime64("NaT")
+
+    return pd.Series(dates, index=values.index, name=values.name)
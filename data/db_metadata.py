@@ -1,97 +1,1576 @@
+import io
+import logging
+import time
+from collections.abc import Callable, Iterable
+
 from sqlalchemy import create_engine, Table, Column, MetaData, ForeignKey, Insert
-from sqlalchemy import Integer, String, Date, URL
+from sqlalchemy import BigInteger, Integer, SmallInteger, Boolean, String, Date
+from sqlalchemy import URL, Connection, Delete, Select
+from sqlalchemy import Index, UniqueConstraint, func, or_, tuple_, inspect, text
+from sqlalchemy import and_, cast, event, make_url
+from sqlalchemy.schema import CreateSchema, CreateTable, DropSchema
+from sqlalchemy.dialects import postgresql, sqlite
 import pandas as pd
 
+import data.keys as keys
+
+logger = logging.getLogger(__name__)
+
+# Dialect specific inserts supporting ON CONFLICT clauses
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Marker of missing values in COPY csv data. By default COPY reads empty
+# fields as NULL, which would turn empty strings into NULL as well
+COPY_NULL = r"\N"
+
+STAGING_SCHEMA = "staging"
+RETIRED_SCHEMA = "retired"
+
+# Tables range partitioned by event date in the partitioned schema
+PARTITIONED_TABLES = ("Events", "Signups")
+# Suffix of the partitions holding event dates outside every period
+DEFAULT_PARTITION = "default"
+# Prefix of detached partitions kept as standalone tables
+DETACHED_PREFIX = "detached_"
+
+# Connection pool of Postgres engines. RDS IAM authentication tokens expire
+# after 15 minutes, so connections are recycled well before that
+POOL_SIZE = 5
+POOL_MAX_OVERFLOW = 10
+POOL_RECYCLE_SECONDS = 10 * 60
+
+# Version of the loaded tables in the AggregateVersions table, an aggregate is
+# fresh when it was refreshed from the current version
+DATA_VERSION = "tables"
+
+
+def default_periods() -> pd.DataFrame:
+    """
+    Fiscal periods stored in the Periods table unless other periods are given
+    """
+
+    return pd.DataFrame(
+        {
+            "id_period": [1, 2, 3],
+            "period_name": ["2021-2022", "2022-2023", "2023-2024"],
+            "start_date": [
+                pd.Timestamp(year=2021, month=7, day=1),
+                pd.Timestamp(year=2022, month=7, day=1),
+                pd.Timestamp(year=2023, month=7, day=1),
+            ],
+            "end_date": [
+                pd.Timestamp(year=2022, month=6, day=30),
+                pd.Timestamp(year=2023, month=6, day=30),
+                pd.Timestamp(year=2024, month=6, day=30),
+            ],
+        }
+    )
+
 
 class EventDataBase:
-    def __init__(self, connection_url: URL) -> None:
-        self.engine = create_engine(connection_url)
+    """
+    Tables of technician signups and the loading of them
+
+    Arguments
+    ---------
+    connection_url:
+        A SQLAlchemy URL of the database
+    partitioned:
+        Whether Events and Signups are range partitioned by fiscal period,
+        only supported on Postgres
+    password_provider:
+        Optional function returning the password of each new connection,
+        such as a generator of short-lived authentication tokens
+    """
+
+    def __init__(
+        self,
+        connection_url: URL,
+        partitioned: bool = False,
+        password_provider: Callable[[], str] | None = None,
+    ) -> None:
+        self.engine = self._create_engine(connection_url, password_provider)
+
+        if partitioned and self.engine.dialect.name != "postgresql":
+            logger.warning(
+                "Partitioned tables are not supported on %s, using flat tables",
+                self.engine.dialect.name,
+            )
+            partitioned = False
+
+        self.partitioned = partitioned
 
         self.metadata = MetaData()
 
-        self.names = Table(
+        (
+            self.names,
+            self.events,
+            self.jobs,
+            self.signups,
+            self.periods,
+        ) = self._define_tables(self.metadata, partitioned)
+
+        # Partition key columns of the partitioned tables, part of their
+        # unique constraints but not of their natural keys
+        self.partition_key = ("date_event",) if partitioned else ()
+
+        # Aggregates are kept apart from the tables, so reloads leave them alone
+        self.aggregate_metadata = MetaData()
+
+        (
+            self.monthly_event_counts,
+            self.event_job_signup_counts,
+            self.technician_signup_counts,
+            self.aggregate_versions,
+        ) = self._define_aggregates(self.aggregate_metadata)
+
+        # Natural keys identifying a row independently of its id, the same
+        # keys from which assign_keys derives the ids
+        self.natural_keys = {
+            "Names": tuple(keys.NAME_KEY),
+            "Events": tuple(keys.EVENT_KEY),
+            "Jobs": tuple(keys.JOB_KEY),
+            "Signups": tuple(keys.SIGNUP_KEY),
+            "Periods": ("period_name",),
+        }
+
+    @staticmethod
+    def _create_engine(
+        connection_url: URL, password_provider: Callable[[], str] | None = None
+    ):
+        """
+        Create an engine, with a sized and recycled connection pool on Postgres
+
+        Pooled connections are checked with a ping before use and replaced
+        after POOL_RECYCLE_SECONDS. The password of each new physical
+        connection comes from password_provider, so expiring tokens are never
+        reused for connecting
+        """
+
+        pool_options = {}
+
+        if make_url(connection_url).get_backend_name() == "postgresql":
+            pool_options = {
+                "pool_size": POOL_SIZE,
+                "max_overflow": POOL_MAX_OVERFLOW,
+                "pool_pre_ping": True,
+                "pool_recycle": POOL_RECYCLE_SECONDS,
+            }
+
+        engine = create_engine(connection_url, **pool_options)
+
+        if password_provider is not None:
+
+            @event.listens_for(engine, "do_connect")
+            def _provide_password(dialect, connection_record, cargs, cparams):
+                cparams["password"] = password_provider()
+
+        return engine
+
+    @staticmethod
+    def _define_tables(
+        metadata: MetaData, partitioned: bool = False
+    ) -> tuple[Table, ...]:
+        """
+        Define the Names, Events, Jobs, Signups and Periods tables in a metadata
+
+        Partitioned Events and Signups are range partitioned by event date, which
+        signups then store as well. Postgres requires the partition key in every
+        primary key and unique constraint, so date_event is added to them.
+        Signups do not reference partitioned Events with a foreign key, because
+        it would keep the partitions of a fiscal period from being detached
+
+        Arguments
+        ---------
+        metadata:
+            A SQLAlchemy MetaData object, its schema applies to all tables
+        partitioned:
+            Whether to define the partitioned Events and Signups tables
+        """
+
+        partition_key = ("date_event",) if partitioned else ()
+        partition_options = (
+            {"postgresql_partition_by": "RANGE (date_event)"} if partitioned else {}
+        )
+
+        names = Table(
             "Names",
-            self.metadata,
-            Column("id_name", Integer, primary_key=True),
-            Column("name_tech", String),
+            metadata,
+            Column("id_name", BigInteger, primary_key=True),
+            Column("name_tech", String, unique=True),
         )
 
-        self.events = Table(
+        events = Table(
             "Events",
-            self.metadata,
-            Column("id_event", Integer, primary_key=True),
+            metadata,
+            Column("id_event", BigInteger, primary_key=True),
             Column("name_event", String),
-            Column("date_event", Date),
+            Column("date_event", Date, primary_key=partitioned),
             Column("location_event", String),
             Column("description_event", String),
+            UniqueConstraint(*keys.EVENT_KEY, *partition_key),
+            # Period range filters read event ids and names from the index only
+            Index("ix_Events_date_event", "date_event", "id_event", "name_event"),
+            **partition_options,
         )
 
-        self.jobs = Table(
+        jobs = Table(
             "Jobs",
-            self.metadata,
-            Column("id_job", Integer, primary_key=True),
-            Column("name_job", String),
+            metadata,
+            Column("id_job", BigInteger, primary_key=True),
+            Column("name_job", String, unique=True),
         )
 
-        self.signups = Table(
+        signups = Table(
             "Signups",
-            self.metadata,
-            Column("id_signup", Integer, primary_key=True),
-            Column("event_id", Integer, ForeignKey("Events.id_event")),
-            Column("job_id", Integer, ForeignKey("Jobs.id_job")),
-            Column("name_id", Integer, ForeignKey("Names.id_name")),
+            metadata,
+            Column("id_signup", BigInteger, primary_key=True),
+            Column(
+                "event_id",
+                BigInteger,
+                *(() if partitioned else (ForeignKey("Events.id_event"),)),
+            ),
+            Column("job_id", BigInteger, ForeignKey("Jobs.id_job")),
+            Column("name_id", BigInteger, ForeignKey("Names.id_name")),
+            *((Column("date_event", Date, primary_key=True),) if partitioned else ()),
+            # Day of the event counted from its first date, see keys.SIGNUP_KEY
+            Column("event_day", SmallInteger),
             Column("answer", String),
+            Column("attending", Boolean),
+            Column("arrival_hour", SmallInteger),
+            Column("tentative", Boolean),
+            Column("start_minute", Integer),
+            Column("end_minute", Integer),
+            # Also serves joins on event_id and covers the job and name ids
+            UniqueConstraint(*keys.SIGNUP_KEY, *partition_key),
+            Index("ix_Signups_name_id_event_id", "name_id", "event_id"),
+            Index("ix_Signups_job_id_event_id", "job_id", "event_id"),
+            **partition_options,
         )
 
-        self.periods = Table(
+        periods = Table(
             "Periods",
-            self.metadata,
-            Column("id_period", Integer, primary_key=True),
-            Column("period_name", String),
+            metadata,
+            Column("id_period", BigInteger, primary_key=True),
+            Column("period_name", String, unique=True),
             Column("start_date", Date),
             Column("end_date", Date),
+            # Fingerprint of the loaded source of the period, see loaded_sources
+            Column("source_hash", String),
+        )
+
+        return names, events, jobs, signups, periods
+
+    @staticmethod
+    def _define_aggregates(metadata: MetaData) -> tuple[Table, ...]:
+        """
+        Define the aggregates of the tables and the AggregateVersions table
+
+        Aggregates are materialized views on Postgres and tables filled by
+        refresh_aggregates elsewhere. Their primary keys are the unique keys
+        that concurrent refreshes require
+
+        Arguments
+        ---------
+        metadata:
+            A SQLAlchemy MetaData object
+        """
+
+        monthly_event_counts = Table(
+            "MonthlyEventCounts",
+            metadata,
+            Column("period_name", String, primary_key=True),
+            Column("year", Integer, primary_key=True),
+            Column("month", Integer, primary_key=True),
+            Column("event_count", BigInteger),
+        )
+
+        event_job_signup_counts = Table(
+            "EventJobSignupCounts",
+            metadata,
+            Column("period_name", String, primary_key=True),
+            Column("name_event", String, primary_key=True),
+            Column("date_event", Date, primary_key=True),
+            Column("name_job", String, primary_key=True),
+            Column("signup_count", BigInteger),
+        )
+
+        technician_signup_counts = Table(
+            "TechnicianSignupCounts",
+            metadata,
+            Column("period_name", String, primary_key=True),
+            Column("name_tech", String, primary_key=True),
+            Column("date_event", Date, primary_key=True),
+            Column("signup_count", BigInteger),
+        )
+
+        aggregate_versions = Table(
+            "AggregateVersions",
+            metadata,
+            Column("name", String, primary_key=True),
+            Column("version", BigInteger),
+        )
+
+        return (
+            monthly_event_counts,
+            event_job_signup_counts,
+            technician_signup_counts,
+            aggregate_versions,
+        )
+
+    def _aggregate_queries(
+        self,
+        tables: tuple[Table, ...] | None = None,
+        aggregates: tuple[Table, ...] | None = None,
+    ) -> dict[Table, Select]:
+        """
+        Queries computing each aggregate from the tables
+
+        Arguments
+        ---------
+        tables:
+            Optional Names, Events, Jobs, Signups and Periods tables, by
+            default the live tables
+        aggregates:
+            Optional aggregates from _define_aggregates without the
+            AggregateVersions table, by default the live aggregates
+        """
+
+        names, events, jobs, signups, periods = tables or (
+            self.names,
+            self.events,
+            self.jobs,
+            self.signups,
+            self.periods,
+        )
+        monthly_event_counts, event_job_signup_counts, technician_signup_counts = (
+            aggregates
+            or (
+                self.monthly_event_counts,
+                self.event_job_signup_counts,
+                self.technician_signup_counts,
+            )
+        )
+
+        in_period = and_(
+            periods.c.start_date <= events.c.date_event,
+            events.c.date_event <= periods.c.end_date,
+        )
+
+        year = cast(func.extract("year", events.c.date_event), Integer)
+        month = cast(func.extract("month", events.c.date_event), Integer)
+
+        return {
+            monthly_event_counts: Select(
+                periods.c.period_name,
+                year.label("year"),
+                month.label("month"),
+                func.count().label("event_count"),
+            )
+            .select_from(events.join(periods, in_period))
+            .group_by(periods.c.period_name, year, month),
+            event_job_signup_counts: Select(
+                periods.c.period_name,
+                events.c.name_event,
+                events.c.date_event,
+                jobs.c.name_job,
+                func.count().label("signup_count"),
+            )
+            .select_from(
+                signups.join(events, events.c.id_event == signups.c.event_id)
+                .join(jobs, jobs.c.id_job == signups.c.job_id)
+                .join(periods, in_period)
+            )
+            .group_by(
+                periods.c.period_name,
+                events.c.name_event,
+                events.c.date_event,
+                jobs.c.name_job,
+            ),
+            technician_signup_counts: Select(
+                periods.c.period_name,
+                names.c.name_tech,
+                events.c.date_event,
+                func.count().label("signup_count"),
+            )
+            .select_from(
+                signups.join(names, names.c.id_name == signups.c.name_id)
+                .join(events, events.c.id_event == signups.c.event_id)
+                .join(periods, in_period)
+            )
+            .group_by(
+                periods.c.period_name,
+                names.c.name_tech,
+                events.c.date_event,
+            ),
+        }
+
+    def refresh_aggregates(self) -> None:
+        """
+        Recompute the aggregates from the current tables
+
+        On Postgres missing materialized views are created and existing ones
+        are refreshed concurrently, so readers keep reading the old rows while
+        a refresh runs. Other dialects rewrite aggregate tables in a single
+        transaction. The aggregates are then marked fresh for the current
+        version of the tables
+        """
+
+        start = time.perf_counter()
+
+        with self.engine.begin() as conn:
+            self.aggregate_versions.create(conn, checkfirst=True)
+
+            version = self._versions(conn).get(DATA_VERSION, 0)
+
+            is_postgresql = conn.dialect.name == "postgresql"
+
+            views = (
+                set(inspect(conn).get_materialized_view_names())
+                if is_postgresql
+                else set()
+            )
+
+            preparer = conn.dialect.identifier_preparer
+
+            for aggregate, query in self._aggregate_queries().items():
+                name = preparer.format_table(aggregate)
+
+                if not is_postgresql:
+                    aggregate.create(conn, checkfirst=True)
+
+                    conn.execute(Delete(aggregate))
+                    conn.execute(
+                        Insert(aggregate).from_select(
+                            list(query.selected_columns.keys()), query
+                        )
+                    )
+                elif aggregate.name in views:
+                    conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+                else:
+                    _create_materialized_view(conn, aggregate, query)
+
+            self._set_versions(
+                conn,
+                {aggregate.name: version for aggregate in self._aggregate_queries()},
+            )
+
+        logger.info("Refreshed aggregates in %.3f s", time.perf_counter() - start)
+
+    def _drop_aggregates(self) -> None:
+        """
+        Drop the materialized views, which would keep their tables from being
+        dropped
+        """
+
+        if self.engine.dialect.name != "postgresql":
+            return
+
+        with self.engine.begin() as conn:
+            _drop_materialized_views(conn, self._aggregate_queries())
+
+    def aggregates_fresh(self, conn: Connection) -> bool:
+        """
+        Whether the aggregates were refreshed from the current tables
+
+        Arguments
+        ---------
+        conn:
+            A db connection object
+        """
+
+        if not inspect(conn).has_table(self.aggregate_versions.name):
+            return False
+
+        versions = self._versions(conn)
+
+        return DATA_VERSION in versions and all(
+            versions.get(aggregate.name) == versions[DATA_VERSION]
+            for aggregate in self._aggregate_queries()
+        )
+
+    def _versions(self, conn: Connection) -> dict[str, int]:
+        return dict(
+            conn.execute(
+                Select(
+                    self.aggregate_versions.c.name, self.aggregate_versions.c.version
+                )
+            ).all()
+        )
+
+    def _set_versions(self, conn: Connection, versions: dict[str, int]) -> None:
+        conn.execute(
+            Delete(self.aggregate_versions).where(
+                self.aggregate_versions.c.name.in_(list(versions))
+            )
+        )
+        conn.execute(
+            Insert(self.aggregate_versions),
+            [{"name": name, "version": version} for name, version in versions.items()],
         )
 
+    def _bump_data_version(self, conn: Connection) -> None:
+        """
+        Mark the tables as changed, which makes the aggregates stale until
+        they are refreshed
+        """
+
+        self.aggregate_versions.create(conn, checkfirst=True)
+
+        version = self._versions(conn).get(DATA_VERSION, 0) + 1
+
+        self._set_versions(conn, {DATA_VERSION: version})
+
     def _create_tables(
         self,
         df_names: pd.DataFrame,
         df_events: pd.DataFrame,
         df_jobs: pd.DataFrame,
         df_signups: pd.DataFrame,
-    ):
+        df_periods: pd.DataFrame | None = None,
+    ) -> dict[str, float]:
+        """
+        Recreate all tables and load the given dataframes into them,
+        secondary indexes are built after loading
+
+        Returns a dictionary of (table name, rows per second) pairs
+        """
+        if df_periods is None:
+            df_periods = default_periods()
+
+        self._drop_aggregates()
         self.metadata.drop_all(self.engine)
-        self.metadata.create_all(self.engine)
+
+        self._warn_outside_periods(df_events, df_periods)
+        df_signups = self._with_event_dates(df_signups, df_events)
 
         db_data_pairs = zip(
-            (df_names, df_events, df_jobs, df_signups),
-            (self.names, self.events, self.jobs, self.signups),
+            (df_names, df_events, df_jobs, df_signups, df_periods),
+            (self.names, self.events, self.jobs, self.signups, self.periods),
         )
 
+        load_rates = {}
+
         with self.engine.begin() as conn:
+            for table in self.metadata.sorted_tables:
+                conn.execute(CreateTable(table))
+
+            self.attach_periods(conn, df_periods)
+
             for db_data, db in db_data_pairs:
-                conn.execute(Insert(db), db_data.to_dict(orient="records"))
+                load_rates[db.name] = self.bulk_load(conn, db, db_data)
+
+            self.create_indexes(conn)
+
+            self._bump_data_version(conn)
+
+        self.refresh_aggregates()
+
+        return load_rates
+
+    def _with_event_dates(
+        self, df_signups: pd.DataFrame, df_events: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Add the partition key date_event to signups of partitioned tables
+        """
+
+        if not self.partitioned:
+            return df_signups
+
+        event_dates = df_events.set_index("id_event")["date_event"]
+
+        return df_signups.assign(
+            date_event=df_signups["event_id"].map(event_dates).to_numpy()
+        )
+
+    def _warn_outside_periods(
+        self, df_events: pd.DataFrame, df_periods: pd.DataFrame
+    ) -> None:
+        """
+        Log the events of partitioned tables dated outside every period, which
+        are kept in the default partitions
+        """
+
+        if not self.partitioned:
+            return
+
+        inside = pd.Series(False, index=df_events.index)
+
+        for period in df_periods.itertuples():
+            inside |= df_events["date_event"].between(
+                period.start_date, period.end_date
+            )
+
+        if not inside.all():
+            logger.warning(
+                "%d events are dated outside every period and go to the default "
+                "partitions: %s",
+                (~inside).sum(),
+                df_events.loc[~inside, "name_event"].tolist(),
+            )
+
+    def attach_periods(
+        self,
+        conn: Connection,
+        df_periods: pd.DataFrame,
+        metadata: MetaData | None = None,
+    ) -> None:
+        """
+        Create the Events and Signups partitions of fiscal periods
+
+        Each period gets partitions named after the table and the period, such
+        as Events_2021-2022, holding the event dates from its start date to its
+        end date. Event dates outside every period go to the default
+        partitions, such as Events_default, which are created first.
+        Already attached partitions are left alone, so attaching a new season
+        does not touch the partitions of earlier seasons. Only partitions
+        created here are attached, a standalone table with the name of a
+        partition raises a RuntimeError instead of being attached with rows
+        that may already be loaded again.
+        Does nothing for flat tables
+
+        Arguments
+        ---------
+        conn:
+            A db connection object
+        df_periods:
+            A dataframe of fiscal periods with period names, start and end dates
+        metadata:
+            Optional metadata of the tables, by default the live tables
+        """
+
+        if not self.partitioned:
+            return
+
+        if metadata is None:
+            metadata = self.metadata
+
+        preparer = conn.dialect.identifier_preparer
+
+        for table in metadata.sorted_tables:
+            if table.name not in PARTITIONED_TABLES:
+                continue
+
+            attached = self._partitions(conn, table)
+
+            bounds = {f"{table.name}_{DEFAULT_PARTITION}": (None, None)}
+            bounds.update(
+                (
+                    f"{table.name}_{period.period_name}",
+                    (period.start_date, period.end_date),
+                )
+                for period in df_periods.itertuples()
+            )
+
+            for partition_name, (start_date, end_date) in bounds.items():
+                if partition_name in attached:
+                    continue
+
+                if inspect(conn).has_table(partition_name, schema=table.schema):
+                    raise RuntimeError(
+                        f"Table {partition_name} exists but is not a partition of "
+                        f"{table.name}, rename or drop it before attaching the period"
+                    )
+
+                conn.execute(
+                    text(
+                        _partition_ddl(
+                            preparer, table, partition_name, start_date, end_date
+                        )
+                    )
+                )
+
+                logger.info("Created partition %s", partition_name)
+
+    def detach_period(
+        self, conn: Connection, period_name: str, drop: bool = False
+    ) -> list[str]:
+        """
+        Detach the Events and Signups partitions of a fiscal period
+
+        The rows of the detached partitions are neither copied nor deleted
+        unless the partitions are dropped. Kept partitions and their indexes
+        are renamed with the prefix of DETACHED_PREFIX, such as
+        detached_Events_2021-2022, so that loading the period again creates
+        new partitions instead of clashing with the detached ones. Their
+        foreign keys are dropped, so they do not hold on to the live tables
+
+        Returns the names of the detached tables that were kept
+
+        Arguments
+        ---------
+        conn:
+            A db connection object
+        period_name:
+            Name of the fiscal period
+        drop:
+            Whether to drop the detached partitions instead of keeping them
+        """
+
+        if not self.partitioned:
+            raise ValueError("Only partitioned tables have periods to detach")
+
+        preparer = conn.dialect.identifier_preparer
+
+        detached = []
+
+        for table in (self.signups, self.events):
+            partition_name = f"{table.name}_{period_name}"
+            partition = _format_partition(preparer, table, partition_name)
+
+            conn.execute(
+                text(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"DETACH PARTITION {partition}"
+                )
+            )
+
+            if drop:
+                conn.execute(text(f"DROP TABLE {partition}"))
+                continue
+
+            detached.append(DETACHED_PREFIX + partition_name)
+
+            # Foreign keys of the detached rows would keep reloads from
+            # retiring the referenced tables
+            for constraint_name in self._foreign_keys(conn, partition):
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {partition} "
+                        f"DROP CONSTRAINT {preparer.quote(constraint_name)}"
+                    )
+                )
+
+            # Indexes are named after the partition too, new partitions of the
+            # period would clash with them when a reload moves them in
+            for index_name in self._indexes(conn, partition):
+                conn.execute(
+                    text(
+                        f"ALTER INDEX {_format_partition(preparer, table, index_name)} "
+                        f"RENAME TO {preparer.quote(DETACHED_PREFIX + index_name)}"
+                    )
+                )
+
+            conn.execute(
+                text(
+                    f"ALTER TABLE {partition} RENAME TO {preparer.quote(detached[-1])}"
+                )
+            )
+
+        return detached
+
+    @staticmethod
+    def _foreign_keys(conn: Connection, table_name: str) -> list[str]:
+        """
+        Return the names of the foreign key constraints of a quoted table name
+        """
+
+        return (
+            conn.execute(
+                text(
+                    "SELECT conname FROM pg_constraint "
+                    "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+                ),
+                {"table": table_name},
+            )
+            .scalars()
+            .all()
+        )
+
+    @staticmethod
+    def _indexes(conn: Connection, table_name: str) -> list[str]:
+        """
+        Return the names of the indexes of a quoted table name, including the
+        indexes of its primary key and unique constraints
+        """
+
+        return (
+            conn.execute(
+                text(
+                    "SELECT index.relname FROM pg_index "
+                    "JOIN pg_class AS index ON index.oid = pg_index.indexrelid "
+                    "WHERE pg_index.indrelid = CAST(:table AS regclass)"
+                ),
+                {"table": table_name},
+            )
+            .scalars()
+            .all()
+        )
+
+    @staticmethod
+    def _partitions(conn: Connection, table: Table) -> list[str]:
+        """
+        Return the names of the partitions attached to a table
+        """
+
+        if conn.dialect.name != "postgresql" or not inspect(conn).has_table(
+            table.name, schema=table.schema
+        ):
+            return []
+
+        return (
+            conn.execute(
+                text(
+                    "SELECT child.relname FROM pg_inherits "
+                    "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+                    "WHERE pg_inherits.inhparent = CAST(:parent AS regclass)"
+                ),
+                {"parent": conn.dialect.identifier_preparer.format_table(table)},
+            )
+            .scalars()
+            .all()
+        )
+
+    def create_indexes(
+        self, conn: Connection, metadata: MetaData | None = None
+    ) -> None:
+        """
+        Create the secondary indexes of the tables that do not exist yet
+
+        Indexes serve the period range filters on Events.date_event and the
+        joins of Signups to events, jobs and names in the analysis queries
+
+        Arguments
+        ---------
+        conn:
+            A db connection object
+        metadata:
+            Optional metadata of the tables, by default the live tables
+        """
+
+        if metadata is None:
+            metadata = self.metadata
+
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+    def reload(
+        self,
+        df_names: pd.DataFrame,
+        df_events: pd.DataFrame,
+        df_jobs: pd.DataFrame,
+        df_signups: pd.DataFrame,
+        df_periods: pd.DataFrame | None = None,
+    ) -> dict[str, float]:
+        """
+        Reload all tables without exposing readers to missing or partial tables
+
+        Shadow copies of the tables are created and filled in a staging schema
+        and their indexes and aggregates are built after loading. The shadow
+        tables and aggregates then replace the live ones in a single
+        transaction, so readers only wait for the swap instead of the whole
+        load and never find the aggregates missing.
+        Dialects without transactional schema changes use _create_tables
+
+        Returns a dictionary of (table name, rows per second) pairs
+
+        Arguments
+        ---------
+        df_names, df_events, df_jobs, df_signups:
+            Dataframes in the format produced for _create_tables
+        df_periods:
+            Optional dataframe of fiscal periods, by default default_periods
+        """
+
+        if self.engine.dialect.name != "postgresql":
+            logger.warning(
+                "Atomic reload is not supported on %s, recreating tables in place",
+                self.engine.dialect.name,
+            )
+            return self._create_tables(
+                df_names, df_events, df_jobs, df_signups, df_periods
+            )
+
+        if df_periods is None:
+            df_periods = default_periods()
+
+        staging_metadata = MetaData(schema=STAGING_SCHEMA)
+        staging_tables = self._define_tables(staging_metadata, self.partitioned)
+
+        # Aggregates without the AggregateVersions table, which is not reloaded
+        staging_aggregates = self._define_aggregates(MetaData(schema=STAGING_SCHEMA))
+        staging_queries = self._aggregate_queries(
+            staging_tables, staging_aggregates[:3]
+        )
+
+        self._warn_outside_periods(df_events, df_periods)
+        df_signups = self._with_event_dates(df_signups, df_events)
+
+        load_rates = {}
+
+        # Fill the shadow tables while the live tables stay readable
+        with self.engine.begin() as conn:
+            self._drop_schema(conn, STAGING_SCHEMA)
+            conn.execute(CreateSchema(STAGING_SCHEMA))
+
+            for table in staging_metadata.sorted_tables:
+                conn.execute(CreateTable(table))
+
+            self.attach_periods(conn, df_periods, staging_metadata)
+
+            for db_data, table in zip(
+                (df_names, df_events, df_jobs, df_signups, df_periods), staging_tables
+            ):
+                load_rates[table.name] = self.bulk_load(conn, table, db_data)
+
+            # Building indexes after loading avoids maintaining them per row
+            self.create_indexes(conn, staging_metadata)
+
+            for aggregate, query in staging_queries.items():
+                _create_materialized_view(conn, aggregate, query)
+
+        self._swap_in(staging_metadata, list(staging_queries))
+
+        return load_rates
+
+    def _swap_in(
+        self, staging_metadata: MetaData, staging_aggregates: list[Table]
+    ) -> None:
+        """
+        Replace the live tables and aggregates with the staging tables and
+        aggregates in one transaction
+
+        The live aggregates depend on the live tables, so they are dropped
+        before the tables are retired. The staging aggregates were computed
+        from the staging tables and are marked fresh
+        """
 
         with self.engine.begin() as conn:
+            preparer = conn.dialect.identifier_preparer
+            live_schema = inspect(conn).default_schema_name
+
+            self._drop_schema(conn, RETIRED_SCHEMA)
+            conn.execute(CreateSchema(RETIRED_SCHEMA))
+
+            _drop_materialized_views(conn, self._aggregate_queries())
+
+            # Foreign keys and indexes move together with their tables,
+            # partitions are moved separately
+            def set_schema(table: Table, schema: str) -> None:
+                for partition_name in self._partitions(conn, table):
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE "
+                            f"{_format_partition(preparer, table, partition_name)} "
+                            f"SET SCHEMA {preparer.quote_schema(schema)}"
+                        )
+                    )
+
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"SET SCHEMA {preparer.quote_schema(schema)}"
+                    )
+                )
+
+            for table in self.metadata.sorted_tables:
+                if inspect(conn).has_table(table.name):
+                    set_schema(table, RETIRED_SCHEMA)
+
+            for table in staging_metadata.sorted_tables:
+                set_schema(table, live_schema)
+
+            # The moved aggregates keep reading the moved tables
+            for aggregate in staging_aggregates:
+                conn.execute(
+                    text(
+                        f"ALTER MATERIALIZED VIEW {preparer.format_table(aggregate)} "
+                        f"SET SCHEMA {preparer.quote_schema(live_schema)}"
+                    )
+                )
+
+            self._drop_schema(conn, RETIRED_SCHEMA)
+            self._drop_schema(conn, STAGING_SCHEMA)
+
+            self._bump_data_version(conn)
+
+            version = self._versions(conn)[DATA_VERSION]
+
+            self._set_versions(
+                conn, {aggregate.name: version for aggregate in staging_aggregates}
+            )
+
+    def _drop_schema(self, conn: Connection, schema: str) -> None:
+        """
+        Drop a staging or retired schema of reload with its tables and
+        aggregates
+
+        Nothing is dropped with CASCADE, so objects depending on the tables
+        from outside the schema keep the schema from being dropped. Raises
+        a RuntimeError before dropping anything if the schema holds relations
+        that reload does not create
+
+        Arguments
+        ---------
+        conn:
+            A db connection object
+        schema:
+            Name of the schema
+        """
+
+        inspector = inspect(conn)
+
+        if schema not in inspector.get_schema_names():
+            return
+
+        # Flat tables are dropped in an order that also suits partitioned ones
+        table_metadata = MetaData(schema=schema)
+        self._define_tables(table_metadata)
+
+        aggregates = self._define_aggregates(MetaData(schema=schema))[:3]
+
+        owned = {table.name for table in (*table_metadata.sorted_tables, *aggregates)}
+        partition_prefixes = tuple(f"{name}_" for name in PARTITIONED_TABLES)
+
+        foreign = sorted(
+            name
+            for name in (
+                *inspector.get_table_names(schema),
+                *inspector.get_view_names(schema),
+                *inspector.get_materialized_view_names(schema),
+            )
+            if name not in owned and not name.startswith(partition_prefixes)
+        )
+
+        if foreign:
+            raise RuntimeError(
+                f"Schema {schema} holds relations not created by reload: {foreign}"
+            )
+
+        _drop_materialized_views(conn, aggregates)
+
+        # Partitions are dropped with their tables
+        table_metadata.drop_all(conn, checkfirst=True)
+
+        conn.execute(DropSchema(schema))
+
+    def ingest_incremental(
+        self,
+        df_names: pd.DataFrame,
+        df_events: pd.DataFrame,
+        df_jobs: pd.DataFrame,
+        df_signups: pd.DataFrame,
+        df_periods: pd.DataFrame | None = None,
+        batch_size: int = 1_000,
+    ) -> dict[str, int]:
+        """
+        Ingest dataframes into existing tables without reloading them
+
+        The dataframes should only hold the seasons that are new or changed
+        since the last load, see loaded_sources, so the cost follows the size
+        of the change instead of the whole history.
+        Rows are matched to existing rows by their natural keys. New rows keep
+        their ids unless another row already uses them, in which case they are
+        inserted with ids following the current maximum id. Changed rows are
+        upserted with ON CONFLICT and unchanged rows are left alone. Rows of
+        partitioned tables whose event date has changed are moved to the
+        partition of the new date.
+        The ids of the given dataframes only need to be consistent between
+        the dataframes, signup foreign keys are remapped to database ids
+
+        Returns a dictionary of (table name, number of new rows) pairs
+
+        Arguments
+        ---------
+        df_names, df_events, df_jobs, df_signups:
+            Dataframes in the format produced for _create_tables
+        df_periods:
+            Optional dataframe of fiscal periods to upsert by period name
+        batch_size:
+            Number of rows sent per upsert statement
+        """
+
+        self.metadata.create_all(self.engine)
+
+        new_row_counts = {}
+
+        df_signups = self._with_event_dates(df_signups, df_events)
+
+        with self.engine.begin() as conn:
+            # Tables created before the index set was added lack its indexes
+            self.create_indexes(conn)
+
+            if df_periods is not None:
+                self.attach_periods(conn, df_periods)
+
+            id_maps = {}
+
+            for df, table in zip(
+                (df_names, df_events, df_jobs), (self.names, self.events, self.jobs)
+            ):
+                id_maps[table.name], new_row_counts[table.name] = self._upsert_rows(
+                    conn, table, df, batch_size
+                )
+
+            # Point signups to the database ids of names, events and jobs
+            df_signups = df_signups.assign(
+                event_id=df_signups["event_id"].map(id_maps["Events"]),
+                job_id=df_signups["job_id"].map(id_maps["Jobs"]),
+                name_id=df_signups["name_id"].map(id_maps["Names"]),
+            )
+
+            _, new_row_counts["Signups"] = self._upsert_rows(
+                conn, self.signups, df_signups, batch_size
+            )
+
+            if df_periods is not None:
+                _, new_row_counts["Periods"] = self._upsert_rows(
+                    conn, self.periods, df_periods, batch_size
+                )
+
+            self._bump_data_version(conn)
+
+        logger.info("Incremental ingest inserted new rows: %s", new_row_counts)
+
+        self.refresh_aggregates()
+
+        return new_row_counts
+
+    def loaded_sources(self, conn: Connection) -> dict[str, str]:
+        """
+        Return (period name, source hash) pairs of the loaded seasons
+
+        The hashes are the season fingerprints stored with the Periods rows,
+        a season whose fingerprint differs from the stored one is new or has
+        changed since it was loaded
+
+        Arguments
+        ---------
+        conn:
+            A db connection object
+        """
+
+        if not inspect(conn).has_table(self.periods.name):
+            return {}
+
+        # Tables loaded before the fingerprints were stored have no hashes
+        columns = {column["name"] for column in inspect(conn).get_columns("Periods")}
+
+        if "source_hash" not in columns:
+            return {}
+
+        return dict(
+            conn.execute(
+                Select(self.periods.c.period_name, self.periods.c.source_hash).where(
+                    self.periods.c.source_hash.is_not(None)
+                )
+            ).all()
+        )
+
+    def _upsert_rows(
+        self, conn: Connection, table: Table, df: pd.DataFrame, batch_size: int
+    ) -> tuple[pd.Series, int]:
+        """
+        Upsert rows of a dataframe into a table by its natural key
+
+        Returns a series mapping the ids of the dataframe to database ids and
+        the number of new rows
+        """
+
+        if conn.dialect.name not in _UPSERT_INSERTS:
+            raise NotImplementedError(
+                f"Incremental ingest is not supported on {conn.dialect.name}"
+            )
+
+        key_columns = list(self.natural_keys[table.name])
+        id_column = table.primary_key.columns.values()[0].name
+
+        partition_columns = [
+            column for column in self.partition_key if column in table.c
+        ]
+
+        df = df.drop_duplicates(subset=key_columns)
+
+        if df.empty:
+            return pd.Series(dtype="int64"), 0
+
+        if len(key_columns) == 1:
+            key_expression = table.c[key_columns[0]]
+            key_values = df[key_columns[0]].tolist()
+        else:
+            key_expression = tuple_(*table.c[tuple(key_columns)])
+            key_values = list(df.loc[:, key_columns].itertuples(False, None))
+
+        # Look up existing ids only for the keys present in the dataframe
+        existing_ids = self._select_in(
+            conn,
+            Select(
+                *table.c[tuple(key_columns)],
+                table.c[id_column],
+                *(
+                    table.c[column].label(f"{column}_loaded")
+                    for column in partition_columns
+                ),
+            ),
+            key_expression,
+            key_values,
+            batch_size,
+        ).astype(df.loc[:, key_columns].dtypes.to_dict())
+
+        df_db = df.merge(
+            existing_ids,
+            on=key_columns,
+            how="left",
+            suffixes=("_source", ""),
+            validate="1:1",
+        )
+
+        is_new = df_db[id_column].isna()
+
+        if partition_columns:
+            self._delete_moved_rows(conn, table, df_db, partition_columns, batch_size)
+
+        source_ids = df_db[f"{id_column}_source"]
+
+        # New rows keep their ids, such as natural key ids, when they are free
+        taken_ids = self._select_in(
+            conn,
+            Select(table.c[id_column]),
+            table.c[id_column],
+            source_ids[is_new].tolist(),
+            batch_size,
+        )[id_column]
+
+        is_taken = is_new & source_ids.isin(taken_ids)
+
+        df_db.loc[is_new & ~is_taken, id_column] = source_ids[is_new & ~is_taken]
+
+        # Assign ids following the current maximum to the remaining new rows
+        max_id = conn.execute(Select(func.max(table.c[id_column]))).scalar_one()
+
+        first_new_id = 0 if max_id is None else max_id + 1
+
+        df_db.loc[is_taken, id_column] = range(
+            first_new_id, first_new_id + is_taken.sum()
+        )
+        df_db[id_column] = df_db[id_column].astype("int64")
+
+        id_map = pd.Series(
+            df_db[id_column].to_numpy(), index=df_db[f"{id_column}_source"]
+        )
+
+        df_db = df_db.drop(columns=f"{id_column}_source")
+
+        insert_stmt = _UPSERT_INSERTS[conn.dialect.name](table)
+
+        # Unique constraints of partitioned tables include the partition key
+        conflict_columns = key_columns + partition_columns
+
+        update_columns = [
+            column.name
+            for column in table.columns
+            if column.name not in conflict_columns
+            and column.name != id_column
+            and column.name in df_db
+        ]
+
+        if update_columns:
+            # Only rewrite rows whose values have changed
+            upsert_stmt = insert_stmt.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={
+                    column: insert_stmt.excluded[column] for column in update_columns
+                },
+                where=or_(
+                    *(
+                        table.c[column].is_distinct_from(insert_stmt.excluded[column])
+                        for column in update_columns
+                    )
+                ),
+            )
+        else:
+            upsert_stmt = insert_stmt.on_conflict_do_nothing(
+                index_elements=conflict_columns
+            )
+
+        columns = [column.name for column in table.columns if column.name in df_db]
+
+        for batch_start in range(0, len(df_db), batch_size):
+            batch = df_db.loc[:, columns].iloc[batch_start : batch_start + batch_size]
+            batch = batch.astype(object).where(batch.notna(), None)
+
+            conn.execute(upsert_stmt, batch.to_dict(orient="records"))
+
+        return id_map, int(is_new.sum())
+
+    @staticmethod
+    def _delete_moved_rows(
+        conn: Connection,
+        table: Table,
+        df_db: pd.DataFrame,
+        partition_columns: list[str],
+        batch_size: int,
+    ) -> None:
+        """
+        Delete the loaded rows whose partition key values have changed, the
+        upsert then inserts them with their ids into their new partitions
+
+        The loaded values are read from the {column}_loaded columns of df_db,
+        which are removed
+        """
+
+        id_column = table.primary_key.columns.values()[0].name
+
+        loaded_columns = [f"{column}_loaded" for column in partition_columns]
+
+        is_moved = pd.Series(False, index=df_db.index)
+
+        for column, loaded_column in zip(partition_columns, loaded_columns):
+            is_moved |= df_db[loaded_column].notna() & (
+                pd.to_datetime(df_db[column]) != pd.to_datetime(df_db[loaded_column])
+            )
+
+        moved_ids = df_db.loc[is_moved, id_column].astype("int64").tolist()
+
+        for batch_start in range(0, len(moved_ids), batch_size):
             conn.execute(
-                Insert(self.periods),
-                [
-                    {
-                        "id_period": 1,
-                        "period_name": "2021-2022",
-                        "start_date": pd.Timestamp(year=2021, month=7, day=1),
-                        "end_date": pd.Timestamp(year=2022, month=6, day=30),
-                    },
-                    {
-                        "id_period": 2,
-                        "period_name": "2022-2023",
-                        "start_date": pd.Timestamp(year=2022, month=7, day=1),
-                        "end_date": pd.Timestamp(year=2023, month=6, day=30),
-                    },
-                    {
-                        "id_period": 3,
-                        "period_name": "2023-2024",
-                        "start_date": pd.Timestamp(year=2023, month=7, day=1),
-                        "end_date": pd.Timestamp(year=2024, month=6, day=30),
-                    },
-                ],
+                Delete(table).where(
+                    table.c[id_column].in_(
+                        moved_ids[batch_start : batch_start + batch_size]
+                    )
+                )
             )
+
+        df_db.drop(columns=loaded_columns, inplace=True)
+
+    @staticmethod
+    def _select_in(
+        conn: Connection,
+        stmt: Select,
+        expression,
+        values: list,
+        batch_size: int,
+    ) -> pd.DataFrame:
+        """
+        Execute a select restricted to rows where expression is in values,
+        sending at most batch_size values per statement
+        """
+
+        if not values:
+            return pd.read_sql(stmt.limit(0), conn)
+
+        return pd.concat(
+            [
+                pd.read_sql(
+                    stmt.where(
+                        expression.in_(values[batch_start : batch_start + batch_size])
+                    ),
+                    conn,
+                )
+                for batch_start in range(0, len(values), batch_size)
+            ],
+            ignore_index=True,
+        )
+
+    def bulk_load(
+        self,
+        conn: Connection,
+        table: Table,
+        df: pd.DataFrame,
+        batch_size: int = 1_000,
+    ) -> float:
+        """
+        Load a dataframe into a table and return the achieved rows per second
+
+        On Postgres with psycopg2 the rows are streamed with COPY FROM STDIN,
+        other dialects fall back to batched multi-row inserts
+
+        Arguments
+        ---------
+        conn:
+            A db connection object
+        table:
+            A SQLAlchemy Table to load into
+        df:
+            A dataframe whose columns are a subset of the table columns
+        batch_size:
+            Number of rows serialized or inserted at a time
+        """
+
+        columns = [column.name for column in table.columns if column.name in df]
+
+        start = time.perf_counter()
+
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+            self._copy_from_dataframe(conn, table, df.loc[:, columns], batch_size)
+        else:
+            self._insert_batches(conn, table, df.loc[:, columns], batch_size)
+
+        elapsed = time.perf_counter() - start
+
+        rows_per_sec = len(df) / elapsed if elapsed > 0 else float("inf")
+
+        logger.info(
+            "Loaded %d rows into %s in %.3f s (%.0f rows/s)",
+            len(df),
+            table.name,
+            elapsed,
+            rows_per_sec,
+        )
+
+        return rows_per_sec
+
+    @staticmethod
+    def _copy_from_dataframe(
+        conn: Connection, table: Table, df: pd.DataFrame, batch_size: int
+    ) -> None:
+        preparer = conn.dialect.identifier_preparer
+
+        columns = ", ".join(preparer.quote(column) for column in df.columns)
+
+        copy_stmt = (
+            f"COPY {preparer.format_table(table)} ({columns}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+        )
+
+        # Use the DBAPI cursor of the current transaction
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(copy_stmt, _CSVBatchReader(df, batch_size))
+
+    @staticmethod
+    def _insert_batches(
+        conn: Connection, table: Table, df: pd.DataFrame, batch_size: int
+    ) -> None:
+        for batch_start in range(0, len(df), batch_size):
+            batch = df.iloc[batch_start : batch_start + batch_size].astype(object)
+
+            # Missing values are inserted as NULL
+            batch = batch.where(batch.notna(), None)
+
+            rows = [dict(zip(batch.columns, row)) for row in batch.itertuples(False)]
+
+            conn.execute(Insert(table).values(rows))
+
+
+def _create_materialized_view(
+    conn: Connection, aggregate: Table, query: Select
+) -> None:
+    """
+    Create the materialized view of an aggregate with the unique index on its
+    primary key that concurrent refreshes require
+    """
+
+    preparer = conn.dialect.identifier_preparer
+
+    name = preparer.format_table(aggregate)
+
+    compiled_query = query.compile(
+        dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+    )
+    key_columns = ", ".join(
+        preparer.quote(column.name) for column in aggregate.primary_key.columns
+    )
+
+    conn.execute(text(f"CREATE MATERIALIZED VIEW {name} AS {compiled_query}"))
+    conn.execute(
+        text(
+            f"CREATE UNIQUE INDEX {preparer.quote(f'ix_{aggregate.name}')} "
+            f"ON {name} ({key_columns})"
+        )
+    )
+
+
+def _drop_materialized_views(conn: Connection, aggregates: Iterable[Table]) -> None:
+    """
+    Drop the materialized views of aggregates that exist
+    """
+
+    preparer = conn.dialect.identifier_preparer
+
+    for aggregate in aggregates:
+        conn.execute(
+            text(f"DROP MATERIALIZED VIEW IF EXISTS {preparer.format_table(aggregate)}")
+        )
+
+
+def _format_partition(preparer, table: Table, partition_name: str) -> str:
+    """
+    Quote the name of a partition in the schema of its table
+    """
+
+    if table.schema is None:
+        return preparer.quote(partition_name)
+
+    return f"{preparer.quote_schema(table.schema)}.{preparer.quote(partition_name)}"
+
+
+def _partition_ddl(
+    preparer,
+    table: Table,
+    partition_name: str,
+    start_date: pd.Timestamp | None = None,
+    end_date: pd.Timestamp | None = None,
+) -> str:
+    """
+    Build the statement creating the partition of a period, or the default
+    partition without dates
+
+    Range partition bounds exclude their upper bound, so the partition ends
+    the day after the inclusive end date of the period
+    """
+
+    if start_date is None:
+        bounds = "DEFAULT"
+    else:
+        bounds = (
+            f"FOR VALUES FROM ('{pd.Timestamp(start_date):%Y-%m-%d}') "
+            f"TO ('{pd.Timestamp(end_date) + pd.Timedelta(days=1):%Y-%m-%d}')"
+        )
+
+    return (
+        f"CREATE TABLE {_format_partition(preparer, table, partition_name)} "
+        f"PARTITION OF {preparer.format_table(table)} {bounds}"
+    )
+
+
+class _CSVBatchReader(io.RawIOBase):
+    """
+    Read-only file object serializing a dataframe to csv one batch at a time
+
+    Missing values are written as COPY_NULL, so empty strings stay empty
+    strings instead of becoming NULL
+
+    Arguments
+    ---------
+    df:
+        A dataframe to serialize without header and index
+    batch_size:
+        Number of rows serialized at a time
+    """
+
+    def __init__(self, df: pd.DataFrame, batch_size: int) -> None:
+        self.df = df
+        self.batch_size = batch_size
+        self.position = 0
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while (
+            size < 0 or len(self.buffer) - self.offset < size
+        ) and self.position < len(self.df):
+            batch = self.df.iloc[self.position : self.position + self.batch_size]
+
+            self.buffer += batch.to_csv(
+                header=False, index=False, na_rep=COPY_NULL
+            ).encode()
+            self.position += self.batch_size
+
+        if size < 0:
+            size = len(self.buffer) - self.offset
+
+        data = bytes(self.buffer[self.offset : self.offset + size])
+        self.offset += len(data)
+
+        # Drop the bytes already read once they outweigh the unread ones, so
+        # each byte is moved a bounded number of times
+        if self.offset > len(self.buffer) - self.offset:
+            del self.buffer[: self.offset]
+            self.offset = 0
+
+        return data
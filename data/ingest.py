@@ -0,0 +1,318 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from numpy import nan
+
+import data.preprocess_utils as utils
+from data.cache import PreprocessCache
+from data.poll_batch import PollBatch
+from data.profiling import SourceProfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANIFEST = Path(__file__).parent / "seasons.json"
+
+SEASON_SOURCES = ("spreadsheet", "telegram")
+
+# Version of the preprocessed format, cached sources of other versions are not used
+PREPROCESS_FORMAT = 4
+
+
+def load_manifest(path: str | Path = DEFAULT_MANIFEST) -> list[dict]:
+    """
+    Load season definitions from a json manifest
+
+    Each season has a period_name, start_date, end_date, source and path.
+    Spreadsheet seasons may define filter, replace and rename parameters of
+    preprocess_event_csv, where null replacement values denote missing values.
+    Telegram seasons define output, categories, event_substrings and
+    optionally drop_events. Relative paths are resolved against the directory
+    of the manifest
+
+    Arguments
+    ---------
+    path:
+        Path to the manifest file
+    """
+
+    path = Path(path)
+
+    with open(path) as manifest_file:
+        seasons = json.load(manifest_file)["seasons"]
+
+    for season in seasons:
+        for key in ("period_name", "start_date", "end_date", "source", "path"):
+            if key not in season:
+                raise ValueError(f"Season is missing {key}: {season}")
+
+        if season["source"] not in SEASON_SOURCES:
+            raise ValueError(f"Unknown season source: {season['source']}")
+
+        for key in ("path", "output"):
+            if key in season:
+                season[key] = str(path.parent / season[key])
+
+        if "replace" in season:
+            season["replace"] = {
+                column: {
+                    value: nan if replacement is None else replacement
+                    for value, replacement in replacements.items()
+                }
+                for column, replacements in season["replace"].items()
+            }
+
+    return seasons
+
+
+def _preprocess_spreadsheet(season: dict) -> pd.DataFrame:
+    profile = SourceProfile()
+
+    responses = utils.preprocess_event_csv(
+        season["path"],
+        season.get("filter"),
+        season.get("replace"),
+        season.get("rename"),
+        profile=profile,
+    )
+
+    # The profile is cached and sent between processes with the responses
+    responses.attrs["profile"] = profile.to_dict()
+
+    return responses
+
+
+def _preprocess_telegram(season: dict) -> pd.DataFrame:
+    return (
+        PollBatch.from_json(season["path"])
+        .nonempty()
+        .event_polls(season["event_substrings"])
+        .to_frame(season["categories"])
+    )
+
+
+def _cache_params(season: dict, keys: tuple[str, ...]) -> dict:
+    return {"source": season["source"], "format": PREPROCESS_FORMAT} | {
+        key: season.get(key) for key in keys
+    }
+
+
+def season_fingerprint(
+    season: dict, dependencies: Iterable[str | Path] = ()
+) -> str | None:
+    """
+    Return a fingerprint of the source, the definition and the preprocessing
+    format of a season, or None when its source is missing
+
+    Seasons with unchanged fingerprints give the same rows, so incremental
+    ingest leaves them out
+
+    Arguments
+    ---------
+    season:
+        A season dictionary from load_manifest
+    dependencies:
+        Paths to other files the rows of every season depend on, such as the
+        name mapping table, missing files are skipped
+    """
+
+    if not os.path.exists(season["path"]):
+        return None
+
+    fingerprint = hashlib.sha256(PreprocessCache.file_hash(season["path"]).encode())
+    fingerprint.update(
+        json.dumps(
+            {"season": season, "format": PREPROCESS_FORMAT},
+            sort_keys=True,
+            default=repr,
+        ).encode()
+    )
+
+    for path in dependencies:
+        if os.path.exists(path):
+            fingerprint.update(PreprocessCache.file_hash(path).encode())
+
+    return fingerprint.hexdigest()
+
+
+def changed_seasons(
+    seasons: list[dict], fingerprints: dict[str, str | None], loaded: dict[str, str]
+) -> list[dict]:
+    """
+    Return the seasons whose rows are not loaded as they are now
+
+    Telegram seasons are kept, their output is a csv file instead of rows
+
+    Arguments
+    ---------
+    seasons:
+        A list of season dictionaries from load_manifest
+    fingerprints:
+        Dictionary of (period name, season_fingerprint) pairs
+    loaded:
+        Dictionary of (period name, fingerprint) pairs of the loaded seasons
+    """
+
+    return [
+        season
+        for season in seasons
+        if season["source"] != "spreadsheet"
+        or fingerprints[season["period_name"]] is None
+        or loaded.get(season["period_name"]) != fingerprints[season["period_name"]]
+    ]
+
+
+def process_season(
+    season: dict, cache: PreprocessCache | None = None, compact: bool = False
+) -> pd.DataFrame | None:
+    """
+    Preprocess the source of a single season
+
+    Spreadsheet seasons return their responses in the format of
+    preprocess_event_csv with an additional period_name column and the
+    SourceProfile dictionary of the source in attrs["profile"]. Telegram
+    seasons write their flattened event polls to the output csv file and
+    return None
+
+    Arguments
+    ---------
+    season:
+        A season dictionary from load_manifest
+    cache:
+        Optional cache of preprocessed sources, unchanged sources with
+        unchanged parameters are not parsed again
+    compact:
+        Whether to return string columns as categoricals, see compact_frame
+    """
+
+    match season["source"]:
+        case "spreadsheet":
+            if cache is None:
+                responses = _preprocess_spreadsheet(season)
+            else:
+                responses = cache.get_or_compute(
+                    season["path"],
+                    _cache_params(season, ("filter", "replace", "rename")),
+                    functools.partial(_preprocess_spreadsheet, season),
+                )
+
+            responses = responses.assign(period_name=season["period_name"])
+
+            if compact:
+                responses = utils.compact_frame(responses)
+
+            return responses
+        case "telegram":
+            # The Telegram export is not always available, its output is kept
+            if not os.path.exists(season["path"]) and os.path.exists(season["output"]):
+                logger.info(
+                    "Source of %s not found, keeping %s",
+                    season["period_name"],
+                    season["output"],
+                )
+                return None
+
+            if cache is None:
+                event_data = _preprocess_telegram(season)
+            else:
+                event_data = cache.get_or_compute(
+                    season["path"],
+                    _cache_params(season, ("categories", "event_substrings")),
+                    functools.partial(_preprocess_telegram, season),
+                )
+
+            is_event_to_drop = event_data["name_event"].isin(
+                season.get("drop_events", [])
+            )
+
+            event_data.loc[~is_event_to_drop, :].to_csv(season["output"], index=False)
+
+            return None
+
+
+def preprocess_seasons(
+    seasons: list[dict],
+    max_workers: int | None = None,
+    cache: PreprocessCache | None = None,
+    compact: bool = False,
+    profiles: dict[str, dict] | None = None,
+) -> pd.DataFrame:
+    """
+    Preprocess all seasons in a process pool and merge their responses
+
+    Responses are concatenated in manifest order regardless of which
+    season finishes first, so the merged result is deterministic
+
+    Arguments
+    ---------
+    seasons:
+        A list of season dictionaries from load_manifest
+    max_workers:
+        Number of worker processes, by default one per season up to the
+        number of CPUs. With a single worker seasons are processed in-process
+    cache:
+        Optional cache of preprocessed sources, evicted to its size limit
+        after all seasons are processed
+    compact:
+        Whether to keep string columns as categoricals sharing one dictionary
+        per column across seasons
+    profiles:
+        Optional dictionary filled with (period name, profile dictionary)
+        pairs of the spreadsheet seasons, gathered while preprocessing
+    """
+
+    process = functools.partial(process_season, cache=cache, compact=compact)
+
+    if max_workers is None:
+        max_workers = min(len(seasons), os.cpu_count() or 1)
+
+    if max_workers <= 1:
+        results = [process(season) for season in seasons]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(process, seasons))
+
+    if cache is not None:
+        cache.evict()
+
+    if profiles is not None:
+        # Seasons without responses are profiled as well
+        for season, result in zip(seasons, results):
+            if result is not None:
+                profiles[season["period_name"]] = result.attrs.get("profile")
+
+    results = [result for result in results if result is not None]
+
+    if compact:
+        return utils.concat_categoricals(results)
+
+    return pd.concat(results)
+
+
+def season_periods(seasons: list[dict]) -> pd.DataFrame:
+    """
+    Build the Periods table rows of all seasons ordered by start date
+
+    Arguments
+    ---------
+    seasons:
+        A list of season dictionaries from load_manifest
+    """
+
+    periods = pd.DataFrame(
+        {
+            "period_name": [season["period_name"] for season in seasons],
+            "start_date": pd.to_datetime([season["start_date"] for season in seasons]),
+            "end_date": pd.to_datetime([season["end_date"] for season in seasons]),
+        }
+    ).sort_values("start_date", ignore_index=True)
+
+    periods.insert(0, "id_period", periods.index + 1)
+
+    return periods
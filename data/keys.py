@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from data.answers import parse_answers
+from data.time_windows import parse_time_windows
+
+# Ids are masked to fit a signed 64-bit integer column
+ID_MASK = np.uint64(2**63 - 1)
+
+EVENT_COLNAMES = {
+    "Keikka": "name_event",
+    "Paikka": "location_event",
+    "Päiväys": "date_event",
+    "Kuvaus": "description_event",
+}
+
+NAME_COLNAMES = {"Nimi": "name_tech"}
+
+JOB_COLNAMES = {"Homma": "name_job"}
+
+# Columns of the natural key of each table, shared by the ids derived here and
+# the unique constraints and upserts of EventDataBase. Events are rows of the
+# first response of each event name, so the name alone identifies them and
+# corrected dates or locations keep their ids. Events lasting several days
+# have signups for the same job on each day, so signups are keyed by the day
+# of the event counted from its first date, which a corrected event date
+# leaves alone. Time windows are left out, unparsed windows are NULL and NULL
+# keys never match an existing row
+EVENT_KEY = ["name_event"]
+NAME_KEY = ["name_tech"]
+JOB_KEY = ["name_job"]
+SIGNUP_KEY = ["event_id", "job_id", "name_id", "event_day"]
+
+
+def natural_key_ids(df: pd.DataFrame, key_columns: list[str]) -> np.ndarray:
+    """
+    Derive deterministic ids from the natural key columns of a dataframe
+
+    The ids only depend on the key values, not on the row order or on other
+    rows, so separately loaded dataframes agree on the ids of shared rows
+
+    Arguments
+    ---------
+    df:
+        A pandas dataframe without duplicate natural keys
+    key_columns:
+        List of columns forming the natural key
+    """
+
+    hashes = pd.util.hash_pandas_object(df.loc[:, key_columns], index=False)
+
+    ids = (hashes.to_numpy() & ID_MASK).astype(np.int64)
+
+    if pd.Series(ids).duplicated().any():
+        raise ValueError(f"Natural key ids of {key_columns} collide")
+
+    return ids
+
+
+def _dimension(
+    responses: pd.DataFrame,
+    colnames: dict[str, str],
+    id_name: str,
+    key_columns: list[str],
+) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Build the rows of a dimension table from the first response of each value
+    of its first column
+
+    Returns the table rows and the id of each response
+    """
+
+    group_column = next(iter(colnames))
+
+    codes, _ = pd.factorize(responses[group_column], use_na_sentinel=False)
+
+    # Factorized codes follow the order of first occurrence
+    is_first = ~responses[group_column].duplicated().to_numpy()
+
+    df = (
+        responses.loc[is_first, list(colnames)]
+        .rename(columns=colnames)
+        .reset_index(drop=True)
+    )
+
+    ids = natural_key_ids(df, key_columns)
+
+    df.insert(0, id_name, ids)
+
+    return df, ids[codes]
+
+
+def assign_keys(
+    events_responses: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Split merged responses into Names, Events, Jobs and Signups table rows
+
+    Ids are derived from natural keys with natural_key_ids: events,
+    technicians and jobs from their names and signups from their event, job
+    and technician ids and the day of the event. Events are described by the
+    first response of each event name. Signups include the answer columns of
+    parse_answers and the time window columns of parse_time_windows counted
+    from the date of the event
+
+    Arguments
+    ---------
+    events_responses:
+        Merged responses from preprocess_seasons
+    """
+
+    events, event_ids = _dimension(
+        events_responses, EVENT_COLNAMES, "id_event", EVENT_KEY
+    )
+    names, name_ids = _dimension(events_responses, NAME_COLNAMES, "id_name", NAME_KEY)
+    jobs, job_ids = _dimension(events_responses, JOB_COLNAMES, "id_job", JOB_KEY)
+
+    windows = parse_time_windows(events_responses["Aikaikkuna"])
+
+    # Windows are relative to the date of the response, events to their first date
+    event_dates = events_responses.groupby("Keikka", observed=True, sort=False)[
+        "Päiväys"
+    ].transform("first")
+    event_days = (events_responses["Päiväys"] - event_dates).dt.days
+
+    windows = windows.add(event_days.to_numpy() * 24 * 60, axis=0).astype("Int32")
+
+    signups = pd.DataFrame(
+        {
+            "event_id": event_ids,
+            "name_id": name_ids,
+            "job_id": job_ids,
+            "event_day": event_days.astype("int16").array,
+            "answer": events_responses["Vastaus"].array,
+            "start_minute": windows["start_minute"].array,
+            "end_minute": windows["end_minute"].array,
+        }
+    )
+
+    # Sources can repeat the same responses, such as seasons sharing a sheet.
+    # A technician can sign up only once for each job and day of an event
+    signups = signups.drop_duplicates(subset=SIGNUP_KEY, ignore_index=True)
+
+    signups.insert(0, "id_signup", natural_key_ids(signups, SIGNUP_KEY))
+
+    signups = signups.join(parse_answers(signups["answer"]))
+
+    return names, events, jobs, signups
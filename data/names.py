@@ -0,0 +1,35 @@
+import re
+import unicodedata
+
+# Years appended to normalized event names, such as "wedding 2021 2021"
+_YEAR_SUFFIX = re.compile(r"(?: \d{4})+$")
+
+
+def normalize_name(name: str) -> str:
+    """
+    Lowercase a name, strip accents and replace punctuation with single spaces
+
+    Arguments
+    ---------
+    name:
+        A name to normalize
+    """
+
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+
+    return " ".join(re.sub(r"[\W_]+", " ", name.lower()).split())
+
+
+def normalize_event_name(name: str) -> str:
+    """
+    Normalize an event name with normalize_name and remove the years appended
+    to it, which many event names share
+
+    Arguments
+    ---------
+    name:
+        An event name to normalize
+    """
+
+    return _YEAR_SUFFIX.sub("", normalize_name(name))
@@ -0,0 +1,251 @@
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+import data.preprocess_utils as utils
+
+
+class PollBatch:
+    """
+    Columnar batch of Telegram polls
+
+    Poll fields are stored in arrays with one element per poll. The answers of
+    all polls are flattened into arrays, the answers of poll i are found at
+    positions answer_offsets[i]:answer_offsets[i + 1]
+
+    Arguments
+    ---------
+    date:
+        Array of poll message timestamps
+    question:
+        Array of poll questions
+    total_voters:
+        Array of voter counts of each poll
+    answer_text:
+        Flattened array of answer texts
+    answer_voters:
+        Flattened array of answer voter counts
+    answer_offsets:
+        Array of answer offsets of each poll, with one extra element at the end
+    """
+
+    def __init__(
+        self,
+        date: np.ndarray,
+        question: np.ndarray,
+        total_voters: np.ndarray,
+        answer_text: np.ndarray,
+        answer_voters: np.ndarray,
+        answer_offsets: np.ndarray,
+    ) -> None:
+        self.date = date
+        self.question = question
+        self.total_voters = total_voters
+        self.answer_text = answer_text
+        self.answer_voters = answer_voters
+        self.answer_offsets = answer_offsets
+
+    @classmethod
+    def from_polls(cls, poll_dicts: Iterable[dict]) -> "PollBatch":
+        """
+        Build a batch from poll dictionaries generated by extract_poll_results
+
+        Arguments
+        ---------
+        poll_dicts
+            An iterable containing poll dictionaries, consumed once
+        """
+
+        date, question, total_voters = [], [], []
+        answer_text, answer_voters, answer_counts = [], [], []
+
+        for poll_dict in poll_dicts:
+            date.append(poll_dict["date"])
+            question.append(poll_dict["question"])
+            total_voters.append(poll_dict["total_voters"])
+            answer_counts.append(len(poll_dict["answers"]))
+
+            for answer in poll_dict["answers"]:
+                answer_text.append(answer["text"])
+                answer_voters.append(answer["voters"])
+
+        return cls(
+            np.array(date, dtype=object),
+            np.array(question, dtype=object),
+            np.array(total_voters, dtype=np.int64),
+            np.array(answer_text, dtype=object),
+            np.array(answer_voters, dtype=np.int64),
+            np.concatenate(([0], np.cumsum(answer_counts, dtype=np.int64))),
+        )
+
+    @classmethod
+    def from_json(cls, msgs_json: str) -> "PollBatch":
+        """
+        Build a batch from all polls of a Telegram message json file
+
+        Arguments
+        ---------
+        msgs_json
+            Path to the json file
+        """
+
+        return cls.from_polls(utils.iter_poll_messages(msgs_json))
+
+    def __len__(self) -> int:
+        return len(self.question)
+
+    def _answer_poll_index(self) -> np.ndarray:
+        """
+        Position of the poll of each answer
+        """
+
+        return np.repeat(np.arange(len(self)), np.diff(self.answer_offsets))
+
+    def _sum_per_poll(self, answer_values: np.ndarray) -> np.ndarray:
+        return np.bincount(
+            self._answer_poll_index(), weights=answer_values, minlength=len(self)
+        )
+
+    def take(self, mask: np.ndarray) -> "PollBatch":
+        """
+        Select polls with a boolean mask
+
+        Arguments
+        ---------
+        mask
+            A boolean array with one element per poll
+        """
+
+        answer_mask = mask[self._answer_poll_index()]
+
+        answer_counts = np.diff(self.answer_offsets)[mask]
+
+        return PollBatch(
+            self.date[mask],
+            self.question[mask],
+            self.total_voters[mask],
+            self.answer_text[answer_mask],
+            self.answer_voters[answer_mask],
+            np.concatenate(([0], np.cumsum(answer_counts, dtype=np.int64))),
+        )
+
+    def nonempty(self) -> "PollBatch":
+        """
+        Select polls where at least one answer has voters
+        """
+
+        return self.take(self._sum_per_poll(self.answer_voters) > 0)
+
+    def event_polls(
+        self, substrings: Iterable[str] | utils.SubstringMatcher
+    ) -> "PollBatch":
+        """
+        Select event registration polls, see is_not_event_poll
+
+        Arguments
+        ---------
+        substrings
+            An iterable containing substrings that determine event polls
+            or a SubstringMatcher built from them
+        """
+
+        if isinstance(substrings, utils.SubstringMatcher):
+            matcher = substrings
+        else:
+            matcher = utils.SubstringMatcher(substrings)
+
+        # Each distinct answer text is matched only once
+        codes, uniques = pd.factorize(self.answer_text)
+
+        is_event_answer = np.array(
+            [matcher.search(answer.lower().strip()) for answer in uniques], dtype=bool
+        )[codes]
+
+        return self.take(self._sum_per_poll(is_event_answer) > 0)
+
+    def category_counts(self, substr_category_dict: dict[str, str]) -> pd.DataFrame:
+        """
+        Sum answer voters of each poll by answer category
+
+        Categories are ordered as in substr_category_dict and only categories
+        matching at least one answer are included
+
+        Arguments
+        ---------
+        substr_category_dict
+            Dictionary mapping substrings to categories
+        """
+
+        codes, uniques = pd.factorize(self.answer_text)
+
+        answer_cat_dict = utils.answer_to_category_dict(
+            set(uniques), substr_category_dict
+        )
+
+        unique_categories = pd.Series([answer_cat_dict[answer] for answer in uniques])
+
+        categories = [
+            category
+            for category in dict.fromkeys(substr_category_dict.values())
+            if category in set(unique_categories)
+        ]
+
+        # Category position of each answer, -1 for answers without a category
+        category_codes = (
+            pd.Categorical(unique_categories, categories=categories).codes[codes]
+            if len(uniques) > 0
+            else np.zeros(0, dtype=np.int64)
+        )
+
+        has_category = category_codes >= 0
+
+        counts = np.bincount(
+            self._answer_poll_index()[has_category] * len(categories)
+            + category_codes[has_category],
+            weights=self.answer_voters[has_category],
+            minlength=len(self) * len(categories),
+        )
+
+        return pd.DataFrame(
+            counts.reshape(len(self), len(categories)).astype(np.int64),
+            columns=categories,
+        )
+
+    def to_frame(self, substr_category_dict: dict[str, str]) -> pd.DataFrame:
+        """
+        Transform the batch into a dataframe with one row per poll
+
+        The result has the columns of flattened polls after update_event_names:
+        poll_date, date_event, name_event, signup_count and the answer categories
+
+        Arguments
+        ---------
+        substr_category_dict
+            Dictionary mapping substrings to categories
+        """
+
+        question = pd.Series(self.question, dtype=object)
+        poll_date = pd.Series(self.date, dtype=object)
+
+        # The event name ends where the first day.month date starts
+        name_date = question.str.extract(
+            r"(?s)^(?P<name>.*?)(?P<date>\d{1,2}\.\d{1,2})"
+        )
+
+        has_date = name_date["date"].notna()
+
+        name_event = question.where(~has_date, name_date["name"].str.strip())
+
+        date_event = name_date["date"].str.cat(poll_date.str[:4], sep=".")
+
+        df = pd.DataFrame(
+            {
+                "poll_date": poll_date,
+                "date_event": date_event,
+                "name_event": name_event,
+                "signup_count": self.total_voters,
+            }
+        )
+
+        return pd.concat((df, self.category_counts(substr_category_dict)), axis=1)
@@ -1,15 +1,31 @@
 import re
 import json
-from collections.abc import Iterable
+import functools
+import logging
+from collections.abc import Iterable, Iterator
+from typing import TextIO
 
+import numpy as np
 import pandas as pd
 
+from data.date_utils import parse_dates
+from data.profiling import SourceProfile
+
+logger = logging.getLogger(__name__)
+
+FILL_COLUMNS = ["Keikka", "Paikka", "Päiväys", "Kuvaus"]
+
+# Event columns of the spreadsheet, the other named columns are technicians
+EVENT_COLUMNS = ["Keikka", "Paikka", "Päiväys", "Aikaikkuna", "Homma", "Kuvaus"]
+
 
 def preprocess_event_csv(
     path_to_csv: str,
     filter: dict[str, Iterable[str]] | None = None,
     replace_dict: dict[str, dict[str, str]] | None = None,
     column_rename: dict[str, str] | None = None,
+    compact: bool = False,
+    profile: SourceProfile | None = None,
 ) -> pd.DataFrame:
     """
     Preprocess event data csv file to the desired format
@@ -25,21 +41,115 @@ def preprocess_event_csv(
         a replacement value for a given value inside a given column
     column_rename
         A dictionary specifying (column_old, column_new) label pairs
+    compact
+        Whether to return string columns as categoricals, see compact_frame
+    profile
+        Optional SourceProfile updated while preprocessing
     """
 
     df = pd.read_csv(path_to_csv)
 
+    df_proc = _prepare_event_rows(df, replace_dict, column_rename, profile)
+
+    # Fill relevant columns
+    df_proc.loc[:, FILL_COLUMNS] = df_proc.loc[:, FILL_COLUMNS].ffill(axis=0)
+
+    df_responses = _event_rows_to_responses(df_proc, filter, profile)
+
+    if compact:
+        df_responses = compact_frame(df_responses)
+
+    return df_responses
+
+
+def preprocess_event_csv_chunked(
+    path_to_csv: str,
+    filter: dict[str, Iterable[str]] | None = None,
+    replace_dict: dict[str, dict[str, str]] | None = None,
+    column_rename: dict[str, str] | None = None,
+    chunksize: int = 10_000,
+    profile: SourceProfile | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Preprocess event data csv file in row chunks, yielding response batches
+
+    Peak memory depends on chunksize instead of the size of the file.
+    The forward fill of event columns is carried across chunk boundaries,
+    so concatenating the batches gives the same responses as
+    preprocess_event_csv up to row order and index
+
+    Arguments
+    ---------
+    path_to_csv:
+        A string specifying the path to the event csv file
+    filter:
+        A dictionary containing (column name, values) pairs to filter out rows
+    replace_dict:
+        A nested dictionary. Outer dict specifies column, inner dict specifies
+        a replacement value for a given value inside a given column
+    column_rename
+        A dictionary specifying (column_old, column_new) label pairs
+    chunksize:
+        Number of spreadsheet rows read per chunk
+    profile:
+        Optional SourceProfile updated while preprocessing each chunk
+    """
+
+    # Last known values of the filled columns from the previous chunk
+    carry = None
+
+    with pd.read_csv(path_to_csv, chunksize=chunksize) as reader:
+        for df in reader:
+            df_proc = _prepare_event_rows(df, replace_dict, column_rename, profile)
+
+            if df_proc.empty:
+                continue
+
+            df_fill = df_proc.loc[:, FILL_COLUMNS].ffill(axis=0)
+
+            # Only leading rows can still be empty after the forward fill
+            if carry is not None:
+                df_fill = df_fill.fillna(carry)
+
+            df_proc[FILL_COLUMNS] = df_fill
+
+            carry = {
+                column: value
+                for column, value in df_fill.iloc[-1].items()
+                if not pd.isna(value)
+            }
+
+            df_responses = _event_rows_to_responses(df_proc, filter, profile)
+
+            if not df_responses.empty:
+                yield df_responses
+
+
+def _prepare_event_rows(
+    df: pd.DataFrame,
+    replace_dict: dict[str, dict[str, str]] | None,
+    column_rename: dict[str, str] | None,
+    profile: SourceProfile | None = None,
+) -> pd.DataFrame:
+    """
+    Drop unnamed columns and empty rows, replace values and rename columns
+    of raw event spreadsheet rows
+    """
+
     df_colNames = df.columns
 
     df_unnamedColumns = df_colNames[df_colNames.str.contains("Unnamed", regex=False)]
 
-    # Drop unnamed columns, unused columns and empty rows
-    df_proc = (
-        df.drop(df_unnamedColumns, axis=1)
-        .drop("Aikaikkuna", axis=1)
-        .dropna(axis=0, how="all", subset="Homma")
+    # Drop unnamed columns and empty rows
+    df_proc = df.drop(df_unnamedColumns, axis=1).dropna(
+        axis=0, how="all", subset="Homma"
     )
 
+    if profile is not None:
+        profile.count("raw_rows", len(df))
+        profile.count("dropped_rows", len(df) - len(df_proc))
+        profile.observe_nulls(df_proc, EVENT_COLUMNS)
+
     # Replace values in each column before forward filling
     if replace_dict is not None:
         df_proc = df_proc.replace(replace_dict)
@@ -48,9 +158,20 @@ def preprocess_event_csv(
     if column_rename is not None:
         df_proc = df_proc.rename(columns=column_rename)
 
-    # Fill relevant columns
-    fillcols = ["Keikka", "Paikka", "Päiväys", "Kuvaus"]
-    df_proc.loc[:, fillcols] = df_proc.loc[:, fillcols].ffill(axis=0)
+    return df_proc
+
+
+def _event_rows_to_responses(
+    df_proc: pd.DataFrame,
+    filter: dict[str, Iterable[str]] | None,
+    profile: SourceProfile | None = None,
+) -> pd.DataFrame:
+    """
+    Filter forward filled event rows and transform them into
+    (Name, Response) pairs
+    """
+
+    n_rows = len(df_proc)
 
     # Filter rows based on column specific values
     if filter is not None:
@@ -60,23 +181,46 @@ def preprocess_event_csv(
 
             df_proc = df_proc.drop(index=index_to_drop)
 
-    # Transform date column to datetime format
-    df_proc["Päiväys"] = pd.to_datetime(
-        df_proc.loc[:, "Päiväys"], dayfirst=True, format="mixed"
-    )
+    if profile is not None:
+        profile.count("filtered_rows", n_rows - len(df_proc))
+
+    # Transform date column to datetime format, rows without a date are dropped
+    dates = parse_dates(df_proc["Päiväys"], errors="coerce")
+    is_unparsed = dates.isna() & df_proc["Päiväys"].notna()
+
+    if is_unparsed.any():
+        logger.warning(
+            "Could not parse %d dates: %s",
+            is_unparsed.sum(),
+            df_proc.loc[is_unparsed, "Päiväys"].value_counts().to_dict(),
+        )
+
+    if profile is not None:
+        profile.count("unparsed_dates", dates.isna().sum())
+
+    df_proc["Päiväys"] = dates
+    df_proc = df_proc.loc[dates.notna()]
 
     # Concatenate year at the end of every event
     df_proc.loc[:, "Keikka"] = df_proc.loc[:, "Keikka"].str.cat(
         df_proc.loc[:, "Päiväys"].dt.year.astype("string"), sep=" "
     )
 
-    # Melt the table into a response format: Name columns are transformed into (Name, Response) pairs
-    # Filter empty responses
-    df_responses = df_proc.melt(
-        id_vars=["Keikka", "Paikka", "Päiväys", "Homma", "Kuvaus"],
+    # Transform the table into a response format: Name columns are transformed
+    # into (Name, Response) pairs, only non-empty responses are kept
+    df_responses = sparse_melt(
+        df_proc,
+        id_vars=EVENT_COLUMNS,
         var_name="Nimi",
         value_name="Vastaus",
-    ).dropna(axis=0, how="all", subset="Vastaus")
+    )
+
+    if profile is not None:
+        profile.observe_responses(df_responses)
+
+    # A chunk of rows may contain no responses at all
+    if df_responses.empty:
+        return df_responses
 
     # Clean the answers
 
@@ -87,6 +231,70 @@ def preprocess_event_csv(
     return df_responses
 
 
+def sparse_melt(
+    df: pd.DataFrame,
+    id_vars: list[str],
+    var_name: str,
+    value_name: str,
+) -> pd.DataFrame:
+    """
+    Melt a wide dataframe into (variable, value) pairs keeping only non-empty values
+
+    The result is equal to melt followed by dropping empty values, including
+    the index, but the long frame is built only from the non-empty cells.
+    Memory is allocated in proportion to the number of non-empty values
+    instead of rows times value columns
+
+    Arguments
+    ---------
+    df:
+        A wide pandas dataframe
+    id_vars:
+        A list of identifier columns
+    var_name:
+        Name of the variable column, containing the labels of the melted columns
+    value_name:
+        Name of the value column
+    """
+
+    value_columns = df.columns.drop(id_vars)
+
+    if len(value_columns) == 0:
+        return df.melt(id_vars=id_vars, var_name=var_name, value_name=value_name)
+
+    n_rows = len(df)
+
+    row_positions = []
+    values = []
+    counts = np.zeros(len(value_columns), dtype=np.int64)
+
+    # Locate non-empty cells column by column
+    for i, column in enumerate(value_columns):
+        column_values = df[column].to_numpy()
+
+        positions = np.flatnonzero(pd.notna(column_values))
+
+        row_positions.append(positions)
+        values.append(column_values[positions])
+        counts[i] = len(positions)
+
+    row_positions = np.concatenate(row_positions)
+
+    # Position of each cell in the melted frame, columns stacked one after another
+    melt_positions = row_positions + np.repeat(
+        np.arange(len(value_columns), dtype=np.int64) * n_rows, counts
+    )
+
+    df_long = df.loc[:, id_vars].take(row_positions)
+
+    df_long[var_name] = np.repeat(value_columns.to_numpy(dtype=object), counts)
+    df_long[value_name] = np.concatenate(values)
+
+    df_long.index = pd.Index(melt_positions)
+
+    return df_long
+
+
 def df_db_preprocessing(
     dataframe: pd.DataFrame,
     colnames: dict[str, str],
@@ -124,6 +332,77 @@ def df_db_preprocessing(
     return df
 
 
+def _narrow_int(values: pd.Series) -> pd.Series:
+    if values.empty:
+        return values.astype(np.int16)
+
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+
+        if info.min <= values.min() and values.max() <= info.max:
+            return values.astype(dtype)
+
+    return values
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert object columns into categoricals and integer columns into
+    the narrowest of int16, int32 and int64
+
+    Categories are sorted, so groupbys and pivots on the codes order their
+    results like on the original strings
+
+    Arguments
+    ---------
+    df
+        A pandas dataframe to be converted
+    """
+
+    converted = {}
+
+    for column, dtype in df.dtypes.items():
+        if pd.api.types.is_object_dtype(dtype):
+            converted[column] = df[column].astype("category")
+        elif pd.api.types.is_integer_dtype(dtype):
+            converted[column] = _narrow_int(df[column])
+
+    return df.assign(**converted)
+
+
+def concat_categoricals(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate dataframes row-wise, keeping columns that are categorical
+    in all dataframes categorical with a shared dictionary
+
+    Arguments
+    ---------
+    frames
+        An iterable containing pandas dataframes
+    """
+
+    frames = list(frames)
+
+    for column in frames[0].columns:
+        columns = [frame[column] for frame in frames if column in frame]
+
+        if len(columns) < len(frames) or not all(
+            isinstance(values.dtype, pd.CategoricalDtype) for values in columns
+        ):
+            continue
+
+        categories = pd.api.types.union_categoricals(
+            columns, sort_categories=True
+        ).categories
+
+        frames = [
+            frame.assign(**{column: frame[column].cat.set_categories(categories)})
+            for frame in frames
+        ]
+
+    return pd.concat(frames)
+
+
 def extract_poll_results(msg_dict: dict) -> dict:
     """
     Extract poll results from a Telegram message dictionary
@@ -165,7 +444,82 @@ def is_empty_poll(poll_dict: dict) -> bool:
     return True
 
 
-def is_not_event_poll(poll_dict: dict, substrings: Iterable[str]) -> bool:
+class SubstringMatcher:
+    """
+    Compiled matcher of substrings given in priority order
+
+    All substrings are searched in a single scan of a compiled regex.
+    When several substrings occur in a text, the one given first wins
+    regardless of its position in the text
+
+    Arguments
+    ---------
+    substrings
+        An iterable of substrings in priority order
+    """
+
+    def __init__(self, substrings: Iterable[str]) -> None:
+        self.substrings = list(substrings)
+
+        alternatives = [re.escape(substring) for substring in self.substrings]
+
+        # Any occurrence of any substring
+        self._any_pattern = re.compile("|".join(alternatives))
+
+        # A zero-width lookahead visits every position, so overlapping occurrences
+        # are found. At a given position alternation order picks the substring
+        # with the highest priority, which the capture group identifies
+        self._priority_pattern = re.compile(
+            "(?=(?:{}))".format("|".join(f"({alt})" for alt in alternatives))
+        )
+
+    def first_match(self, text: str) -> int | None:
+        """
+        Return the index of the highest priority substring occurring in text
+
+        Arguments
+        ---------
+        text
+            A string to search
+        """
+
+        if not self.substrings:
+            return None
+
+        best_index = None
+
+        for match in self._priority_pattern.finditer(text):
+            index = match.lastindex - 1
+
+            if best_index is None or index < best_index:
+                best_index = index
+
+                if best_index == 0:
+                    break
+
+        return best_index
+
+    def search(self, text: str) -> bool:
+        """
+        Return true if any of the substrings occurs in text
+
+        Arguments
+        ---------
+        text
+            A string to search
+        """
+
+        return bool(self.substrings) and self._any_pattern.search(text) is not None
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_matcher(substrings: tuple[str, ...]) -> SubstringMatcher:
+    return SubstringMatcher(substrings)
+
+
+def is_not_event_poll(
+    poll_dict: dict, substrings: Iterable[str] | SubstringMatcher
+) -> bool:
     """
     Returns true if the poll is not an event registeration poll.
     Heuristically every event registeration poll should have choices
@@ -177,12 +531,18 @@ def is_not_event_poll(poll_dict: dict, substrings: Iterable[str]) -> bool:
         A dictionary generated by extract_poll_results
     substrings
         An iterable containing substrings that determine event polls
+        or a SubstringMatcher built from them
     """
 
+    if isinstance(substrings, SubstringMatcher):
+        matcher = substrings
+    else:
+        matcher = _cached_matcher(tuple(substrings))
+
     answers = poll_dict["answers"]
 
     for answer in answers:
-        if any(substr in answer["text"].lower().strip() for substr in substrings):
+        if matcher.search(answer["text"].lower().strip()):
             return False
 
     return True
@@ -223,19 +583,18 @@ def answer_to_category_dict(
 
     answer_cat_dict = {}
 
-    substrings = list(categories.keys())
+    matcher = SubstringMatcher(categories.keys())
+
+    category_values = list(categories.values())
 
     for answer in answer_set:
-        answer_clean = answer.lower().strip()
-        substr_index = next(
-            (i for i, v in enumerate(substrings) if v in answer_clean), None
-        )
+        substr_index = matcher.first_match(answer.lower().strip())
 
         match substr_index is None:
             case True:
                 answer_cat_dict[answer] = None
             case False:
-                answer_cat_dict[answer] = categories[substrings[substr_index]]
+                answer_cat_dict[answer] = category_values[substr_index]
 
     return answer_cat_dict
 
@@ -317,33 +676,170 @@ def extract_flat_event_polls(
         Iterable of substrings used to identify event polls
         If None, all polls are considered event polls
     """
+
+    event_matcher = (
+        SubstringMatcher(event_iden_substrs) if event_iden_substrs is not None else None
+    )
+
+    # Only the non-empty event polls are kept in memory
+    nonempty_event_polls = [
+        poll
+        for poll in iter_poll_messages(msgs_json)
+        if not is_empty_poll(poll)
+        and (
+            event_matcher is None
+            or not is_not_event_poll(poll, substrings=event_matcher)
+        )
+    ]
+
+    answer_cat_dict = answer_to_category_dict(
+        extract_unique_answers(nonempty_event_polls),
+        substr_category_dict,
+    )
+
+    flat_polls = map_poll_answers_to_categories(nonempty_event_polls, answer_cat_dict)
+
+    return flat_polls
+
+
+def iter_poll_messages(msgs_json: str, chunk_size: int = 2**16) -> Iterator[dict]:
+    """
+    Yield poll results from a Telegram message json file one message at a time
+
+    The messages array is parsed incrementally, so memory use does not depend
+    on the size of the export
+
+    Arguments
+    ---------
+    msgs_json
+        Path to the json file
+    chunk_size
+        Number of characters read from the file at a time
+    """
+
     with open(msgs_json) as json_file:
-        general_chat = json.load(json_file)
+        reader = _JSONStreamReader(json_file, chunk_size)
 
-        messages = general_chat["messages"]
+        for message in reader.iter_array_items("messages"):
+            if "poll" in message:
+                yield extract_poll_results(message)
 
-        polls = [
-            extract_poll_results(message) for message in messages if "poll" in message
-        ]
 
-        nonempty_polls = [poll for poll in polls if not is_empty_poll(poll)]
+class _JSONStreamReader:
+    """
+    Incremental reader of array items stored under a key of a top-level json object
+
+    Arguments
+    ---------
+    json_file
+        A text file object containing a json object
+    chunk_size
+        Number of characters read from the file at a time
+    """
 
-        nonempty_event_polls = nonempty_polls
+    _whitespace = re.compile(r"[ \t\n\r]*")
 
-        if event_iden_substrs is not None:
-            nonempty_event_polls = [
-                poll
-                for poll in nonempty_polls
-                if not is_not_event_poll(poll, substrings=event_iden_substrs)
-            ]
+    def __init__(self, json_file: TextIO, chunk_size: int) -> None:
+        self.json_file = json_file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
 
-        answer_cat_dict = answer_to_category_dict(
-            extract_unique_answers(nonempty_event_polls),
-            substr_category_dict,
-        )
+    def iter_array_items(self, key: str) -> Iterator:
+        """
+        Yield items of the array stored under key, skipping other values
+        """
 
-        flat_polls = map_poll_answers_to_categories(
-            nonempty_event_polls, answer_cat_dict
-        )
+        self._expect("{")
+
+        if self._peek() == "}":
+            return
+
+        while True:
+            item_key = self._decode()
+            self._expect(":")
+
+            if item_key == key:
+                yield from self._iter_items()
+            else:
+                self._decode()
+
+            if self._expect(",}") == "}":
+                return
+
+    def _iter_items(self) -> Iterator:
+        self._expect("[")
+
+        if self._peek() == "]":
+            self.pos += 1
+            return
+
+        while True:
+            yield self._decode()
+
+            if self._expect(",]") == "]":
+                return
+
+    def _fill(self) -> None:
+        chunk = self.json_file.read(self.chunk_size)
+
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+
+        if not chunk:
+            self.eof = True
+
+    def _peek(self) -> str:
+        """
+        Return the next non-whitespace character without consuming it
+        """
+
+        while True:
+            self.pos = self._whitespace.match(self.buffer, self.pos).end()
+
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+
+            if self.eof:
+                raise ValueError("Unexpected end of json data")
+
+            self._fill()
+
+    def _expect(self, characters: str) -> str:
+        """
+        Consume the next non-whitespace character, which must be one of characters
+        """
+
+        character = self._peek()
+
+        if character not in characters:
+            raise ValueError(
+                f"Expected one of {characters!r}, got {character!r} at {self.pos}"
+            )
+
+        self.pos += 1
+
+        return character
+
+    def _decode(self):
+        """
+        Decode the next json value, reading more input until it is complete
+        """
+
+        self._peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number or literal ending at the buffer end may continue
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
 
-        return flat_polls
+            self._fill()
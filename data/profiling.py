@@ -0,0 +1,133 @@
+import datetime
+import json
+from collections.abc import Iterable
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_PROFILE_DIR = Path(__file__).parent / "profiles"
+
+
+class SourceProfile:
+    """
+    Data quality statistics of a preprocessed source
+
+    The statistics are updated by the preprocessing functions while they
+    process the rows, so profiling does not read or scan the source again.
+    Row counts are sums over chunks, distinct technicians and events are kept
+    as sets and null counts of rows with a job are kept per column
+
+    Counted rows
+    ------------
+    raw_rows:
+        Rows read from the source
+    dropped_rows:
+        Rows without a job, such as empty separator rows
+    filtered_rows:
+        Rows removed by the filter
+    responses:
+        Non-empty responses
+    unparsed_dates:
+        Rows left without a date after forward filling and parsing, such as
+        rows of malformed dates, which are dropped
+    """
+
+    counters = (
+        "raw_rows",
+        "dropped_rows",
+        "filtered_rows",
+        "responses",
+        "unparsed_dates",
+    )
+
+    def __init__(self) -> None:
+        self.counts = dict.fromkeys(self.counters, 0)
+        self.null_counts = pd.Series(dtype="int64")
+        self.technicians = set()
+        self.events = set()
+
+    def count(self, counter: str, n: int) -> None:
+        """
+        Add n rows to a counter
+        """
+
+        self.counts[counter] += int(n)
+
+    def observe_nulls(self, df: pd.DataFrame, columns: Iterable[str]) -> None:
+        """
+        Count the missing values of given columns of rows with a job
+        """
+
+        self.null_counts = self.null_counts.add(
+            df.loc[:, df.columns.intersection(columns)].isna().sum(), fill_value=0
+        )
+
+    def observe_responses(self, responses: pd.DataFrame) -> None:
+        """
+        Count responses and collect their distinct technicians and events
+        """
+
+        self.count("responses", len(responses))
+
+        self.technicians.update(responses["Nimi"].unique())
+        self.events.update(responses["Keikka"].unique())
+
+    def to_dict(self) -> dict:
+        """
+        Return the statistics as a json serializable dictionary
+        """
+
+        job_rows = self.counts["raw_rows"] - self.counts["dropped_rows"]
+
+        null_ratios = (
+            {}
+            if job_rows == 0
+            else {
+                column: round(int(count) / job_rows, 4)
+                for column, count in self.null_counts.sort_index().items()
+            }
+        )
+
+        return self.counts | {
+            "technicians": len(self.technicians),
+            "events": len(self.events),
+            "null_ratios": null_ratios,
+        }
+
+
+def write_profile(
+    profiles: dict[str, dict], directory: str | Path = DEFAULT_PROFILE_DIR
+) -> Path:
+    """
+    Write the profiles of an ingest run to a json file named by its start time
+
+    Keys are sorted and each season is on its own lines, so the profiles of
+    two runs can be compared with diff
+
+    Returns the path of the written file
+
+    Arguments
+    ---------
+    profiles:
+        A dictionary of (season name, profile dictionary) pairs
+    directory:
+        Directory of the profile files
+    """
+
+    created = datetime.datetime.now().replace(microsecond=0)
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    path = directory / f"ingest_{created:%Y%m%dT%H%M%S}.json"
+
+    with open(path, "w") as profile_file:
+        json.dump(
+            {"created": created.isoformat(), "seasons": profiles},
+            profile_file,
+            indent=1,
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+
+    return path
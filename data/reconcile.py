@@ -0,0 +1,342 @@
+import argparse
+import difflib
+import logging
+from collections import defaultdict
+from collections.abc import Callable
+from itertools import combinations
+from pathlib import Path
+
+import pandas as pd
+
+import data.ingest as ingest
+from data.cache import PreprocessCache
+from data.names import normalize_event_name, normalize_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPING = Path(__file__).parent / "name_mapping.csv"
+
+MAPPING_COLUMNS = ["kind", "name", "canonical", "score", "accepted"]
+
+# Response columns holding the names of each kind
+NAME_KINDS = {"technician": "Nimi", "event": "Keikka"}
+
+# Normalization of the names of each kind before they are compared, event
+# names without their shared years
+NORMALIZERS = {"technician": normalize_name, "event": normalize_event_name}
+
+# Blocks of more names than this are skipped, their n-gram is too common to
+# tell names apart and comparing all of their pairs would be quadratic
+MAX_BLOCK_SIZE = 100
+
+
+def _ngrams(name: str, n: int) -> set[str]:
+    padded = f" {name} "
+
+    return {padded[i : i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+def candidate_pairs(
+    names: list[str],
+    is_new: list[bool],
+    buckets: list | None = None,
+    n: int = 3,
+    max_block_size: int = MAX_BLOCK_SIZE,
+) -> set[tuple[int, int]]:
+    """
+    Return index pairs of names sharing a block and involving a new name
+
+    Names are blocked by their character n-grams within their bucket, so only
+    names sharing an n-gram and a bucket are ever compared
+
+    Arguments
+    ---------
+    names:
+        A list of normalized names
+    is_new:
+        A list telling which names are new, pairs of old names are skipped
+    buckets:
+        Optional list of bucket values, such as years, names of different
+        buckets are never paired
+    n:
+        Length of the n-grams
+    max_block_size:
+        Blocks of more names are skipped
+    """
+
+    if buckets is None:
+        buckets = [None] * len(names)
+
+    blocks = defaultdict(list)
+
+    for index, (name, bucket) in enumerate(zip(names, buckets)):
+        for ngram in _ngrams(name, n):
+            blocks[bucket, ngram].append(index)
+
+    pairs = set()
+
+    for block in blocks.values():
+        if len(block) > max_block_size:
+            continue
+
+        pairs.update(
+            pair
+            for pair in combinations(block, 2)
+            if is_new[pair[0]] or is_new[pair[1]]
+        )
+
+    return pairs
+
+
+def propose_merges(
+    counts: pd.Series,
+    known: pd.Index,
+    buckets: pd.Series | None = None,
+    threshold: float = 0.8,
+    normalize: Callable[[str], str] = normalize_name,
+) -> pd.DataFrame:
+    """
+    Propose canonical names for names not in known
+
+    Names are visited known names first and then from the most common, and
+    each name not in known either joins the canonical name it is most similar
+    to or becomes a canonical name itself. Known canonical names are
+    preferred over other canonical names. A name only joins a canonical name
+    whose normalized name it matches with a similarity of at least
+    threshold, so dissimilar names are never merged through a chain of
+    similar names
+
+    Returns a dataframe with the columns name, canonical and score for every
+    name of counts that is not in known. Names without a match are their own
+    canonical names with a score of one
+
+    Arguments
+    ---------
+    counts:
+        A series of occurrence counts indexed by names
+    known:
+        An index of canonical names from earlier runs, only pairs involving
+        other names are compared
+    buckets:
+        Optional series of bucket values indexed by names
+    threshold:
+        Minimum similarity of a name and its canonical name
+    normalize:
+        Function normalizing names before they are compared
+    """
+
+    names = counts.index.union(known, sort=False)
+    normalized = [normalize(name) for name in names]
+    is_new = (~names.isin(known)).tolist()
+
+    bucket_values = None if buckets is None else buckets.reindex(names).tolist()
+
+    counts = counts.reindex(names, fill_value=0).tolist()
+
+    # Similarities of the candidate pairs that reach the threshold
+    matches = defaultdict(dict)
+
+    for i, j in candidate_pairs(normalized, is_new, bucket_values):
+        matcher = difflib.SequenceMatcher(None, normalized[i], normalized[j])
+
+        if matcher.quick_ratio() < threshold:
+            continue
+
+        score = matcher.ratio()
+
+        if score >= threshold:
+            matches[i][j] = matches[j][i] = score
+
+    canonical = {}
+    scores = {}
+
+    for index in sorted(range(len(names)), key=lambda i: (is_new[i], -counts[i])):
+        candidates = [
+            (not is_new[other], score, other)
+            for other, score in matches[index].items()
+            if canonical.get(other) == other
+        ]
+
+        if is_new[index] and candidates:
+            _, scores[index], canonical[index] = max(candidates)
+        else:
+            canonical[index], scores[index] = index, 1.0
+
+    is_proposed = [index for index in range(len(names)) if is_new[index]]
+
+    return pd.DataFrame(
+        {
+            "name": names[is_proposed],
+            "canonical": names[[canonical[index] for index in is_proposed]],
+            "score": [scores[index] for index in is_proposed],
+        }
+    )
+
+
+def load_mapping(path: str | Path = DEFAULT_MAPPING) -> pd.DataFrame:
+    """
+    Load the name mapping table, which is empty if the file does not exist
+
+    Each row maps a name of a kind to its canonical name. Rows with equal
+    names record names that have already been compared. Merges are only
+    applied once they are accepted
+
+    Arguments
+    ---------
+    path:
+        Path to the mapping csv file
+    """
+
+    try:
+        mapping = pd.read_csv(path, dtype={"kind": str, "name": str, "canonical": str})
+    except FileNotFoundError:
+        mapping = pd.DataFrame(columns=MAPPING_COLUMNS)
+
+    return mapping.astype({"score": float, "accepted": bool})
+
+
+def update_mapping(
+    mapping: pd.DataFrame,
+    responses: pd.DataFrame,
+    threshold: float = 0.8,
+) -> pd.DataFrame:
+    """
+    Add proposals for names of responses missing from the mapping table
+
+    Only new names are compared, with each other and with the canonical names
+    of the mapping. Event names are only compared within the same year and
+    without the years appended to them.
+    Proposed merges are not accepted, names without a match are added as
+    their own canonical names
+
+    Arguments
+    ---------
+    mapping:
+        A mapping table from load_mapping
+    responses:
+        Merged responses from preprocess_seasons
+    threshold:
+        Minimum similarity of merged names
+    """
+
+    proposals = [mapping]
+
+    for kind, column in NAME_KINDS.items():
+        kind_mapping = mapping.loc[mapping["kind"] == kind]
+
+        counts = responses[column].value_counts()
+        counts = counts[~counts.index.isin(kind_mapping["name"])]
+
+        if counts.empty:
+            continue
+
+        known = pd.Index(
+            kind_mapping.loc[
+                kind_mapping["name"] == kind_mapping["canonical"], "canonical"
+            ].unique()
+        )
+
+        buckets = None
+
+        if kind == "event":
+            buckets = (
+                responses.drop_duplicates(column).set_index(column)["Päiväys"].dt.year
+            )
+
+        kind_proposals = propose_merges(
+            counts, known, buckets, threshold, NORMALIZERS[kind]
+        )
+
+        kind_proposals.insert(0, "kind", kind)
+        kind_proposals["accepted"] = (
+            kind_proposals["name"] == kind_proposals["canonical"]
+        )
+
+        logger.info(
+            "Proposed %d merges of %d new %s names",
+            (~kind_proposals["accepted"]).sum(),
+            len(kind_proposals),
+            kind,
+        )
+
+        proposals.append(kind_proposals)
+
+    return pd.concat(proposals, ignore_index=True).loc[:, MAPPING_COLUMNS]
+
+
+def save_mapping(mapping: pd.DataFrame, path: str | Path = DEFAULT_MAPPING) -> None:
+    """
+    Write a mapping table sorted by kind and canonical name
+
+    Arguments
+    ---------
+    mapping:
+        A mapping table
+    path:
+        Path to the mapping csv file
+    """
+
+    mapping.sort_values(["kind", "canonical", "name"]).to_csv(
+        path, index=False, float_format="%.3f"
+    )
+
+
+def _replace_values(values: pd.Series, replacements: dict[str, str]) -> pd.Series:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.map(lambda value: replacements.get(value, value)).astype(
+            "category"
+        )
+
+    return values.replace(replacements)
+
+
+def apply_mapping(responses: pd.DataFrame, mapping: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace names of responses with their accepted canonical names
+
+    Arguments
+    ---------
+    responses:
+        Merged responses from preprocess_seasons
+    mapping:
+        A mapping table from load_mapping
+    """
+
+    merges = mapping.loc[
+        mapping["accepted"] & (mapping["name"] != mapping["canonical"])
+    ]
+
+    replaced = {}
+
+    for kind, column in NAME_KINDS.items():
+        kind_merges = merges.loc[merges["kind"] == kind]
+
+        if not kind_merges.empty:
+            replaced[column] = _replace_values(
+                responses[column],
+                dict(zip(kind_merges["name"], kind_merges["canonical"])),
+            )
+
+    return responses.assign(**replaced)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(
+        description="Propose canonical technician and event names"
+    )
+    parser.add_argument("--manifest", default=str(ingest.DEFAULT_MANIFEST))
+    parser.add_argument("--mapping", default=str(DEFAULT_MAPPING))
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    responses = ingest.preprocess_seasons(
+        ingest.load_manifest(args.manifest), cache=PreprocessCache()
+    )
+
+    mapping = update_mapping(load_mapping(args.mapping), responses, args.threshold)
+
+    save_mapping(mapping, args.mapping)
+
+    print(f"{(~mapping['accepted']).sum()} merges waiting for acceptance")
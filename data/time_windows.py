@@ -0,0 +1,87 @@
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Start and end of a window, as in "16 - 21", "23:30 - 03", "20.30-1ish" or
+# "18 - (23)". Trailing notes such as "(tarkentuu)" or "?" are ignored
+_WINDOW = (
+    r"^(?P<start_hour>\d{1,2})(?:[.:](?P<start_minute>\d{2}))?\??\s*-\s*\(?"
+    r"(?P<end_hour>\d{1,2})(?:[.:](?P<end_minute>\d{2}))?"
+)
+
+# Windows starting before this hour are teardowns in the night after the event date
+NIGHT_END_HOUR = 6
+
+WINDOW_COLUMNS = ["start_minute", "end_minute"]
+
+
+def parse_time_windows(windows: pd.Series) -> pd.DataFrame:
+    """
+    Parse free text time windows into start and end minutes
+
+    The result has the columns start_minute and end_minute with the index of
+    windows. Both count minutes from midnight at the start of the event date.
+    Windows starting before NIGHT_END_HOUR belong to the night after the event
+    date and windows ending at or before their start end on the next day, so
+    end_minute is always greater than start_minute. Windows without both
+    a start and an end, such as "Tarkentuu" or "16->", are logged in a single
+    warning and have missing values in both columns
+
+    Arguments
+    ---------
+    windows:
+        A pandas series of time windows
+    """
+
+    # Each distinct window is parsed only once
+    codes, uniques = pd.factorize(windows)
+
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+
+    parts = (
+        text.str.extract(_WINDOW)
+        .apply(pd.to_numeric)
+        .fillna({"start_minute": 0, "end_minute": 0})
+    )
+
+    is_parsed = (
+        parts["start_hour"].notna()
+        & (parts["start_hour"] <= 24)
+        & (parts["end_hour"] <= 24)
+        & (parts["start_minute"] < 60)
+        & (parts["end_minute"] < 60)
+    )
+
+    start = parts["start_hour"] % 24 * 60 + parts["start_minute"]
+    end = parts["end_hour"] % 24 * 60 + parts["end_minute"]
+
+    start = start.where(start >= NIGHT_END_HOUR * 60, start + 24 * 60)
+
+    # Place the end on the day of the start or on the day after it
+    end = end + start // (24 * 60) * 24 * 60
+    end = end.where(end > start, end + 24 * 60)
+
+    parsed = pd.DataFrame(
+        {
+            "start_minute": start.astype("Int32"),
+            "end_minute": end.astype("Int32"),
+        }
+    )
+
+    parsed.loc[~is_parsed, WINDOW_COLUMNS] = pd.NA
+
+    if not is_parsed.all():
+        unparsed_counts = pd.Series(codes).value_counts()[is_parsed.index[~is_parsed]]
+
+        logger.warning(
+            "Could not parse %d time windows: %s",
+            unparsed_counts.sum(),
+            dict(zip(text[unparsed_counts.index], unparsed_counts)),
+        )
+
+    # Missing windows have the code -1, which takes the appended missing row
+    parsed = pd.concat((parsed, parsed.iloc[:0].reindex([len(parsed)])))
+
+    return parsed.iloc[codes].set_axis(windows.index)
@@ -7,29 +7,36 @@ from sqlalchemy import func
 import numpy as np
 from sklearn.linear_model import LinearRegression
 
+from data.date_utils import parse_dates, POLL_DATE_FORMAT
 from data.db_metadata import EventDataBase
+from data.preprocess_utils import compact_frame, concat_categoricals
 import eventtech.utils_analysis as utils_analysis
 
 
-def monthly_event_counts(
-    db: EventDataBase,
-    conn: Connection,
-    period_names: dict[str, set[str]],
-    csv_filepath: str = None,
-) -> pd.DataFrame:
+def _signup_period_filter(db: EventDataBase) -> tuple:
     """
-    Extract monthly event counts for each fiscal period
+    Conditions restricting partitioned signups to the period bound by the
+    start_date and end_date parameters, so that only its partition is read
+    """
+
+    if not db.partitioned:
+        return ()
+
+    return (
+        bindparam("start_date") <= db.signups.c.date_event,
+        db.signups.c.date_event <= bindparam("end_date"),
+    )
+
+
+def events_per_month_statement(db: EventDataBase) -> Select:
+    """
+    Build a statement counting events per month of the period bound by the
+    start_date and end_date parameters
 
     Arguments
     ---------
     db
         A database object
-    conn
-        A db connection object
-    period_names
-        A dictionary containing (source name, period name iterable) pairs to extract
-    csv_filepath
-        Path to csv file
     """
 
     # Extract year and month component of each event date,
@@ -47,16 +54,167 @@ def monthly_event_counts(
     )
 
     # Calculate how many events fall to each month-year
-    events_per_month_stmt = (
+    return (
         Select(events_sbq.c["year", "month"], func.count().label("event_count"))
         .group_by(events_sbq.c["year", "month"])
         .order_by(events_sbq.c["year", "month"])
     )
+
+
+def technician_signups_statement(db: EventDataBase) -> Select:
+    """
+    Build a statement selecting each technician and event date of the signups
+    in the period bound by the start_date and end_date parameters
+
+    Arguments
+    ---------
+    db
+        A database object
+    """
+
+    return (
+        Select(db.names.c.name_tech, db.events.c.date_event)
+        .join_from(db.signups, db.names, db.signups.c.name_id == db.names.c.id_name)
+        .join(db.events, db.events.c.id_event == db.signups.c.event_id)
+        .where(
+            bindparam("start_date") <= db.events.c.date_event,
+            db.events.c.date_event <= bindparam("end_date"),
+            *_signup_period_filter(db),
+        )
+    )
+
+
+def event_signups_per_job_statement(db: EventDataBase, jobs: Iterable[str]) -> Select:
+    """
+    Build a statement counting signups for each event and job in the period
+    bound by the start_date and end_date parameters
+
+    Arguments
+    ---------
+    db
+        A database object
+    jobs
+        An iterable containing the jobs to consider
+    """
+
+    return (
+        Select(
+            db.events.c.name_event,
+            db.events.c.date_event,
+            db.jobs.c.name_job,
+            func.count().label("signup_count"),
+        )
+        .join_from(db.events, db.signups, db.events.c.id_event == db.signups.c.event_id)
+        .join(db.jobs, db.jobs.c.id_job == db.signups.c.job_id)
+        .where(
+            bindparam("start_date") <= db.events.c.date_event,
+            db.events.c.date_event <= bindparam("end_date"),
+            *_signup_period_filter(db),
+            db.jobs.c.name_job.in_(jobs),
+        )
+        .group_by(db.events.c.name_event, db.jobs.c.name_job, db.events.c.date_event)
+    )
+
+
+def _in_periods(aggregate) -> object:
+    # Aggregates are read for all periods at once
+    return aggregate.c.period_name.in_(bindparam("period_names", expanding=True))
+
+
+def events_per_month_aggregate_statement(db: EventDataBase) -> Select:
+    """
+    Build a statement reading events per month of the periods in the
+    period_names parameter from the MonthlyEventCounts aggregate
+
+    Arguments
+    ---------
+    db
+        A database object
+    """
+
+    aggregate = db.monthly_event_counts
+
+    return (
+        Select(aggregate.c["year", "month", "event_count"])
+        .where(_in_periods(aggregate))
+        .order_by(aggregate.c["year", "month"])
+    )
+
+
+def technician_signups_aggregate_statement(db: EventDataBase) -> Select:
+    """
+    Build a statement reading signup counts of each technician and event date
+    of the periods in the period_names parameter from the
+    TechnicianSignupCounts aggregate
+
+    Arguments
+    ---------
+    db
+        A database object
+    """
+
+    aggregate = db.technician_signup_counts
+
+    return Select(aggregate.c["name_tech", "date_event", "signup_count"]).where(
+        _in_periods(aggregate)
+    )
+
+
+def event_signups_per_job_aggregate_statement(
+    db: EventDataBase, jobs: Iterable[str]
+) -> Select:
+    """
+    Build a statement reading signup counts for each event and job of the
+    periods in the period_names parameter from the EventJobSignupCounts
+    aggregate
+
+    Arguments
+    ---------
+    db
+        A database object
+    jobs
+        An iterable containing the jobs to consider
+    """
+
+    aggregate = db.event_job_signup_counts
+
+    return Select(
+        aggregate.c["name_event", "date_event", "name_job", "signup_count"]
+    ).where(_in_periods(aggregate), aggregate.c.name_job.in_(jobs))
+
+
+def monthly_event_counts(
+    db: EventDataBase,
+    conn: Connection,
+    period_names: dict[str, set[str]],
+    csv_filepath: str = None,
+) -> pd.DataFrame:
+    """
+    Extract monthly event counts for each fiscal period
+
+    Arguments
+    ---------
+    db
+        A database object
+    conn
+        A db connection object
+    period_names
+        A dictionary containing (source name, period name iterable) pairs to extract
+    csv_filepath
+        Path to csv file
+    """
+
+    events_per_month_stmt = events_per_month_statement(db)
+
     # Select relevant periods
     periods = utils_analysis.get_periods(db, conn, period_names["db"])
 
     events_per_month = utils_analysis.get_and_concat_periods(
-        db, conn, events_per_month_stmt, periods
+        db,
+        conn,
+        events_per_month_stmt,
+        periods,
+        events_per_month_aggregate_statement(db),
     )
 
     # Construct all monthly periods for each fiscal year
@@ -110,7 +268,7 @@ def _monthly_event_counts_csv(file: str, period_data: pd.DataFrame) -> pd.DataFr
     event_data = pd.read_csv(file)
 
     event_data = event_data.assign(
-        period=pd.to_datetime(event_data["date_event"], dayfirst=True).dt.to_period("M")
+        period=parse_dates(event_data["date_event"]).dt.to_period("M")
     )
 
     event_counts = pd.pivot_table(
@@ -143,6 +301,8 @@ class AllTechnicianSignups:
         Database connection
     period_names
         A dictionary containing (source name, period name iterable) pairs to extract
+    compact
+        Whether to keep names as categoricals and counts as narrow integers
     """
 
     def __init__(
@@ -150,11 +310,15 @@ class AllTechnicianSignups:
         db: EventDataBase,
         conn: Connection,
         period_names: dict[str, set[str]],
+        compact: bool = False,
     ) -> None:
         period_db = utils_analysis.get_periods(db, conn, period_names["db"])
 
         db_data = self._technician_signup_data(db, conn, period_db)
 
+        if compact:
+            db_data = compact_frame(db_data)
+
         self.data = db_data
         self.periods = period_db
 
@@ -162,22 +326,24 @@ class AllTechnicianSignups:
         self, db: EventDataBase, conn: Connection, period_data: pd.DataFrame
     ) -> pd.DataFrame:
         # Select each technician and event date from signup data for a given period
-        signups_for_period_stmt = (
-            Select(db.names.c.name_tech, db.events.c.date_event)
-            .join_from(db.signups, db.names, db.signups.c.name_id == db.names.c.id_name)
-            .join(db.events, db.events.c.id_event == db.signups.c.event_id)
-            .where(
-                bindparam("start_date") <= db.events.c.date_event,
-                db.events.c.date_event <= bindparam("end_date"),
-            )
-        )
+        signups_for_period_stmt = technician_signups_statement(db)
 
         periods = period_data
 
         signups = utils_analysis.get_and_concat_periods(
-            db, conn, signups_for_period_stmt, periods
+            db,
+            conn,
+            signups_for_period_stmt,
+            periods,
+            technician_signups_aggregate_statement(db),
         )
 
+        # Aggregated rows stand for signup_count signups each
+        if "signup_count" in signups:
+            signups = signups.loc[
+                signups.index.repeat(signups.pop("signup_count"))
+            ].reset_index(drop=True)
+
         periods = utils_analysis.generate_pd_periods(periods, "D")
 
         # Add Period objects corresponding to date_event for a merge
@@ -202,6 +368,7 @@ class AllTechnicianSignups:
             values="Period",
             aggfunc="count",
             fill_value=0,
+            observed=True,
         ).rename_axis(columns="Fiscal Year")
 
         return signup_counts
@@ -223,7 +390,9 @@ class AllTechnicianSignups:
         signup_year_one_hots = pd.get_dummies(technician_signup_years["period_name"])
 
         # GroupBy and sum indicators to get a wide one hot representation
-        technician_one_hots = signup_year_one_hots.groupby("name_tech").sum()
+        technician_one_hots = signup_year_one_hots.groupby(
+            "name_tech", observed=True
+        ).sum()
 
         annual_technician_count = technician_one_hots.sum(axis=0)
 
@@ -259,7 +428,10 @@ class EventSignups:
     jobs
         Iterable containing jobs to consider
     csv_file
-        Optional csv file path
+        Optional csv file path, its events also found in the database
+        are dropped with drop_matching_events
+    compact
+        Whether to keep names as categoricals and counts as narrow integers
     """
 
     def __init__(
@@ -269,18 +441,30 @@ class EventSignups:
         period_names: dict[str, set[str]],
         jobs: Iterable[str],
         csv_file: str = None,
+        compact: bool = False,
     ) -> None:
         period_db = utils_analysis.get_periods(db, conn, period_names["db"])
 
         db_data = self._event_signups_per_job(db, conn, period_db, jobs)
 
+        if compact:
+            db_data = compact_frame(db_data)
+
         self.data = db_data
         self.periods = period_db
 
         if csv_file is not None:
             period_csv = utils_analysis.get_periods(db, conn, period_names["csv"])
             csv_data = self._event_signups_per_job_csv(csv_file, period_csv, jobs)
-            self.data = pd.concat((db_data, csv_data), axis=0)
+
+            # Events covered by both sources are counted from the database
+            csv_data = utils_analysis.drop_matching_events(csv_data, db_data)
+
+            if compact:
+                self.data = concat_categoricals((db_data, compact_frame(csv_data)))
+            else:
+                self.data = pd.concat((db_data, csv_data), axis=0)
+
             self.periods = pd.concat((period_db, period_csv), axis=0)
 
     def _event_signups_per_job(
@@ -306,31 +490,16 @@ class EventSignups:
         """
 
         # Calculate signups for each event and given jobs in a given fiscal year
-        event_signup_count_per_job_stmt = (
-            Select(
-                db.events.c.name_event,
-                db.events.c.date_event,
-                db.jobs.c.name_job,
-                func.count().label("signup_count"),
-            )
-            .join_from(
-                db.events, db.signups, db.events.c.id_event == db.signups.c.event_id
-            )
-            .join(db.jobs, db.jobs.c.id_job == db.signups.c.job_id)
-            .where(
-                bindparam("start_date") <= db.events.c.date_event,
-                db.events.c.date_event <= bindparam("end_date"),
-                db.jobs.c.name_job.in_(jobs),
-            )
-            .group_by(
-                db.events.c.name_event, db.jobs.c.name_job, db.events.c.date_event
-            )
-        )
+        event_signup_count_per_job_stmt = event_signups_per_job_statement(db, jobs)
 
         periods = period_data
 
         event_signup_count_per_job = utils_analysis.get_and_concat_periods(
-            db, conn, event_signup_count_per_job_stmt, periods
+            db,
+            conn,
+            event_signup_count_per_job_stmt,
+            periods,
+            event_signups_per_job_aggregate_statement(db, jobs),
         )
 
         periods = utils_analysis.generate_pd_periods(periods, "D")
@@ -369,8 +538,8 @@ class EventSignups:
 
         event_signup_counts = pd.read_csv(file)
 
-        event_signup_counts["Period"] = pd.to_datetime(
-            event_signup_counts["date_event"], dayfirst=True
+        event_signup_counts["Period"] = parse_dates(
+            event_signup_counts["date_event"]
         ).dt.to_period("D")
 
         event_signup_counts = event_signup_counts.merge(periods, on="Period")
@@ -424,7 +593,7 @@ class EventSignups:
         # by total signup for each fiscal year
         event_sums = (
             event_signup_counts.sum(axis=1)
-            .groupby(level="period_name", group_keys=False)
+            .groupby(level="period_name", group_keys=False, observed=True)
             .nlargest(top_n_events)
         )
 
@@ -444,11 +613,12 @@ class EventSignups:
             values="signup_count",
             aggfunc="median",
             fill_value=0.0,
+            observed=True,
         )
 
         # Format results for plotting
         median_per_month = (
-            (pd.DataFrame(index=np.arange(1, 13)).join(median_per_month).fillna(0.0))
+            median_per_month.reindex(np.arange(1, 13), fill_value=0.0)
             .rename_axis(index="Month", columns="Fiscal Year")
             .stack()
             .swaplevel()
@@ -590,14 +760,12 @@ def event_poll_durations_and_signups(
 
     event_data = pd.read_csv(csv_file)
 
-    event_data["Period"] = pd.to_datetime(
-        event_data["date_event"], dayfirst=True
-    ).dt.to_period("D")
+    event_data["Period"] = parse_dates(event_data["date_event"]).dt.to_period("D")
 
     event_data = event_data.merge(periods, on="Period")
 
-    poll_periods = pd.to_datetime(
-        event_data["poll_date"], format="%Y-%m-%dT%X"
+    poll_periods = parse_dates(
+        event_data["poll_date"], formats=(POLL_DATE_FORMAT,)
     ).dt.to_period("D")
 
     event_data["poll_day_offset"] = (event_data["Period"] - poll_periods).apply(
@@ -611,3 +779,104 @@ def event_poll_durations_and_signups(
     ]
 
     return poll_offsets_voters
+
+
+def hourly_staffing_demand(
+    db: EventDataBase,
+    conn: Connection,
+    period_names: dict[str, set[str]],
+    jobs: Iterable[str] | None = None,
+) -> pd.Series:
+    """
+    Compute the peak number of concurrently working technicians per hour
+    for each fiscal period
+
+    Each event job occupies its signed up technicians during its time window.
+    Signups declining the job and event jobs without a known time window are
+    not counted. Demand is computed with a sweep-line over the window
+    endpoints of each fiscal period
+
+    Returns a series with a (period_name, Hour) MultiIndex, hours span from
+    the first window start to the last window end of each fiscal period
+
+    Arguments
+    ---------
+    db
+        A database object
+    conn
+        A db connection object
+    period_names
+        A dictionary containing (source name, period name iterable) pairs to extract
+    jobs
+        Optional iterable containing the jobs to consider, by default all jobs
+    """
+
+    # Count technicians working in each event job with a known time window
+    event_job_demand_stmt = (
+        Select(
+            db.events.c.date_event,
+            db.signups.c.start_minute,
+            db.signups.c.end_minute,
+            func.count().label("technician_count"),
+        )
+        .join_from(db.signups, db.events, db.events.c.id_event == db.signups.c.event_id)
+        .where(
+            bindparam("start_date") <= db.events.c.date_event,
+            db.events.c.date_event <= bindparam("end_date"),
+            *_signup_period_filter(db),
+            db.signups.c.start_minute.is_not(None),
+            db.signups.c.end_minute.is_not(None),
+            db.signups.c.attending.is_not(False),
+        )
+        .group_by(
+            db.signups.c.event_id,
+            db.signups.c.job_id,
+            db.events.c.date_event,
+            db.signups.c.start_minute,
+            db.signups.c.end_minute,
+        )
+    )
+
+    if jobs is not None:
+        event_job_demand_stmt = event_job_demand_stmt.join(
+            db.jobs, db.jobs.c.id_job == db.signups.c.job_id
+        ).where(db.jobs.c.name_job.in_(jobs))
+
+    periods = utils_analysis.get_periods(db, conn, period_names["db"])
+
+    event_job_demand = utils_analysis.get_and_concat_periods(
+        db, conn, event_job_demand_stmt, periods
+    )
+
+    periods = utils_analysis.generate_pd_periods(periods, "D")
+
+    event_dates = pd.to_datetime(event_job_demand["date_event"])
+
+    event_job_demand = event_job_demand.assign(
+        Period=event_dates.dt.to_period("D"),
+        start=event_dates + pd.to_timedelta(event_job_demand["start_minute"], "min"),
+        end=event_dates + pd.to_timedelta(event_job_demand["end_minute"], "min"),
+    ).merge(periods, on="Period")
+
+    hourly_demand = {
+        period_name: utils_analysis.peak_per_period(
+            utils_analysis.sweep_concurrency(
+                period_demand["start"],
+                period_demand["end"],
+                period_demand["technician_count"],
+            ),
+            "h",
+        ).rename_axis("Hour")
+        for period_name, period_demand in event_job_demand.groupby("period_name")
+    }
+
+    if not hourly_demand:
+        return pd.Series(
+            dtype="int64",
+            index=pd.MultiIndex.from_arrays(
+                [[], pd.DatetimeIndex([])], names=["period_name", "Hour"]
+            ),
+            name="Technicians",
+        )
+
+    return pd.concat(hourly_demand, names=["period_name"]).rename("Technicians")
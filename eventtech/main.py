@@ -1,7 +1,6 @@
-from pathlib import Path
+import dataclasses
 import os
 
-from sqlalchemy import URL
 import boto3
 import pandas as pd
 import numpy as np
@@ -9,21 +8,20 @@ import numpy as np
 from data.db_metadata import EventDataBase
 import eventtech.analysis_func as analysis_func
 import eventtech.plotting_tools as plotting_tools
-from config.config import parse_db_config, parse_storage_config
+from config.config import load_config
 
 
-config_file_path = str(Path(__file__).parent.parent / "config" / "config.ini")
-conn_string = URL.create(**parse_db_config(config_file_path))
+config = load_config()
 
-db = EventDataBase(conn_string)
+db = EventDataBase(config.database.url(), password_provider=config.password_provider())
 
-storage_config = parse_storage_config(config_file_path)
+storage_config = dataclasses.asdict(config.storage)
 
 plot_file_dir = os.path.expanduser(storage_config["local_plot_dir"])
 
 storage_config["local_plot_dir"] = plot_file_dir
 
-if "s3_bucket_name" in storage_config:
+if config.storage.s3_bucket_name is not None:
     session = boto3.Session()
     s3_client = session.client("s3")
 
@@ -31,8 +29,8 @@ else:
     s3_client = None
 
 csv_file_path = (
-    os.path.expanduser(storage_config["csv_file_path"])
-    if "csv_file_path" in storage_config
+    os.path.expanduser(config.storage.csv_file_path)
+    if config.storage.csv_file_path is not None
     else None
 )
 
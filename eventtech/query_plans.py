@@ -0,0 +1,248 @@
+import argparse
+import logging
+import re
+import sys
+from collections.abc import Iterable
+
+from sqlalchemy import Connection, Select, func, inspect, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from data.db_metadata import EventDataBase
+import eventtech.analysis_func as analysis_func
+
+logger = logging.getLogger(__name__)
+
+# Tables with fewer rows are cheap to scan and planners rightly prefer scans
+LARGE_TABLE_ROWS = 10_000
+
+DEFAULT_JOBS = ("Kasaus", "Veto", "Purku")
+
+# Sequential scans in SQLite plans, older versions write "SCAN TABLE name"
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN of a statement, compiled with the bind parameters of the statement
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "sqlite")
+def _explain_sqlite(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.statement, **kw)
+
+
+@compiles(Explain, "postgresql")
+def _explain_postgresql(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def analysis_statements(
+    db: EventDataBase, jobs: Iterable[str] = DEFAULT_JOBS
+) -> dict[str, Select]:
+    """
+    Statements of analysis_func that filter signups and events by period
+
+    Arguments
+    ---------
+    db:
+        A database object
+    jobs:
+        An iterable containing the jobs of the event signup statement
+    """
+
+    return {
+        "monthly_event_counts": analysis_func.events_per_month_statement(db),
+        "_technician_signup_data": analysis_func.technician_signups_statement(db),
+        "_event_signups_per_job": analysis_func.event_signups_per_job_statement(
+            db, jobs
+        ),
+    }
+
+
+def _postgresql_nodes(node: dict) -> Iterable[dict]:
+    yield node
+
+    for child in node.get("Plans", []):
+        yield from _postgresql_nodes(child)
+
+
+def explain(conn: Connection, stmt: Select, params: dict) -> list[tuple[str, str]]:
+    """
+    Capture the query plan of a statement
+
+    Returns a list of (plan step, scanned table) pairs, the table is empty
+    for steps that are not sequential scans. Scans of partitions name their
+    partitioned table
+
+    Arguments
+    ---------
+    conn:
+        A db connection object, SQLite and Postgres are supported
+    stmt:
+        A SQLAlchemy Select object
+    params:
+        Bind parameters of the statement
+    """
+
+    if conn.dialect.name not in ("sqlite", "postgresql"):
+        raise NotImplementedError(
+            f"Query plans are not supported on {conn.dialect.name}"
+        )
+
+    # Plan rows are read from the cursor, the result processors of the
+    # explained statement do not apply to them
+    rows = conn.execute(Explain(stmt), params).cursor.fetchall()
+
+    if conn.dialect.name == "sqlite":
+        steps = []
+
+        for row in rows:
+            scan = _SQLITE_SCAN.match(row[-1])
+            steps.append((row[-1], scan.group(1) if scan else ""))
+
+        return steps
+
+    # Partitions scanned for a partitioned table are reported as the table
+    parents = dict(
+        conn.execute(
+            text(
+                "SELECT child.relname, parent.relname FROM pg_inherits "
+                "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+                "JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent"
+            )
+        ).all()
+    )
+
+    return _postgresql_steps(rows[0][0][0]["Plan"], parents)
+
+
+def _postgresql_steps(plan: dict, parents: dict[str, str]) -> list[tuple[str, str]]:
+    """
+    Turn a Postgres JSON plan into (plan step, scanned table) pairs, scanned
+    partitions are mapped to their tables by parents
+    """
+
+    steps = []
+
+    for node in _postgresql_nodes(plan):
+        relation = node.get("Relation Name", "")
+        index = node.get("Index Name")
+
+        step = node["Node Type"] + (f" on {relation}" if relation else "")
+        step += f" using {index}" if index else ""
+
+        scanned = parents.get(relation, relation)
+
+        steps.append((step, scanned if node["Node Type"] == "Seq Scan" else ""))
+
+    return steps
+
+
+def check_query_plans(
+    db: EventDataBase,
+    conn: Connection,
+    jobs: Iterable[str] = DEFAULT_JOBS,
+    min_rows: int = LARGE_TABLE_ROWS,
+) -> dict[str, dict]:
+    """
+    Explain the analysis statements for the latest fiscal period and flag
+    sequential scans of large tables
+
+    Returns a dictionary of (statement name, result) pairs, each result holds
+    the plan steps and the large tables scanned sequentially. The dictionary
+    is empty for a database without fiscal periods
+
+    Arguments
+    ---------
+    db:
+        A database object
+    conn:
+        A db connection object
+    jobs:
+        An iterable containing the jobs of the event signup statement
+    min_rows:
+        Tables with at least this many rows are large
+    """
+
+    if not inspect(conn).has_table(db.periods.name):
+        logger.warning("No fiscal periods are loaded, nothing to explain")
+        return {}
+
+    period = conn.execute(
+        Select(db.periods.c["start_date", "end_date"])
+        .order_by(db.periods.c.start_date.desc())
+        .limit(1)
+    ).one_or_none()
+
+    if period is None:
+        logger.warning("No fiscal periods are loaded, nothing to explain")
+        return {}
+
+    params = {"start_date": period.start_date, "end_date": period.end_date}
+
+    large_tables = {
+        table.name
+        for table in db.metadata.sorted_tables
+        if conn.execute(Select(func.count()).select_from(table)).scalar_one()
+        >= min_rows
+    }
+
+    results = {}
+
+    for name, stmt in analysis_statements(db, jobs).items():
+        steps = explain(conn, stmt, params)
+
+        results[name] = {
+            "plan": [step for step, _ in steps],
+            "sequential_scans": sorted(
+                {table for _, table in steps if table in large_tables}
+            ),
+        }
+
+        if results[name]["sequential_scans"]:
+            logger.warning(
+                "%s scans %s sequentially", name, results[name]["sequential_scans"]
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    from config.config import CONFIG_PATH, load_config
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(
+        description="Check that the analysis queries are backed by indexes"
+    )
+    parser.add_argument("--config", default=str(CONFIG_PATH))
+    parser.add_argument("--min-rows", type=int, default=LARGE_TABLE_ROWS)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+
+    db = EventDataBase(
+        config.database.url(), password_provider=config.password_provider()
+    )
+
+    with db.engine.connect() as conn:
+        results = check_query_plans(db, conn, min_rows=args.min_rows)
+
+    if not results:
+        sys.exit("No fiscal periods are loaded, fill the database first")
+
+    for name, result in results.items():
+        print(name)
+
+        for step in result["plan"]:
+            print(f"    {step}")
+
+    if any(result["sequential_scans"] for result in results.values()):
+        sys.exit(1)
@@ -1,9 +1,14 @@
 from collections.abc import Iterable
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import Select, Connection
 
 from data.db_metadata import EventDataBase
+from data.names import normalize_event_name
+
+# Events of different sources with dates this far apart can be the same event
+EVENT_DATE_TOLERANCE = pd.Timedelta(days=1)
 
 
 def get_periods(
@@ -59,11 +64,18 @@ def generate_pd_periods(periods: pd.DataFrame, freq: str) -> pd.DataFrame:
 
 
 def get_and_concat_periods(
-    db: EventDataBase, conn: Connection, stmt: Select, periods: pd.DataFrame
+    db: EventDataBase,
+    conn: Connection,
+    stmt: Select,
+    periods: pd.DataFrame,
+    aggregate_stmt: Select | None = None,
 ) -> pd.DataFrame:
     """
     Get and concatenate data that is extracted for each period separately
 
+    When the aggregates of the database are fresh, aggregate_stmt reads the
+    precomputed data of all periods at once instead
+
     Arguments
     ---------
     db:
@@ -74,8 +86,18 @@ def get_and_concat_periods(
         A SQLAlchemy Select object to be executed
     periods:
         A dataframe containing each period and its start and end dates
+    aggregate_stmt:
+        Optional SQLAlchemy Select object reading the same data from an
+        aggregate for the periods in its period_names parameter
     """
 
+    if aggregate_stmt is not None and db.aggregates_fresh(conn):
+        return pd.read_sql(
+            aggregate_stmt,
+            conn,
+            params={"period_names": periods["period_name"].tolist()},
+        )
+
     # Extract data for each fiscal period
     data_for_each_period = [
         pd.read_sql(
@@ -86,6 +108,152 @@ def get_and_concat_periods(
         for _, row in periods.iterrows()
     ]
 
-    all_data = pd.concat(data_for_each_period)
+    # Empty periods have object columns, which would turn counts into objects
+    nonempty_data = [data for data in data_for_each_period if not data.empty]
+
+    all_data = pd.concat(nonempty_data or data_for_each_period)
 
     return all_data
+
+
+def sweep_concurrency(
+    starts: pd.Series, ends: pd.Series, weights: pd.Series
+) -> pd.Series:
+    """
+    Compute the total weight of concurrent intervals with a sweep-line
+
+    Intervals are half-open, so an interval ending when another starts does
+    not overlap it. Only the interval endpoints are visited, so the cost does
+    not depend on the lengths of the intervals
+
+    Returns a series of total weights indexed by the times at which they
+    start to apply, the last total is zero
+
+    Arguments
+    ---------
+    starts:
+        A series of interval start times
+    ends:
+        A series of interval end times
+    weights:
+        A series of interval weights
+    """
+
+    # Each start adds and each end removes the weight of its interval
+    deltas = pd.Series(
+        np.concatenate((weights.to_numpy(), -weights.to_numpy())),
+        index=pd.Index(np.concatenate((starts.to_numpy(), ends.to_numpy()))),
+    )
+
+    return deltas.groupby(level=0).sum().cumsum()
+
+
+def peak_per_period(levels: pd.Series, freq: str) -> pd.Series:
+    """
+    Compute the peak of a step function within each period spanning its steps
+
+    Arguments
+    ---------
+    levels:
+        A series of levels indexed by the sorted times at which they start
+        to apply, such as the result of sweep_concurrency
+    freq:
+        A string specifying the frequency of periods
+    """
+
+    period_starts = pd.date_range(
+        levels.index[0].floor(freq),
+        levels.index[-1],
+        freq=freq,
+        inclusive="left",
+    )
+
+    # Level at the start of each period, carried over from earlier steps
+    positions = levels.index.searchsorted(period_starts, side="right") - 1
+
+    start_levels = pd.Series(
+        np.where(positions >= 0, levels.to_numpy()[positions], 0),
+        index=period_starts,
+    )
+
+    step_peaks = levels.groupby(levels.index.floor(freq)).max()
+
+    return np.maximum(start_levels, step_peaks.reindex(period_starts, fill_value=0))
+
+
+def event_name_key(names: pd.Series) -> pd.Series:
+    """
+    Normalize event names for matching across sources
+
+    Names are normalized with normalize_event_name, which also removes the
+    years appended to database event names
+
+    Arguments
+    ---------
+    names:
+        A series of event names
+    """
+
+    unique_names = pd.Series(names.unique())
+
+    keys = unique_names.astype(str).map(normalize_event_name)
+
+    return names.map(dict(zip(unique_names, keys))).astype(object)
+
+
+def drop_matching_events(
+    events: pd.DataFrame,
+    reference: pd.DataFrame,
+    tolerance: pd.Timedelta = EVENT_DATE_TOLERANCE,
+) -> pd.DataFrame:
+    """
+    Drop rows of events that also occur in a reference source
+
+    An event occurs in the reference when an event of the reference has the
+    same name after event_name_key and a date within tolerance. Both sources
+    are sorted by date and matched with a sort-merge, so events are never
+    compared pairwise
+
+    Arguments
+    ---------
+    events:
+        A dataframe with name_event and daily Period columns, it may
+        have several rows per event
+    reference:
+        A dataframe with name_event and daily Period columns
+    tolerance:
+        Maximum distance between the dates of matching events
+    """
+
+    def _event_dates(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.loc[:, ["name_event", "Period"]].drop_duplicates()
+
+        return df.assign(
+            name_key=event_name_key(df["name_event"]),
+            date=df["Period"].dt.to_timestamp(),
+        ).sort_values("date")
+
+    event_dates = _event_dates(events)
+    reference_dates = _event_dates(reference).loc[:, ["name_key", "date"]]
+
+    matches = pd.merge_asof(
+        event_dates,
+        reference_dates.assign(reference_date=reference_dates["date"]),
+        on="date",
+        by="name_key",
+        tolerance=tolerance,
+        direction="nearest",
+    )
+
+    duplicates = matches.loc[
+        matches["reference_date"].notna(), ["name_event", "Period"]
+    ]
+
+    is_duplicate = (
+        events.loc[:, ["name_event", "Period"]]
+        .merge(duplicates.assign(is_duplicate=True), how="left")["is_duplicate"]
+        .notna()
+        .to_numpy()
+    )
+
+    return events.loc[~is_duplicate]
@@ -0,0 +1,50 @@
+import logging
+
+import pandas as pd
+
+from data.answers import parse_answers
+
+
+def test_parse_answers(caplog):
+    answers = pd.Series(
+        ["x", "18? ->", "(x)", "16 tai 17->", "tuskin :(", "antti, ellen", None],
+        index=range(10, 17),
+    )
+
+    with caplog.at_level(logging.WARNING):
+        parsed = parse_answers(answers)
+
+    assert not caplog.records
+    assert parsed.index.equals(answers.index)
+    assert parsed["attending"].tolist() == [True, True, True, True, False, True, pd.NA]
+    assert parsed["arrival_hour"].tolist() == [
+        pd.NA,
+        18,
+        pd.NA,
+        16,
+        pd.NA,
+        pd.NA,
+        pd.NA,
+    ]
+    assert parsed["tentative"].tolist() == [
+        False,
+        True,
+        True,
+        False,
+        True,
+        False,
+        pd.NA,
+    ]
+
+
+def test_parse_answers_reports_unparsed(caplog):
+    answers = pd.Series(["x", "vaan 1.9.", "vaan 1.9.", "15:30 max"])
+
+    with caplog.at_level(logging.WARNING):
+        parsed = parse_answers(answers)
+
+    assert parsed["attending"].isna().tolist() == [False, True, True, True]
+
+    # All unparsed answers are reported at once
+    assert len(caplog.records) == 1
+    assert "Could not parse 3 answers" in caplog.records[0].getMessage()
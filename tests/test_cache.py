@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from data.cache import PreprocessCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PreprocessCache(tmp_path / "cache")
+
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / "source.csv"
+    source.write_text("a,b\n1,2\n")
+
+    return source
+
+
+class TestPreprocessCache:
+    def test_hit_skips_compute(self, cache, source):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return pd.DataFrame({"a": [1]})
+
+        first = cache.get_or_compute(source, {"filter": None}, compute)
+        second = cache.get_or_compute(source, {"filter": None}, compute)
+
+        assert len(calls) == 1
+        assert first.equals(second)
+
+    def test_key_changes(self, cache, source):
+        key = cache.key(source, {"filter": None})
+
+        assert cache.key(source, {"filter": {"Kuvaus": "Peruttiin"}}) != key
+
+        source.write_text("a,b\n1,3\n")
+
+        assert cache.key(source, {"filter": None}) != key
+
+    def test_evict_least_recently_used(self, cache, source):
+        for i in range(3):
+            cache.get_or_compute(source, {"i": i}, lambda: "x" * 1000)
+
+        # Reading the first entry makes it the most recently used
+        cache.get_or_compute(source, {"i": 0}, lambda: None)
+
+        cache.max_bytes = cache.size() - 1
+
+        assert cache.evict() == 1
+        assert cache.get_or_compute(source, {"i": 0}, lambda: None) == "x" * 1000
+        assert cache.get_or_compute(source, {"i": 1}, lambda: None) is None
+
+    def test_clear(self, cache, source):
+        cache.get_or_compute(source, {}, lambda: 1)
+
+        assert cache.clear() == 1
+        assert cache.size() == 0
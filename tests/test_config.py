@@ -0,0 +1,145 @@
+import json
+
+import pytest
+
+from config.config import SSM_PARAMETERS, get_parameters, load_config, read_config
+
+
+class StubSSMClient:
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.requests = []
+
+    def get_parameters(self, Names, WithDecryption):
+        self.requests.append(Names)
+
+        return {
+            "Parameters": [
+                {"Name": name, "Value": value, "Type": parameter_type}
+                for name, (value, parameter_type) in self.parameters.items()
+                if name in Names
+            ],
+            "InvalidParameters": [
+                name for name in Names if name not in self.parameters
+            ],
+        }
+
+
+class StubRDSClient:
+    def __init__(self):
+        self.tokens = 0
+
+    def generate_db_auth_token(self, DBHostname, Port, DBUsername, Region):
+        self.tokens += 1
+
+        return f"{DBUsername}@{DBHostname}:{Port}/{Region}/{self.tokens}"
+
+
+def write_ini(path, environment):
+    path.write_text(
+        f"[Env]\nenvironment = {environment}\n"
+        "[Database]\ndrivername = postgresql+psycopg2\nport = 5432\n"
+        "database = events\nusername = tech\npassword = secret\nhost = localhost\n"
+        "[Storage]\nlocal_plot_dir = ~/plots\n"
+    )
+
+    return path
+
+
+@pytest.fixture(autouse=True)
+def clear_config_cache():
+    load_config.cache_clear()
+    yield
+    load_config.cache_clear()
+
+
+@pytest.fixture
+def ssm_client():
+    return StubSSMClient(
+        {
+            SSM_PARAMETERS["region"]: ("eu-north-1", "String"),
+            SSM_PARAMETERS["endpoint"]: ("db.example.com", "String"),
+            "/secret": ("hunter2", "SecureString"),
+        }
+    )
+
+
+def test_dev_config_with_overrides(tmp_path):
+    config = read_config(
+        write_ini(tmp_path / "config.ini", "dev"),
+        environ={"EVENTTECH_DATABASE_HOST": "db", "EVENTTECH_DATABASE_PORT": "6543"},
+    )
+
+    assert config.environment == "dev"
+    assert config.database.port == 6543
+    assert config.database.url().render_as_string(hide_password=False) == (
+        "postgresql+psycopg2://tech:secret@db:6543/events"
+    )
+    assert config.storage.local_plot_dir == "~/plots"
+    assert config.storage.s3_bucket_name is None
+    assert config.password_provider() is None
+
+
+def test_prod_config_batches_and_caches_parameters(tmp_path, ssm_client):
+    ini_path = write_ini(tmp_path / "config.ini", "prod")
+    cache_path = tmp_path / "cache" / "ssm.json"
+
+    for _ in range(2):
+        config = read_config(
+            ini_path, environ={}, ssm_client=ssm_client, cache_path=cache_path
+        )
+
+    assert len(ssm_client.requests) == 1
+    assert set(ssm_client.requests[0]) == set(SSM_PARAMETERS.values())
+    assert config.database.host == "db.example.com"
+    assert config.database.region == "eu-north-1"
+    assert config.database.password is None
+
+    rds_client = StubRDSClient()
+    password_provider = config.password_provider(rds_client)
+
+    assert password_provider() != password_provider()
+    assert rds_client.tokens == 2
+
+
+def test_secrets_and_expired_parameters_are_fetched(tmp_path, ssm_client):
+    cache_path = tmp_path / "ssm.json"
+    names = [SSM_PARAMETERS["region"], "/secret"]
+
+    assert get_parameters(names, ssm_client, cache_path) == {
+        SSM_PARAMETERS["region"]: "eu-north-1",
+        "/secret": "hunter2",
+    }
+    assert "/secret" not in json.loads(cache_path.read_text())
+
+    get_parameters(names, ssm_client, cache_path)
+    get_parameters(names, ssm_client, cache_path, ttl=0)
+
+    assert ssm_client.requests == [names, ["/secret"], names]
+
+
+def test_unknown_parameter(tmp_path, ssm_client):
+    with pytest.raises(KeyError):
+        get_parameters(["/missing"], ssm_client, tmp_path / "ssm.json")
+
+
+def test_config_is_loaded_once(tmp_path):
+    ini_path = write_ini(tmp_path / "config.ini", "dev")
+
+    assert load_config(ini_path) is load_config(ini_path)
+
+
+def test_overrides_apply_after_cache_clear(tmp_path, monkeypatch):
+    ini_path = write_ini(tmp_path / "config.ini", "dev")
+
+    monkeypatch.setenv("EVENTTECH_DATABASE_HOST", "db")
+
+    assert load_config(ini_path).database.host == "db"
+
+    monkeypatch.setenv("EVENTTECH_DATABASE_HOST", "other")
+
+    assert load_config(ini_path).database.host == "db"
+
+    load_config.cache_clear()
+
+    assert load_config(ini_path).database.host == "other"
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from data.date_utils import infer_date_format, parse_dates
+
+
+def test_infer_date_format():
+    assert infer_date_format(["1.10.2021", "12/10/2021", "5.12.2021"]) == "%d.%m.%Y"
+    assert infer_date_format(["2023-09-01T12:30:00"]) == "%Y-%m-%dT%H:%M:%S"
+    assert infer_date_format(["Tarkentuu"]) is None
+
+
+def test_parse_dates_mixed_formats():
+    values = pd.Series(
+        ["1.10.2021", "12/10/2021", None, "1.10.2021", "5.12.2021"],
+        index=[3, 4, 5, 6, 7],
+        name="Päiväys",
+    )
+
+    dates = parse_dates(values)
+
+    expected = pd.to_datetime(values, dayfirst=True, format="mixed")
+
+    assert dates.equals(expected)
+    assert dates.index.equals(values.index)
+
+
+def test_parse_dates_coerce():
+    values = pd.Series(["1.10.2021", "Tarkentuu", None])
+
+    with pytest.raises(ValueError):
+        parse_dates(values)
+
+    dates = parse_dates(values, errors="coerce")
+
+    assert dates.tolist()[0] == pd.Timestamp(year=2021, month=10, day=1)
+    assert dates.iloc[1:].isna().all()
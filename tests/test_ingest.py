@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data.ingest as ingest
+from data.cache import PreprocessCache
+
+
+@pytest.fixture
+def seasons(tmp_path):
+    seasons = ingest.load_manifest("tests/data/seasons_mock.json")
+
+    # Keep generated files out of the test data directory
+    seasons[2]["output"] = str(tmp_path / "telegram_output_mock.csv")
+
+    return seasons
+
+
+class TestLoadManifest:
+    def test_load_manifest(self, seasons):
+        assert [season["source"] for season in seasons] == [
+            "spreadsheet",
+            "spreadsheet",
+            "telegram",
+        ]
+        assert seasons[0]["path"].endswith("tests/data/event_sheet_mock.csv")
+        assert np.isnan(seasons[0]["replace"]["Keikka"]["Show"])
+
+    def test_unknown_source(self, tmp_path):
+        manifest = tmp_path / "seasons.json"
+        manifest.write_text(
+            '{"seasons": [{"period_name": "2021-2022", "start_date": "2021-07-01",'
+            ' "end_date": "2022-06-30", "source": "email", "path": "x"}]}'
+        )
+
+        with pytest.raises(ValueError):
+            ingest.load_manifest(manifest)
+
+
+class TestPreprocessSeasons:
+    def test_parallel_equals_serial(self, seasons):
+        responses_serial = ingest.preprocess_seasons(seasons, max_workers=1)
+        responses_parallel = ingest.preprocess_seasons(seasons, max_workers=3)
+
+        assert responses_serial.equals(responses_parallel)
+
+        # Responses follow the manifest order
+        assert responses_serial["period_name"].unique().tolist() == [
+            "2022-2023",
+            "2021-2022",
+        ]
+        assert "Mike" in set(responses_serial["Nimi"])
+
+    def test_telegram_output(self, seasons):
+        ingest.preprocess_seasons(seasons, max_workers=1)
+
+        event_data = pd.read_csv(seasons[2]["output"])
+
+        assert event_data["name_event"].tolist() == ["Huomenna"]
+
+    def test_season_periods(self, seasons):
+        periods = ingest.season_periods(seasons)
+
+        assert periods["id_period"].tolist() == [1, 2, 3]
+        assert periods["period_name"].tolist() == [
+            "2021-2022",
+            "2022-2023",
+            "2023-2024",
+        ]
+        assert periods["start_date"].iloc[0] == pd.Timestamp(year=2021, month=7, day=1)
+
+    def test_cached_equals_uncached(self, seasons, tmp_path):
+        cache = PreprocessCache(tmp_path / "cache")
+
+        responses = ingest.preprocess_seasons(seasons, max_workers=1)
+        responses_cold = ingest.preprocess_seasons(seasons, max_workers=1, cache=cache)
+        responses_warm = ingest.preprocess_seasons(seasons, max_workers=1, cache=cache)
+
+        assert responses.equals(responses_cold)
+        assert responses.equals(responses_warm)
+        assert len(cache._entries()) == 3
+
+    def test_changed_seasons(self, seasons, tmp_path):
+        fingerprints = {
+            season["period_name"]: ingest.season_fingerprint(season)
+            for season in seasons
+        }
+
+        # Both spreadsheet seasons read the same file with other parameters
+        assert fingerprints["2021-2022"] != fingerprints["2022-2023"]
+        assert fingerprints == {
+            season["period_name"]: ingest.season_fingerprint(season)
+            for season in seasons
+        }
+
+        loaded = {"2021-2022": fingerprints["2021-2022"], "2022-2023": "old"}
+
+        changed = ingest.changed_seasons(seasons, fingerprints, loaded)
+
+        assert [season["period_name"] for season in changed] == [
+            "2022-2023",
+            "2023-2024",
+        ]
+
+        mapping = tmp_path / "name_mapping.csv"
+        mapping.write_text("name,canonical\n")
+
+        assert (
+            ingest.season_fingerprint(seasons[0], [mapping])
+            != fingerprints["2022-2023"]
+        )
+
+    def test_compact_equals_default(self, seasons):
+        responses = ingest.preprocess_seasons(seasons, max_workers=1)
+        responses_compact = ingest.preprocess_seasons(
+            seasons, max_workers=1, compact=True
+        )
+
+        # Both seasons share one dictionary of technician names
+        assert isinstance(responses_compact["Nimi"].dtype, pd.CategoricalDtype)
+
+        pd.testing.assert_frame_equal(
+            responses, responses_compact, check_dtype=False, check_categorical=False
+        )
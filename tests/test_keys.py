@@ -0,0 +1,73 @@
+import pandas as pd
+
+import data.ingest as ingest
+import data.keys as keys
+
+
+def test_natural_key_ids_are_order_independent():
+    df = pd.DataFrame({"name_tech": ["Jane", "John", "Mary"]})
+
+    ids = pd.Series(keys.natural_key_ids(df, ["name_tech"]), index=df["name_tech"])
+    ids_reversed = pd.Series(
+        keys.natural_key_ids(df.iloc[::-1], ["name_tech"]),
+        index=df["name_tech"].iloc[::-1],
+    )
+
+    assert ids.equals(ids_reversed.loc[ids.index])
+    assert (ids >= 0).all()
+
+
+def test_assign_keys():
+    seasons = ingest.load_manifest("tests/data/seasons_mock.json")
+    responses = ingest.preprocess_seasons(seasons[:2], max_workers=1)
+
+    names, events, jobs, signups = keys.assign_keys(responses)
+
+    assert names["name_tech"].tolist() == responses["Nimi"].unique().tolist()
+    assert events["name_event"].is_unique
+
+    # Both spreadsheet seasons share events, each signup is kept once per day
+    assert len(signups) == len(
+        responses.drop_duplicates(subset=["Keikka", "Nimi", "Homma", "Päiväys"])
+    )
+    assert signups["id_signup"].is_unique
+    assert signups["event_id"].isin(events["id_event"]).all()
+    assert signups["name_id"].isin(names["id_name"]).all()
+    assert signups["job_id"].isin(jobs["id_job"]).all()
+
+    # Time windows of later days of an event are offset from its first day
+    show = events.loc[events["name_event"] == "Show 2022", "id_event"].item()
+    show_windows = signups.loc[signups["event_id"] == show, "start_minute"]
+
+    assert sorted(show_windows.unique()) == [600, 2520, 4440]
+
+    # Ids of a season do not depend on the other seasons
+    names_single, *_ = keys.assign_keys(
+        responses.loc[responses["period_name"] == "2021-2022"]
+    )
+
+    assert names_single["id_name"].isin(names["id_name"]).all()
+
+
+def test_signups_of_each_event_day_are_kept():
+    responses = pd.DataFrame(
+        {
+            "Keikka": ["Sitsit 2022", "Sitsit 2022"],
+            "Paikka": ["Smökki", "Smökki"],
+            "Päiväys": [
+                pd.Timestamp(year=2022, month=11, day=14),
+                pd.Timestamp(year=2022, month=11, day=15),
+            ],
+            "Aikaikkuna": ["18-02", "18-02"],
+            "Homma": ["Veto", "Veto"],
+            "Kuvaus": [None, None],
+            "Nimi": ["Antti", "Antti"],
+            "Vastaus": ["x", "x"],
+        }
+    )
+
+    *_, signups = keys.assign_keys(responses)
+
+    assert signups["event_day"].tolist() == [0, 1]
+    assert signups["start_minute"].tolist() == [1080, 2520]
+    assert signups["id_signup"].is_unique
@@ -0,0 +1,12 @@
+from data.names import normalize_event_name, normalize_name
+
+
+def test_normalize_name():
+    assert normalize_name("  Mikko  K. ") == "mikko k"
+    assert normalize_name("Pääsen_Smökrökkiin") == "paasen smokrokkiin"
+
+
+def test_normalize_event_name():
+    assert normalize_event_name("Kavitaatio 2022 2022") == "kavitaatio"
+    assert normalize_event_name("Wappu-2022") == "wappu"
+    assert normalize_event_name("Tech 2000 Gala") == "tech 2000 gala"
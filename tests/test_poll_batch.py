@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+import data.preprocess_utils as utils
+from data.poll_batch import PollBatch
+
+
+@pytest.fixture
+def telegram_export():
+    return "tests/data/telegram_export_mock.json"
+
+
+@pytest.fixture
+def substr_category_dict():
+    return {"kasa": "Kasaus", "pur": "Purku", "aja": "Veto", "en": "En pääse"}
+
+
+@pytest.fixture
+def event_substrings():
+    return ("kasa", "pur", "aja", "vet")
+
+
+class TestPollBatch:
+    def test_nonempty_event_polls(self, telegram_export, event_substrings):
+        poll_batch = PollBatch.from_json(telegram_export)
+
+        assert len(poll_batch) == 4
+
+        event_polls = poll_batch.nonempty().event_polls(event_substrings)
+
+        assert event_polls.question.tolist() == [
+            "Kaukkarit 1.9.",
+            "Huomenna 5.9. Dipolissa",
+        ]
+        assert event_polls.answer_offsets.tolist() == [0, 3, 7]
+        assert event_polls.answer_voters.tolist() == [8, 2, 0, 3, 2, 0, 13]
+
+    def test_to_frame_equals_flat_polls(
+        self, telegram_export, substr_category_dict, event_substrings
+    ):
+        flat_polls = utils.extract_flat_event_polls(
+            telegram_export, substr_category_dict, event_substrings
+        )
+
+        utils.update_event_names(flat_polls)
+
+        df_result = (
+            PollBatch.from_json(telegram_export)
+            .nonempty()
+            .event_polls(event_substrings)
+            .to_frame(substr_category_dict)
+        )
+
+        df_expected = pd.DataFrame(
+            {
+                "poll_date": ["2023-08-18T13:25:46", "2023-09-04T11:34:39"],
+                "date_event": ["1.9.2023", "5.9.2023"],
+                "name_event": ["Kaukkarit", "Huomenna"],
+                "signup_count": [10, 15],
+                "Kasaus": [8, 3],
+                "Purku": [2, 2],
+                "Veto": [0, 0],
+                "En pääse": [0, 13],
+            }
+        )
+
+        assert df_expected.equals(df_result)
+        assert df_expected.equals(pd.DataFrame(flat_polls).loc[:, df_result.columns])
+
+    def test_event_names_without_date(self):
+        poll_batch = PollBatch.from_polls(
+            [
+                {
+                    "date": "2023-09-10T08:00:00",
+                    "question": "Sitsit",
+                    "total_voters": 2,
+                    "answers": [{"text": "Kasaamaan", "voters": 2}],
+                }
+            ]
+        )
+
+        df_result = poll_batch.to_frame({"kasa": "Kasaus"})
+
+        assert df_result["name_event"].tolist() == ["Sitsit"]
+        assert df_result["date_event"].isna().all()
@@ -1,4 +1,7 @@
+import json
+
 import pytest
+import pandas as pd
 
 import data.preprocess_utils as utils
 
@@ -70,3 +73,154 @@ class TestIsNotEventPoll:
         }
 
         assert not utils.is_not_event_poll(event_poll, event_substrings)
+
+
+@pytest.fixture
+def event_sheet_args():
+    return ("tests/data/event_sheet_mock.csv", {"Kuvaus": ["Cancelled"]})
+
+
+class TestPreprocessEventCsv:
+    def test_preprocess_event_csv(self, event_sheet_args):
+        df_result = utils.preprocess_event_csv(*event_sheet_args)
+
+        assert set(df_result["Keikka"]) == {"Wedding 2021", "Show 2022", "Wedding 2023"}
+        assert set(df_result["Vastaus"]) == {"x", "16 ->", "18? ->", "9 ->"}
+        assert len(df_result) == 9
+
+        purku = df_result.loc[df_result["Homma"] == "Purku", :]
+
+        assert (purku["Kuvaus"] == ["Small PA", "Lights only"]).all()
+        assert purku["Aikaikkuna"].tolist() == ["23 - 3", "02 - 04"]
+
+    @pytest.mark.parametrize("chunksize", [1, 2, 4, 100])
+    def test_preprocess_event_csv_chunked(self, event_sheet_args, chunksize):
+        df_expected = utils.preprocess_event_csv(*event_sheet_args)
+
+        df_result = pd.concat(
+            utils.preprocess_event_csv_chunked(*event_sheet_args, chunksize=chunksize)
+        )
+
+        columns = list(df_expected.columns)
+
+        assert (
+            df_expected.sort_values(columns)
+            .reset_index(drop=True)
+            .equals(df_result.sort_values(columns).reset_index(drop=True))
+        )
+
+
+class TestCompactFrame:
+    def test_compact_frame(self):
+        df = pd.DataFrame({"name": ["b", "a", "b"], "count": [1, 2, 40_000]})
+
+        df_compact = utils.compact_frame(df)
+
+        assert df_compact["name"].cat.categories.tolist() == ["a", "b"]
+        assert df_compact["count"].dtype == "int32"
+
+    def test_concat_categoricals(self):
+        df_first = utils.compact_frame(pd.DataFrame({"name": ["b", "a"]}))
+        df_second = utils.compact_frame(pd.DataFrame({"name": ["c", "a"]}))
+
+        df = utils.concat_categoricals((df_first, df_second))
+
+        assert df["name"].cat.categories.tolist() == ["a", "b", "c"]
+        assert df["name"].tolist() == ["b", "a", "c", "a"]
+
+
+class TestSparseMelt:
+    def test_sparse_melt_equals_melt_dropna(self):
+        df = pd.DataFrame(
+            {
+                "Keikka": ["Wedding", "Wedding", "Party"],
+                "Homma": ["Kasaus", "Purku", "Veto"],
+                "Jane": ["x", None, "16 ->"],
+                "John": [None, None, None],
+                "Michael": [None, "x", None],
+            }
+        )
+
+        df_expected = df.melt(
+            id_vars=["Keikka", "Homma"], var_name="Nimi", value_name="Vastaus"
+        ).dropna(axis=0, how="all", subset="Vastaus")
+
+        df_result = utils.sparse_melt(df, ["Keikka", "Homma"], "Nimi", "Vastaus")
+
+        assert df_expected.equals(df_result)
+
+
+@pytest.fixture
+def telegram_export():
+    return "tests/data/telegram_export_mock.json"
+
+
+class TestIterPollMessages:
+    @pytest.mark.parametrize("chunk_size", [1, 7, 2**16])
+    def test_iter_poll_messages(self, telegram_export, chunk_size):
+        with open(telegram_export) as json_file:
+            messages = json.load(json_file)["messages"]
+
+        polls_expected = [
+            utils.extract_poll_results(message)
+            for message in messages
+            if "poll" in message
+        ]
+
+        polls_result = list(
+            utils.iter_poll_messages(telegram_export, chunk_size=chunk_size)
+        )
+
+        assert polls_expected == polls_result
+
+    def test_extract_flat_event_polls(self, telegram_export):
+        flat_polls = utils.extract_flat_event_polls(
+            telegram_export,
+            {"kasa": "Kasaus", "pur": "Purku", "aja": "Veto", "en": "En pääse"},
+            ("kasa", "pur", "aja", "vet"),
+        )
+
+        assert [flat_poll["name_event"] for flat_poll in flat_polls] == [
+            "Kaukkarit 1.9.",
+            "Huomenna 5.9. Dipolissa",
+        ]
+        assert flat_polls[1] | {"poll_date": None} == {
+            "poll_date": None,
+            "date_event": None,
+            "name_event": "Huomenna 5.9. Dipolissa",
+            "signup_count": 15,
+            "Kasaus": 3,
+            "Purku": 2,
+            "Veto": 0,
+            "En pääse": 13,
+        }
+
+
+class TestSubstringMatcher:
+    def test_first_match_uses_priority_order(self):
+        matcher = utils.SubstringMatcher(("kasa", "pur", "aja"))
+
+        assert matcher.first_match("purku ja kasaus") == 0
+        assert matcher.first_match("ajamaan ja purkamaan") == 1
+        assert matcher.first_match("en pääse") is None
+
+    def test_overlapping_substrings(self):
+        matcher = utils.SubstringMatcher(("ajamaan", "maa"))
+
+        assert matcher.first_match("kasaamaan ja ajamaan") == 0
+        assert matcher.search("ajamaan")
+        assert not matcher.search("purku")
+
+    def test_answer_to_category_dict(self):
+        categories = {"kasa": "Kasaus", "pur": "Purku", "ei": "En pääse"}
+
+        answer_cat_dict = utils.answer_to_category_dict(
+            {"Purku ja kasaus", " PURKAMAAN ", "Ei käy", "Sauna"}, categories
+        )
+
+        assert answer_cat_dict == {
+            "Purku ja kasaus": "Kasaus",
+            " PURKAMAAN ": "Purku",
+            "Ei käy": "En pääse",
+            "Sauna": None,
+        }
@@ -0,0 +1,99 @@
+import json
+
+import pandas as pd
+import pytest
+
+import data.ingest as ingest
+import data.preprocess_utils as utils
+from data.profiling import SourceProfile, write_profile
+
+
+@pytest.fixture
+def event_sheet_args():
+    return ("tests/data/event_sheet_mock.csv", {"Kuvaus": ["Cancelled"]})
+
+
+def test_preprocess_event_csv_profile(event_sheet_args):
+    profile = SourceProfile()
+
+    utils.preprocess_event_csv(*event_sheet_args, profile=profile)
+
+    result = profile.to_dict()
+
+    assert result["raw_rows"] == 9
+    assert result["dropped_rows"] == 1
+    assert result["filtered_rows"] == 2
+    assert result["responses"] == 9
+    assert result["unparsed_dates"] == 0
+    assert result["technicians"] == 3
+    assert result["events"] == 3
+    assert result["null_ratios"]["Keikka"] == 0.5
+
+
+def test_malformed_dates_are_counted(tmp_path, event_sheet_args, caplog):
+    path, filter_dict = event_sheet_args
+
+    with open(path) as sheet:
+        (tmp_path / "sheet.csv").write_text(
+            sheet.read().replace("2.10.2022", "Tarkentuu")
+        )
+
+    profile = SourceProfile()
+
+    df = utils.preprocess_event_csv(
+        str(tmp_path / "sheet.csv"), filter_dict, profile=profile
+    )
+
+    result = profile.to_dict()
+
+    assert result["unparsed_dates"] == 1
+    assert result["responses"] == 7
+    assert df["Päiväys"].notna().all()
+    assert "Could not parse 1 dates: {'Tarkentuu': 1}" in caplog.text
+
+
+@pytest.mark.parametrize("chunksize", [1, 3])
+def test_chunked_profile_equals_profile(event_sheet_args, chunksize):
+    profile = SourceProfile()
+    chunked_profile = SourceProfile()
+
+    utils.preprocess_event_csv(*event_sheet_args, profile=profile)
+    pd.concat(
+        utils.preprocess_event_csv_chunked(
+            *event_sheet_args, chunksize=chunksize, profile=chunked_profile
+        )
+    )
+
+    assert chunked_profile.to_dict() == profile.to_dict()
+
+
+def test_preprocess_seasons_profiles(tmp_path):
+    seasons = ingest.load_manifest("tests/data/seasons_mock.json")
+
+    profiles = {}
+
+    ingest.preprocess_seasons(seasons[:2], max_workers=2, profiles=profiles)
+
+    assert set(profiles) == {"2021-2022", "2022-2023"}
+    assert profiles["2022-2023"]["filtered_rows"] == 2
+
+    path = write_profile(profiles, tmp_path)
+
+    with open(path) as profile_file:
+        assert json.load(profile_file)["seasons"] == profiles
+
+
+def test_seasons_without_responses_are_profiled(tmp_path):
+    seasons = ingest.load_manifest("tests/data/seasons_mock.json")[:2]
+
+    # A sheet of the header row only
+    with open(seasons[1]["path"]) as sheet:
+        (tmp_path / "empty.csv").write_text(sheet.readline())
+
+    seasons[1]["path"] = str(tmp_path / "empty.csv")
+
+    profiles = {}
+
+    ingest.preprocess_seasons(seasons, max_workers=1, profiles=profiles)
+
+    assert profiles["2021-2022"]["responses"] == 0
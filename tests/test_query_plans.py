@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import delete, text
+
+from data.db_metadata import EventDataBase
+from eventtech.query_plans import _postgresql_steps, check_query_plans
+
+
+@pytest.fixture
+def sqlite_db(db_frames):
+    db = EventDataBase("sqlite://")
+
+    db._create_tables(*db_frames)
+
+    return db
+
+
+def test_analysis_queries_use_indexes(sqlite_db):
+    with sqlite_db.engine.connect() as conn:
+        results = check_query_plans(sqlite_db, conn, min_rows=0)
+
+    assert set(results) == {
+        "monthly_event_counts",
+        "_technician_signup_data",
+        "_event_signups_per_job",
+    }
+
+    for result in results.values():
+        assert result["plan"]
+        assert result["sequential_scans"] == []
+
+
+def test_missing_index_is_flagged(sqlite_db):
+    with sqlite_db.engine.connect() as conn:
+        conn.execute(text('DROP INDEX "ix_Events_date_event"'))
+
+        results = check_query_plans(sqlite_db, conn, min_rows=0)
+
+        assert results["monthly_event_counts"]["sequential_scans"] == ["Events"]
+
+        # Small tables are not flagged
+        results = check_query_plans(sqlite_db, conn)
+
+    assert results["monthly_event_counts"]["sequential_scans"] == []
+
+
+def test_database_without_periods():
+    db = EventDataBase("sqlite://")
+
+    with db.engine.connect() as conn:
+        assert check_query_plans(db, conn) == {}
+
+        db.metadata.create_all(conn)
+
+        assert check_query_plans(db, conn) == {}
+
+
+def test_empty_periods(sqlite_db):
+    with sqlite_db.engine.begin() as conn:
+        conn.execute(delete(sqlite_db.periods))
+
+        assert check_query_plans(sqlite_db, conn) == {}
+
+
+def test_partition_scans_name_their_table():
+    plan = {
+        "Node Type": "Append",
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "Events_2021-2022"},
+            {
+                "Node Type": "Index Scan",
+                "Relation Name": "Names",
+                "Index Name": "Names_pkey",
+            },
+        ],
+    }
+
+    steps = _postgresql_steps(plan, {"Events_2021-2022": "Events"})
+
+    assert steps == [
+        ("Append", ""),
+        ("Seq Scan on Events_2021-2022", "Events"),
+        ("Index Scan on Names using Names_pkey", ""),
+    ]
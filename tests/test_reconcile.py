@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+
+import data.ingest as ingest
+import data.reconcile as reconcile
+
+
+@pytest.fixture
+def responses():
+    seasons = ingest.load_manifest("tests/data/seasons_mock.json")
+
+    return ingest.preprocess_seasons(seasons[:2], max_workers=1)
+
+
+def test_candidate_pairs_use_blocks():
+    names = ["mikko", "mikko k", "jane", "wedding 2021", "wedding 2021"]
+
+    pairs = reconcile.candidate_pairs(
+        names, [True] * 5, buckets=[None, None, None, 2021, 2022]
+    )
+
+    assert (0, 1) in pairs
+    assert not any(2 in pair for pair in pairs)
+
+    # Names of different buckets are never paired
+    assert (3, 4) not in pairs
+
+
+def test_propose_merges():
+    counts = pd.Series({"Mikko": 30, "Mikko K": 5, "Jane": 10, "Jake": 3})
+
+    proposals = reconcile.propose_merges(counts, pd.Index([])).set_index("name")
+
+    assert proposals.loc["Mikko K", "canonical"] == "Mikko"
+    assert proposals.loc["Jake", "canonical"] == "Jake"
+    assert proposals.loc["Jane", "score"] == 1.0
+
+
+def test_propose_merges_prefers_known_names():
+    counts = pd.Series({"Mikko K": 5, "Mikko Ko": 8})
+
+    proposals = reconcile.propose_merges(counts, pd.Index(["Mikko"]))
+
+    # Mikko Ko is only similar to Mikko through Mikko K, so it is not merged
+    assert proposals["name"].tolist() == ["Mikko K", "Mikko Ko"]
+    assert proposals["canonical"].tolist() == ["Mikko", "Mikko Ko"]
+    assert proposals["score"].iloc[0] == pytest.approx(10 / 12)
+
+
+def test_propose_merges_ignores_event_years():
+    counts = pd.Series({"Kavitaatio 2022 2022": 5, "Annihilaatio 2022 2022": 8})
+
+    proposals = reconcile.propose_merges(
+        counts, pd.Index([]), normalize=reconcile.NORMALIZERS["event"]
+    )
+
+    assert (proposals["name"] == proposals["canonical"]).all()
+
+
+def test_update_mapping_compares_only_new_names(responses, tmp_path, monkeypatch):
+    path = tmp_path / "mapping.csv"
+
+    responses = pd.concat((responses, responses.head(1).assign(Nimi="Jane D")))
+
+    mapping = reconcile.update_mapping(reconcile.load_mapping(path), responses)
+    reconcile.save_mapping(mapping, path)
+
+    technicians = mapping.loc[mapping["kind"] == "technician"].set_index("name")
+
+    assert technicians.loc["Jane D", "canonical"] == "Jane"
+    assert not technicians.loc["Jane D", "accepted"]
+    assert technicians.loc["Mike", "canonical"] == "Mike"
+
+    # Events of different years are not merged
+    events = mapping.loc[mapping["kind"] == "event"]
+
+    assert (events["name"] == events["canonical"]).all()
+
+    compared = []
+
+    def candidate_pairs(names, is_new, *args, **kwargs):
+        compared.append(sum(is_new))
+        return set()
+
+    monkeypatch.setattr(reconcile, "candidate_pairs", candidate_pairs)
+
+    rerun = reconcile.update_mapping(
+        reconcile.load_mapping(path),
+        pd.concat((responses, responses.head(1).assign(Nimi="Janet"))),
+    )
+
+    assert compared == [1]
+    assert len(rerun) == len(mapping) + 1
+
+
+def test_apply_mapping(responses):
+    mapping = pd.DataFrame(
+        {
+            "kind": ["technician", "technician", "technician"],
+            "name": ["Mike", "John", "Jane"],
+            "canonical": ["Michael", "Jane", "Jane"],
+            "score": [0.8, 0.5, 1.0],
+            "accepted": [True, False, True],
+        }
+    )
+
+    result = reconcile.apply_mapping(responses, mapping)
+
+    assert "Mike" not in set(result["Nimi"])
+    assert "John" in set(result["Nimi"])
+    assert result["Keikka"].equals(responses["Keikka"])
+
+    compact = reconcile.apply_mapping(responses.astype({"Nimi": "category"}), mapping)
+
+    assert set(compact["Nimi"].cat.categories) == set(result["Nimi"])
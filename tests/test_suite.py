@@ -0,0 +1,31 @@
+import pytest
+
+from benchmarks.suite import compare
+
+
+def _results(tier, **stages):
+    return {
+        "tier": tier,
+        "stages": {
+            name: {"seconds": seconds, "peak_mib": peak_mib}
+            for name, (seconds, peak_mib) in stages.items()
+        },
+    }
+
+
+def test_compare_reports_regressions():
+    baseline = _results("small", assign_keys=(1.0, 10.0), barplot=(0.5, 2.0))
+    results = _results(
+        "small", assign_keys=(1.2, 13.0), barplot=(0.7, 2.0), new_stage=(9.0, 9.0)
+    )
+
+    assert compare(results, baseline, 0.25) == [
+        "assign_keys peak_mib: 10.0 -> 13.0",
+        "barplot seconds: 0.5 -> 0.7",
+    ]
+    assert compare(results, baseline, 0.5) == []
+
+
+def test_compare_requires_same_tier():
+    with pytest.raises(ValueError):
+        compare(_results("small"), _results("large"), 0.25)
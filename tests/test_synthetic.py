@@ -0,0 +1,33 @@
+import filecmp
+
+from benchmarks.synthetic import write_dataset
+from data import ingest
+
+
+def test_write_dataset_ingests(tmp_path):
+    manifest = write_dataset(
+        tmp_path, n_seasons=2, n_technicians=12, events_per_month=2, seed=1
+    )
+
+    seasons = ingest.load_manifest(manifest)
+
+    assert [season["source"] for season in seasons] == ["spreadsheet", "telegram"]
+
+    profiles = {}
+
+    responses = ingest.preprocess_seasons(seasons, max_workers=1, profiles=profiles)
+
+    assert set(responses["Nimi"]) <= set(
+        open(tmp_path / "Tapahtumat_2021_2022.csv").readline().strip().split(",")
+    )
+    assert profiles["2021-2022"]["events"] <= 24
+    assert (tmp_path / "Tapahtumat_2022_2023.csv").exists()
+
+
+def test_write_dataset_is_seeded(tmp_path):
+    first = write_dataset(tmp_path / "first", n_seasons=2, seed=3).parent
+    second = write_dataset(tmp_path / "second", n_seasons=2, seed=3).parent
+
+    files = ["Tapahtumat_2021_2022.csv", "Tapahtumat_2022_2023.json"]
+
+    assert filecmp.cmpfiles(first, second, files, shallow=False)[0] == files
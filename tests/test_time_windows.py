@@ -0,0 +1,33 @@
+import logging
+
+import pandas as pd
+
+from data.time_windows import parse_time_windows
+
+
+def test_parse_time_windows(caplog):
+    windows = pd.Series(
+        ["16 - 21", "23 - 3", "02 - 04", "20.30-1ish", "18 - (23)", None],
+        index=range(10, 16),
+    )
+
+    with caplog.at_level(logging.WARNING):
+        parsed = parse_time_windows(windows)
+
+    assert not caplog.records
+    assert parsed.index.equals(windows.index)
+    assert parsed["start_minute"].tolist() == [960, 1380, 1560, 1230, 1080, pd.NA]
+    assert parsed["end_minute"].tolist() == [1260, 1620, 1680, 1500, 1380, pd.NA]
+
+
+def test_parse_time_windows_reports_unparsed(caplog):
+    windows = pd.Series(["10 - 18", "Tarkentuu", "Tarkentuu", "16->"])
+
+    with caplog.at_level(logging.WARNING):
+        parsed = parse_time_windows(windows)
+
+    assert parsed["start_minute"].isna().tolist() == [False, True, True, True]
+
+    # All unparsed windows are reported at once
+    assert len(caplog.records) == 1
+    assert "Could not parse 3 time windows" in caplog.records[0].getMessage()